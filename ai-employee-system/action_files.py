@@ -0,0 +1,98 @@
+"""
+Action Files - Render EMAIL_*.md notes and pick their vault folder
+Shared by the Gmail watcher and the archive backfill so both write
+identical files.
+"""
+
+import os
+from pathlib import Path
+from datetime import datetime
+
+# Done/ is split by received date so no single folder grows without bound:
+# 'month' -> Done/2026/10/, 'day' -> Done/2026/10/17/, 'none' -> flat Done/
+DONE_SHARDING = os.getenv('DONE_SHARDING', 'month').lower()
+
+DEFAULT_ANALYSIS = {
+    "priority": "MEDIUM",
+    "reason": "Auto-assigned (no AI)",
+    "suggested_action": "Review manually",
+    "draft": "",
+    "auto_replied": False,
+}
+
+
+def analysis(processed: dict = None) -> dict:
+    """The fields a note needs from a process_email() result (or the no-AI defaults)."""
+    if processed is None:
+        return dict(DEFAULT_ANALYSIS)
+    return {
+        "priority": processed.get('priority', 'MEDIUM'),
+        "reason": processed.get('reason', ''),
+        "suggested_action": processed.get('suggested_action', ''),
+        "draft": processed.get('draft', '') or '',
+        "auto_replied": processed.get('auto_replied', False),
+    }
+
+
+def render_action_file(email: dict, processed: dict = None, received: str = None, extra_fields: dict = None) -> str:
+    """Markdown for one email; `extra_fields` are appended to the frontmatter."""
+    result = analysis(processed)
+    priority, reason, draft = result["priority"], result["reason"], result["draft"]
+    extra = ''.join(f"{key}: {value}\n" for key, value in (extra_fields or {}).items())
+
+    content = f'''---
+type: email
+from: {email['email_from']}
+subject: {email['subject']}
+received: {received or datetime.now().isoformat()}
+status: pending
+priority: {priority}
+priority_reason: {reason}
+{extra}---
+
+## Email Content
+{email['content']}
+
+## AI Analysis
+- **Priority**: {priority}
+- **Reason**: {reason}
+- **Suggested Action**: {result["suggested_action"]}
+
+## Actions
+- [ ] Reply to sender
+- [ ] Archive
+'''
+
+    # Add draft section if generated
+    if draft:
+        content += f'''
+## Draft Response
+> {draft.replace(chr(10), chr(10) + '> ')}
+
+*Check "Reply to sender" above to send this draft automatically.*
+'''
+    return content
+
+
+def target_folder_name(processed: dict = None) -> str:
+    """Done for auto-replied mail, Pending_Approval for drafted URGENT/HIGH, else Inbox."""
+    result = analysis(processed)
+    if result["auto_replied"]:
+        return "Done"
+    if result["priority"] in ('URGENT', 'HIGH') and result["draft"]:
+        return "Pending_Approval"
+    return "Inbox"
+
+
+def done_folder_for(vault_path, received: str = None, sharding: str = None) -> Path:
+    """The Done/ subfolder for an email received at `received` (ISO timestamp; default now)."""
+    sharding = (sharding or DONE_SHARDING).lower()
+    folder = Path(vault_path) / "Done"
+    if sharding == 'none':
+        return folder
+    try:
+        when = datetime.fromisoformat(received) if received else datetime.now()
+    except ValueError:
+        when = datetime.now()
+    folder = folder / f"{when.year:04d}" / f"{when.month:02d}"
+    return folder / f"{when.day:02d}" if sharding == 'day' else folder
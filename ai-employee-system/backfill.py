@@ -0,0 +1,340 @@
+"""
+Backfill - Bulk-import historical mail from an mbox file or a directory of .eml files
+Messages are streamed one at a time (constant memory), categorized with the
+priority rules (or the LLM cache / Claude), and written as EMAIL_*.md files
+in Done/ with status: archived (or routed like live mail with --route).
+A checkpoint records the position in the archive so an interrupted run resumes
+where it stopped. No replies are sent and no notifications are shown.
+
+Usage:
+    python backfill.py archive.mbox --vault "C:/path/to/AI-Employee-Vault"
+    python backfill.py exported_emails/ --vault ... --mode cached --route
+    python backfill.py archive.mbox --vault ... --state-dir state/work   (vault of the runtime.py watcher "work")
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime
+from email.header import decode_header, make_header
+from email.parser import BytesParser
+from email.utils import parsedate_to_datetime
+from action_files import render_action_file, target_folder_name, done_folder_for
+from frontmatter import set_frontmatter_field
+from vault_index import VaultIndex, default_index_path
+from metrics import timed, EMAILS
+
+logger = logging.getLogger('Backfill')
+
+DEFAULT_CHECKPOINT_DIR = Path(__file__).parent / "state"
+
+# Headers the rules look at (the same set the watcher fetches from Gmail)
+RULE_HEADERS = ('From', 'Subject', 'List-Unsubscribe', 'Precedence', 'Auto-Submitted')
+
+SNIPPET_CHARS = 500
+MODES = ('rules', 'cached', 'claude')
+
+_TAGS = re.compile(r'<[^>]+>')
+_SPACE = re.compile(r'\s+')
+
+
+# -- Streaming readers -------------------------------------------------------
+
+def iter_mbox(path, start: int = 0):
+    """
+    Yield (raw message bytes, byte offset after the message) from an mbox file.
+    Reads line by line, so memory use is bounded by the largest single message.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        lines = []
+        offset = start
+        previous_blank = True
+        for line in f:
+            length = len(line)
+            if line.startswith(b'From ') and previous_blank:
+                if lines:
+                    # Resuming from `offset` starts at this separator line
+                    yield b''.join(lines), offset
+                lines = []  # The "From " separator line is not part of the message
+            else:
+                # mboxrd escaping: ">From " at the start of a body line
+                if line.startswith(b'>') and line.lstrip(b'>').startswith(b'From '):
+                    line = line[1:]
+                lines.append(line)
+            offset += length
+            previous_blank = line.strip() == b''
+        if lines:
+            yield b''.join(lines), offset
+
+
+def iter_eml_dir(path, after: str = None):
+    """Yield (raw bytes, file name) for *.eml files in name order, starting after `after`."""
+    names = sorted(entry.name for entry in os.scandir(path)
+                   if entry.name.lower().endswith('.eml') and entry.is_file())
+    for name in names:
+        if after is not None and name <= after:
+            continue
+        yield (Path(path) / name).read_bytes(), name
+
+
+# -- Parsing -----------------------------------------------------------------
+
+# The compat32 policy skips structured header parsing, which dominates the
+# cost of policy.default; only the few headers we need are decoded
+_parser = BytesParser()
+
+
+def _header(message, name: str, default: str = '') -> str:
+    value = message.get(name)
+    if value is None:
+        return default
+    try:
+        value = str(make_header(decode_header(value)))
+    except (ValueError, LookupError, UnicodeError):
+        pass  # Malformed encoded words: keep the raw header text
+    return _SPACE.sub(' ', str(value)).strip()
+
+
+def _snippet(message) -> str:
+    """First SNIPPET_CHARS of the text body, like Gmail's snippet (HTML tags stripped)."""
+    parts = {}
+    for part in message.walk():
+        subtype = part.get_content_subtype()
+        if part.get_content_maintype() == 'text' and subtype in ('plain', 'html') and subtype not in parts \
+                and not part.get_filename():
+            parts[subtype] = part
+    part = parts.get('plain') or parts.get('html')
+    if part is None:
+        return ''
+    payload = part.get_payload(decode=True) or b''
+    try:
+        text = payload.decode(part.get_content_charset() or 'utf-8', errors='replace')
+    except LookupError:
+        text = payload.decode('utf-8', errors='replace')  # Unknown charset name
+    if part is not parts.get('plain'):
+        text = _TAGS.sub(' ', text)
+    return _SPACE.sub(' ', text).strip()[:SNIPPET_CHARS]
+
+
+def parse_message(raw: bytes) -> tuple:
+    """Return (process_email() keyword arguments, received ISO timestamp) for one message."""
+    message = _parser.parsebytes(raw)
+    headers = {name: _header(message, name) for name in RULE_HEADERS if name in message}
+
+    # Stable ID, so a re-run (or an overlapping export) maps to the same file
+    key = _header(message, 'Message-ID') or hashlib.sha1(raw).hexdigest()
+    message_id = "bf" + hashlib.sha1(key.encode('utf-8', 'replace')).hexdigest()[:14]
+
+    received = None
+    date = _header(message, 'Date')
+    if date:
+        try:
+            received = parsedate_to_datetime(date).isoformat()
+        except (TypeError, ValueError):
+            pass
+
+    email = {
+        'email_from': headers.get('From', 'Unknown'),
+        'subject': headers.get('Subject', 'No Subject'),
+        'content': _snippet(message),
+        'message_id': message_id,
+        'headers': headers,
+    }
+    return email, received
+
+
+# -- Backfill ----------------------------------------------------------------
+
+class Backfill:
+    """Streams an archive into the vault with resumable checkpoints."""
+
+    def __init__(self, source, vault_path, mode: str = 'rules', folder: str = "Done",
+                 checkpoint_path=None, checkpoint_every: int = 500, processor=None, index=None, state_dir=None):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        self.source = Path(source)
+        self.vault_path = Path(vault_path)
+        self.mode = mode
+        self.folder = folder
+        self.checkpoint_every = checkpoint_every
+        if checkpoint_path is None:
+            digest = hashlib.sha1(str(self.source.resolve()).encode('utf-8')).hexdigest()[:12]
+            checkpoint_path = DEFAULT_CHECKPOINT_DIR / f"backfill_{digest}.json"
+        self.checkpoint_path = Path(checkpoint_path)
+
+        if processor is None:
+            # Imported late: email_processor configures logging and loads .env on import
+            from email_processor import EmailProcessor
+            # No Gmail service: nothing is sent
+            processor = EmailProcessor(str(self.vault_path), state_dir=state_dir)
+        self.processor = processor
+        # Written files go into the vault index too (committed with each checkpoint);
+        # with the watcher's state_dir this is the index the watcher keeps up to date
+        if index is None and os.getenv('VAULT_INDEX_ENABLED', '1') == '1':
+            index = VaultIndex(self.vault_path, default_index_path(self.vault_path, state_dir))
+        self.index = index
+        self.stats = {"written": 0, "skipped": 0, "failed": 0}
+        self._existing = None
+
+    # -- Checkpoint --------------------------------------------------------
+
+    def load_checkpoint(self) -> dict:
+        try:
+            checkpoint = json.loads(self.checkpoint_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+        if checkpoint.get("source") != str(self.source.resolve()):
+            return {}
+        return checkpoint
+
+    def save_checkpoint(self, position, done: bool = False):
+        if self.index is not None:
+            self.index.commit()
+        data = {
+            "source": str(self.source.resolve()),
+            "position": position,
+            "done": done,
+            "updated_at": datetime.now().isoformat(),
+            **self.stats,
+        }
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.checkpoint_path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(data, indent=2), encoding='utf-8')
+        os.replace(tmp, self.checkpoint_path)
+
+    # -- Pipeline ------------------------------------------------------------
+
+    def categorize(self, email: dict) -> dict:
+        """Priority fields for one email; never drafts, replies or notifies."""
+        args = (email['email_from'], email['subject'], email['content'])
+        category = None
+        if self.mode == 'claude':
+            category = self.processor.categorize_email(*args, email['headers'])
+        elif self.mode == 'cached':
+            category = self.processor.categorize_offline(*args, email['headers'])
+        if category is None:
+            category = self.processor._fallback_categorize(*args, email['headers'])
+        return {
+            "priority": category.get("priority", "MEDIUM"),
+            "reason": category.get("reason", ""),
+            "suggested_action": category.get("suggested_action", ""),
+            "draft": None,
+            "auto_replied": False,
+        }
+
+    def _existing_ids(self) -> set:
+        """IDs already in the vault (directory listings only, read once; Done/ includes its subfolders)."""
+        if self._existing is None:
+            self._existing = set()
+            for name in ("Inbox", "Pending_Approval", "Approved", "Done"):
+                for _, _, files in os.walk(self.vault_path / name):
+                    self._existing.update(f[6:-3] for f in files if f.startswith('EMAIL_') and f.endswith('.md'))
+        return self._existing
+
+    @timed('backfill_write')
+    def write(self, email: dict, processed: dict, received: str) -> bool:
+        if email['message_id'] in self._existing_ids():
+            return False
+        # folder=None routes by priority, like live mail
+        name = self.folder or target_folder_name(processed)
+        folder = done_folder_for(self.vault_path, received) if name == "Done" else self.vault_path / name
+        folder.mkdir(parents=True, exist_ok=True)
+        content = render_action_file(email, processed, received=received, extra_fields={"source": "backfill"})
+        if name == "Done":
+            # Historical mail needs no action: keep it out of the pending counts
+            content = set_frontmatter_field(content, 'status', 'archived')
+        path = folder / f"EMAIL_{email['message_id']}.md"
+        path.write_text(content, encoding='utf-8')
+        if self.index is not None:
+            self.index.upsert(path, content, commit=False)
+        self._existing.add(email['message_id'])
+        EMAILS.inc(priority=processed['priority'])
+        return True
+
+    def messages(self, position):
+        if self.source.is_dir():
+            return iter_eml_dir(self.source, after=position)
+        return iter_mbox(self.source, start=position or 0)
+
+    def run(self, restart: bool = False, limit: int = None) -> dict:
+        checkpoint = {} if restart else self.load_checkpoint()
+        if checkpoint.get("done"):
+            logger.info(f"[BACKFILL] {self.source.name} already imported (use --restart to run again)")
+            return checkpoint
+        position = checkpoint.get("position")
+        if position is not None:
+            self.stats.update({k: checkpoint.get(k, 0) for k in self.stats})
+            logger.info(f"[BACKFILL] Resuming {self.source.name} after {sum(self.stats.values())} message(s)")
+
+        started = time.perf_counter()
+        count = 0
+        finished = True
+        for raw, next_position in self.messages(position):
+            try:
+                email, received = parse_message(raw)
+                if self.write(email, self.categorize(email), received):
+                    self.stats["written"] += 1
+                else:
+                    self.stats["skipped"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.warning(f"[BACKFILL] Could not import message before {next_position}: {e}")
+            position = next_position
+            count += 1
+            if count % self.checkpoint_every == 0:
+                self.save_checkpoint(position)
+                elapsed = time.perf_counter() - started
+                logger.info(f"[BACKFILL] {count} message(s), {count / elapsed * 60:.0f}/min")
+            if limit and count >= limit:
+                finished = False
+                break
+
+        self.save_checkpoint(position, done=finished)
+        elapsed = time.perf_counter() - started
+        rate = count / elapsed * 60 if elapsed else 0
+        logger.info(f"[BACKFILL] {count} message(s) in {elapsed:.1f}s ({rate:.0f}/min) - "
+                    f"{self.stats['written']} written, {self.stats['skipped']} already in vault, "
+                    f"{self.stats['failed']} failed")
+
+        # Folder counts changed outside the normal path - recount once
+        self.processor.folder_counts = self.processor._scan_folder_counts()
+        self.processor.update_dashboard(force=True)
+        return {**self.stats, "messages": count, "seconds": elapsed, "per_minute": rate}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import historical mail into the vault")
+    parser.add_argument("source", help="an mbox file or a directory of .eml files")
+    parser.add_argument("--vault", required=True, help="path to the Obsidian vault")
+    parser.add_argument("--mode", choices=MODES, default="rules",
+                        help="rules only (default), rules + LLM cache/local classifier, or Claude")
+    placement = parser.add_mutually_exclusive_group()
+    placement.add_argument("--folder", default="Done",
+                           help="put every file in this folder (default: Done, with status: archived)")
+    placement.add_argument("--route", action="store_true",
+                           help="route like live mail (Inbox/, status: pending) instead")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: state/backfill_<hash>.json)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    parser.add_argument("--limit", type=int, help="stop after this many messages (resume later)")
+    parser.add_argument("--state-dir", help="the vault's watcher state_dir (runtime.py uses state/<name>), "
+                                            "so its vault index and classifier are used")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    Backfill(args.source, args.vault, mode=args.mode, folder=None if args.route else args.folder,
+             checkpoint_path=args.checkpoint, state_dir=args.state_dir).run(restart=args.restart, limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
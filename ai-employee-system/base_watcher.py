@@ -1,28 +1,66 @@
+import os
 import time
 from pathlib import Path
+from scheduler import Waker, policy_from_env
 
 class BaseWatcher:
-    def __init__(self, vault_path: str, check_interval: int = 120):
+    # Seconds between on_idle() calls while waiting for the next poll (None = no idle work)
+    idle_interval = None
+
+    def __init__(self, vault_path: str, check_interval: int = 120, poll_policy=None):
         self.vault_path = Path(vault_path)
         self.needs_action = self.vault_path / "Inbox"
         self.check_interval = check_interval
-        
+
         # Ensure the folder exists
         self.needs_action.mkdir(parents=True, exist_ok=True)
 
+        # How long to wait between polls, and what can cut the wait short
+        self.poll_policy = poll_policy or self.create_poll_policy()
+        self.waker = Waker(os.getenv('POLL_NOW_FILE') or self.vault_path / ".poll_now")
+
+    def create_poll_policy(self):
+        """Override in subclasses to use a different PollPolicy."""
+        return policy_from_env(self.check_interval)
+
+    def start(self):
+        """Start background resources (called once before the first poll)."""
+        self.waker.start()
+
+    def stop(self):
+        """Release background resources (called once after the last poll)."""
+        self.waker.stop()
+
+    def run_once(self) -> int:
+        """Poll once and create action files; returns how many updates were found."""
+        updates = self.check_for_updates()
+        for update in updates:
+            self.create_action_file(update)
+        return len(updates)
+
+    def on_idle(self):
+        """Work done between polls, every `idle_interval` seconds; none by default."""
+
     def run(self):
-        print(f"Watcher started. Checking every {self.check_interval} seconds...")
+        print(f"Watcher started. Checking {self.poll_policy.describe()}...")
+        self.start()
         try:
             while True:
-                updates = self.check_for_updates()
-                for update in updates:
-                    self.create_action_file(update)
-                time.sleep(self.check_interval)
+                found = self.run_once()
+                deadline = time.monotonic() + self.poll_policy.next_interval(found)
+                while (remaining := deadline - time.monotonic()) > 0:
+                    if self.waker.wait(min(remaining, self.idle_interval or remaining)):
+                        break
+                    if self.idle_interval:
+                        self.on_idle()
+                self.waker.consume()
         except KeyboardInterrupt:
             print("Watcher stopped.")
+        finally:
+            self.stop()
 
     def check_for_updates(self):
         raise NotImplementedError("Subclasses must implement check_for_updates")
 
     def create_action_file(self, data):
-        raise NotImplementedError("Subclasses must implement create_action_file")
\ No newline at end of file
+        raise NotImplementedError("Subclasses must implement create_action_file")
@@ -0,0 +1,197 @@
+"""
+Batch Categorizer - Defer non-urgent categorization to the Message Batches API
+Emails the rules pre-classify as MEDIUM/LOW are collected here instead of
+each taking a synchronous messages.create call. They are submitted together
+(once BATCH_MAX_SIZE are waiting or the oldest has waited BATCH_MAX_WAIT_SECONDS)
+at half the per-token price, outside the messages.create rate limit, and the
+finished batch is polled for its results. Pending requests and open batches are
+kept in SQLite so a restart picks up where it left off. Emails with the same
+request key share one batch request. The key is the categorize LLM cache key
+(sender domain, subject and first 500 characters with numbers and IDs masked,
+plus the handbook hash), so templated mail that differs only in such details
+is categorized once.
+"""
+
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from metrics import API_CALLS, API_ERRORS, TOKENS
+
+logger = logging.getLogger('BatchCategorizer')
+
+DEFAULT_BATCH_PATH = Path(__file__).parent / "state" / "batches.sqlite3"
+
+# Anthropic allows up to 100,000 requests per batch
+MAX_BATCH_REQUESTS = 100000
+
+
+class BatchCategorizer:
+    """Queues categorization requests, submits them as Message Batches and collects the results."""
+
+    def __init__(self, client, build_request, path=None, max_size: int = 500, max_wait: float = 300.0,
+                 poll_interval: float = 60.0, max_age: float = 25 * 3600):
+        self.client = client
+        self.build_request = build_request  # email dict -> messages.create params
+        self.path = Path(path) if path else DEFAULT_BATCH_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_size = max(1, min(max_size, MAX_BATCH_REQUESTS))
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.max_age = max_age  # Batches expire after 24h; give up on one open longer than this
+        self._lock = threading.Lock()
+        self._polled_at = float('-inf')
+
+        self.conn = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS requests (
+                message_id TEXT PRIMARY KEY,
+                email TEXT NOT NULL,
+                request_key TEXT,
+                batch_id TEXT,
+                queued_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_batch ON requests(batch_id, queued_at)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS batches (
+                batch_id TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        """Requests waiting to be submitted or for their batch to finish."""
+        return self.conn.execute("SELECT COUNT(*) FROM requests").fetchone()[0]
+
+    def open_batches(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM batches").fetchone()[0]
+
+    def add(self, email: dict, key: str = None):
+        """Queue an email (process_email() keyword arguments) for the next batch."""
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO requests (message_id, email, request_key, queued_at) VALUES (?, ?, ?, ?)",
+                (email['message_id'], json.dumps(email), key or email['message_id'], time.time())
+            )
+            self.conn.commit()
+
+    def flush(self, force: bool = False) -> list:
+        """
+        Submit queued requests once a batch is full or the oldest has waited max_wait.
+        Returns the emails that could not be submitted (to categorize synchronously).
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT message_id, email, request_key, queued_at FROM requests WHERE batch_id IS NULL ORDER BY queued_at"
+            ).fetchall()
+        if not rows or not (force or len(rows) >= self.max_size or time.time() - rows[0][3] >= self.max_wait):
+            return []
+
+        # One request per key; the first email of each key is the one sent
+        groups = {}
+        for message_id, email, key, _ in rows:
+            groups.setdefault(key, []).append((message_id, email))
+        groups = list(groups.values())
+
+        failed = []
+        for start in range(0, len(groups), self.max_size):
+            chunk = groups[start:start + self.max_size]
+            message_ids = [message_id for group in chunk for message_id, _ in group]
+            requests = [{"custom_id": group[0][0], "params": self.build_request(json.loads(group[0][1]))}
+                        for group in chunk]
+            API_CALLS.inc(api='claude', method='messages.batches.create')
+            try:
+                batch = self.client.messages.batches.create(requests=requests)
+            except Exception as e:
+                API_ERRORS.inc(api='claude', method='messages.batches.create')
+                logger.error(f"[BATCH] Could not submit {len(requests)} request(s): {e} - categorizing them now")
+                self._forget(message_ids)
+                failed.extend(json.loads(email) for group in chunk for _, email in group)
+                continue
+
+            with self._lock:
+                self.conn.execute("INSERT INTO batches (batch_id, size, created_at) VALUES (?, ?, ?)",
+                                  (batch.id, len(requests), time.time()))
+                self.conn.executemany("UPDATE requests SET batch_id = ? WHERE message_id = ?",
+                                      [(batch.id, message_id) for message_id in message_ids])
+                self.conn.commit()
+            logger.info(f"[BATCH] Submitted {batch.id} with {len(requests)} request(s) for {len(message_ids)} email(s)")
+        return failed
+
+    def poll(self, force: bool = False) -> list:
+        """
+        Check open batches (at most every poll_interval) and collect finished ones.
+        Returns (email, message) pairs; message is None when that request errored,
+        expired or was canceled, so the caller can categorize it synchronously.
+        """
+        if not force and time.monotonic() - self._polled_at < self.poll_interval:
+            return []
+        self._polled_at = time.monotonic()
+
+        results = []
+        for batch_id, created_at in self.conn.execute("SELECT batch_id, created_at FROM batches").fetchall():
+            API_CALLS.inc(api='claude', method='messages.batches.retrieve')
+            try:
+                batch = self.client.messages.batches.retrieve(batch_id)
+            except Exception as e:
+                API_ERRORS.inc(api='claude', method='messages.batches.retrieve')
+                logger.warning(f"[BATCH] Could not check {batch_id}: {e}")
+                if time.time() - created_at >= self.max_age:
+                    logger.error(f"[BATCH] Giving up on {batch_id} after {(time.time() - created_at) / 3600:.0f}h")
+                    results.extend(self._finish(batch_id, {}))
+                continue
+            if batch.processing_status != 'ended':
+                continue
+
+            messages = {}
+            API_CALLS.inc(api='claude', method='messages.batches.results')
+            try:
+                for entry in self.client.messages.batches.results(batch_id):
+                    if entry.result.type == 'succeeded':
+                        messages[entry.custom_id] = entry.result.message
+                        self._record_usage(entry.result.message)
+            except Exception as e:
+                API_ERRORS.inc(api='claude', method='messages.batches.results')
+                logger.warning(f"[BATCH] Could not read the results of {batch_id}: {e}")
+                continue
+            counts = batch.request_counts
+            logger.info(f"[BATCH] {batch_id} ended - {counts.succeeded} succeeded, {counts.errored} errored, "
+                        f"{counts.expired} expired, {counts.canceled} canceled")
+            results.extend(self._finish(batch_id, messages))
+        return results
+
+    def _finish(self, batch_id: str, messages: dict) -> list:
+        """Remove a batch and its requests; returns each request's email with its message (or None)."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT message_id, email, request_key FROM requests WHERE batch_id = ? ORDER BY queued_at", (batch_id,)
+            ).fetchall()
+            self.conn.execute("DELETE FROM requests WHERE batch_id = ?", (batch_id,))
+            self.conn.execute("DELETE FROM batches WHERE batch_id = ?", (batch_id,))
+            self.conn.commit()
+        by_key = {key: messages[message_id] for message_id, _, key in rows if message_id in messages}
+        return [(json.loads(email), by_key.get(key)) for _, email, key in rows]
+
+    @staticmethod
+    def _record_usage(message):
+        usage = getattr(message, 'usage', None)
+        for kind in ('input_tokens', 'output_tokens', 'cache_read_input_tokens', 'cache_creation_input_tokens'):
+            count = getattr(usage, kind, None) or 0
+            if count:
+                TOKENS.inc(count, kind=f"batch_{kind.replace('_tokens', '')}")
+
+    def _forget(self, message_ids: list):
+        with self._lock:
+            self.conn.executemany("DELETE FROM requests WHERE message_id = ?", [(m,) for m in message_ids])
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
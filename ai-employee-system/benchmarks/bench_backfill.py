@@ -0,0 +1,92 @@
+"""
+Benchmark: backfill throughput from a synthetic mbox archive
+Usage: python benchmarks/bench_backfill.py [--messages 10000] [--mode rules] [--trace-memory]
+Builds an mbox of plain, HTML and multipart messages, imports it into a
+temporary vault and reports messages per minute (and peak Python memory,
+which should stay flat as --messages grows).
+"""
+
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+from email.message import EmailMessage
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backfill import Backfill, MODES  # noqa: E402
+from vault_index import VaultIndex  # noqa: E402
+
+SENDERS = ["Alice <alice@example.com>", "noreply@github.com", "Client <client@bigcorp.io>",
+           "News <newsletter@shop.example>", "Boss <boss@example.com>"]
+SUBJECTS = ["Weekly newsletter", "URGENT: invoice overdue", "Meeting notes", "Question about the release",
+            "Your order has shipped", "Build failed on main"]
+
+
+def write_mbox(path: Path, count: int, seed: int = 3):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    with open(path, 'wb') as f:
+        for i in range(count):
+            message = EmailMessage()
+            message['From'] = rng.choice(SENDERS)
+            message['To'] = "me@example.com"
+            message['Subject'] = f"{rng.choice(SUBJECTS)} #{i}"
+            message['Date'] = format_datetime(start + timedelta(minutes=i))
+            message['Message-ID'] = f"<bench-{i}@example.com>"
+            body = " ".join(rng.choices(SUBJECTS, k=40)) + "\nFrom the team\n"
+            if i % 3 == 0:
+                message.set_content(body)
+                message.add_alternative(f"<html><body><p>{body}</p></body></html>", subtype='html')
+            elif i % 3 == 1:
+                message.set_content(f"<p>{body}</p>", subtype='html')
+            else:
+                message.set_content(body)
+            data = message.as_bytes().replace(b"\nFrom ", b"\n>From ")
+            f.write(f"From bench@example.com {start.strftime('%a %b %d %H:%M:%S %Y')}\n".encode())
+            f.write(data + b"\n\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--mode', choices=MODES, default='rules')
+    parser.add_argument('--trace-memory', action='store_true', help="report peak traced memory (slower)")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        mbox = tmp / "archive.mbox"
+        write_mbox(mbox, args.messages)
+        size = mbox.stat().st_size
+
+        backfill = Backfill(mbox, tmp / "vault", mode=args.mode, checkpoint_path=tmp / "checkpoint.json",
+                            index=VaultIndex(tmp / "vault", tmp / "index.sqlite3"))
+        if args.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = backfill.run()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+
+        files = sum(1 for _ in (tmp / "vault").rglob("EMAIL_*.md"))
+        backfill.index.close()
+
+    print(f"Archive:    {args.messages} messages, {size / 1e6:.1f} MB")
+    print(f"Imported:   {result['written']} written, {result['skipped']} skipped, {result['failed']} failed "
+          f"({files} files)")
+    print(f"Time:       {elapsed:.2f}s")
+    print(f"Throughput: {args.messages / elapsed * 60:,.0f} messages/min ({args.mode} mode)")
+    if peak is not None:
+        print(f"Peak mem:   {peak / 1e6:.1f} MB traced")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark: Message Batches mode vs synchronous categorization on a backlog
+Usage: python benchmarks/bench_batches.py [--messages 500] [--claude-latency 0.2] [--batch-delay 2]
+       [--batch-max-size 200] [--concurrency 4]
+Files the same fake backlog of distinct (non-templated, so the LLM cache can't
+answer them) emails twice - BATCH_MODE_ENABLED=0, then 1 - and reports
+synchronous messages.create calls, batch submissions, time until every file has
+its final category, and the estimated Claude cost (batch requests at 50%).
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_pipeline import Harness  # noqa: E402
+from frontmatter import parse_frontmatter  # noqa: E402
+
+WORDS = ("project", "update", "schedule", "budget", "report", "team", "review", "plan", "design", "notes",
+         "question", "travel", "lunch", "offsite", "hiring", "roadmap", "feedback", "launch", "survey", "draft")
+KINDS = (
+    (0.05, "Ops <ops@example.com>", "URGENT: {words} is down", "Please look at this asap - {words}"),
+    (0.15, "Client {n} <client{n}@example.com>", "Invoice and {words}", "Can we meet about the invoice and {words}?"),
+    (0.45, "Colleague {n} <person{n}@example.com>", "Thoughts on {words}", "When you have time: {words}"),
+    (0.35, "News {n} <news{n}@shop.example>", "Digest: {words}", "This week: {words} - unsubscribe here"),
+)
+
+# USD per million tokens (Sonnet list prices); batch requests cost half
+PRICES = {"input": 3.0, "output": 15.0, "cache_read": 0.30, "cache_write": 3.75}
+
+
+def cost(claude) -> float:
+    """Estimated spend from the fake client's token counters."""
+    total = (claude.input_tokens * PRICES["input"] + claude.output_tokens * PRICES["output"]
+             + claude.cache_read_tokens * PRICES["cache_read"]
+             + claude.cache_creation_tokens * PRICES["cache_write"])
+    batch = (claude.batch_input_tokens * PRICES["input"] + claude.batch_output_tokens * PRICES["output"]
+             + claude.batch_cache_read_tokens * PRICES["cache_read"]
+             + claude.batch_cache_creation_tokens * PRICES["cache_write"])
+    return (total - batch / 2) / 1e6
+
+
+def deliver_backlog(service, count: int, seed: int):
+    """Deliver `count` emails whose subject and content differ (unlike FakeGmailService.populate)."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        roll, total = rng.random(), 0.0
+        for share, sender, subject, snippet in KINDS:
+            total += share
+            if roll < total:
+                break
+        words = " ".join(rng.sample(WORDS, 4))
+        service.deliver(sender.format(n=rng.randrange(50)), subject.format(words=words),
+                        snippet.format(words=" ".join(rng.sample(WORDS, 6))))
+
+
+def provisional_files(vault: Path) -> int:
+    return sum(1 for path in vault.rglob("EMAIL_*.md")
+               if parse_frontmatter(path.read_text(encoding='utf-8')).get('batch_status') == 'pending')
+
+
+def run(args, workdir: Path, batch_mode: bool) -> dict:
+    os.environ['BATCH_MODE_ENABLED'] = '1' if batch_mode else '0'
+    harness = Harness(args, workdir)
+    harness.claude.batch_delay = args.batch_delay
+    watcher = harness.create_watcher()
+    watcher.run_once()  # Establishes the historyId cursor
+    deliver_backlog(harness.service, args.messages, args.seed)
+
+    start = time.perf_counter()
+    harness.poll_until(args.messages)
+    filed = time.perf_counter() - start
+    pending = len(watcher.batcher) if watcher.batcher is not None else 0
+    while watcher.batcher is not None and len(watcher.batcher):
+        watcher.process_batches(force=True)
+        time.sleep(0.05)
+    final = time.perf_counter() - start
+
+    claude = harness.claude
+    result = {
+        "mode": "batch" if batch_mode else "sync",
+        "filed": harness.filed,
+        "deferred": pending,
+        "seconds_to_file": filed,
+        "seconds_to_final": final,
+        "sync_calls": claude.calls,
+        "batch_submissions": claude.batch_calls,
+        "batch_requests": claude.batch_requests,
+        "cost": cost(claude),
+        "left_provisional": provisional_files(workdir / "vault"),
+    }
+    watcher.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--claude-latency', type=float, default=0.2, help="Seconds per messages.create call")
+    parser.add_argument('--batch-delay', type=float, default=2.0, help="Seconds a fake batch stays in_progress")
+    parser.add_argument('--batch-max-size', type=int, default=200, help="BATCH_MAX_SIZE")
+    parser.add_argument('--concurrency', type=int, default=4, help="PROCESSOR_CONCURRENCY")
+    parser.add_argument('--handbook-tokens', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    # Harness options this benchmark keeps fixed
+    args.gmail_latency, args.error_rate = 0.0, 0.0
+
+    logging.disable(logging.ERROR)
+    os.environ.update(
+        VAULT_WATCH_MODE='poll',
+        PROCESSOR_CONCURRENCY=str(args.concurrency),
+        ANTHROPIC_REQUESTS_PER_MINUTE='100000',
+        ANTHROPIC_BURST=str(max(5, args.concurrency)),
+        LOCAL_CLASSIFIER_ENABLED='0',
+        GMAIL_PUSH_ENABLED='0',
+        DEDUP_ENABLED='0',
+        BATCH_MAX_SIZE=str(args.batch_max_size),
+        BATCH_MAX_WAIT_SECONDS='0',
+        BATCH_POLL_INTERVAL='0',
+    )
+
+    results = []
+    for batch_mode in (False, True):
+        with tempfile.TemporaryDirectory() as workdir:
+            results.append(run(args, Path(workdir), batch_mode))
+
+    for r in results:
+        print(f"{r['mode']:>5}: {r['filed']} filed in {r['seconds_to_file']:.1f}s "
+              f"({r['deferred']} deferred), final after {r['seconds_to_final']:.1f}s")
+        print(f"       {r['sync_calls']} messages.create call(s), {r['batch_requests']} request(s) in "
+              f"{r['batch_submissions']} batch(es), est. ${r['cost']:.3f}, "
+              f"{r['left_provisional']} file(s) still provisional")
+    sync, batch = results
+    if sync['cost']:
+        print(f"Batch mode: {1 - batch['cost'] / sync['cost']:.0%} cheaper, "
+              f"{sync['sync_calls'] - batch['sync_calls']} fewer synchronous calls")
+
+
+if __name__ == "__main__":
+    main()
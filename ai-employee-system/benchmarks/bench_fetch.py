@@ -0,0 +1,51 @@
+"""
+Benchmark: per-message messages.get vs batched fetch_messages
+Usage: python benchmarks/bench_fetch.py [--messages 200] [--latency 0.05] [--batch-size 50]
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_gmail import FakeGmailService  # noqa: E402
+from gmail_watcher import GmailWatcher  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds per HTTP round trip")
+    parser.add_argument('--batch-size', type=int, default=50)
+    args = parser.parse_args()
+
+    service = FakeGmailService(latency=args.latency)
+    for i in range(args.messages):
+        service.deliver(f"Sender {i} <sender{i}@example.com>", f"Message {i}", "Hello")
+
+    with tempfile.TemporaryDirectory() as vault:
+        watcher = GmailWatcher(vault, token_path='unused.json', service=service)
+        watcher.fetch_batch_size = args.batch_size
+        updates = watcher.check_for_updates()
+
+        start = time.perf_counter()
+        for update in updates:
+            service.users().messages().get(userId='me', id=update['id'], format='metadata').execute()
+        sequential = time.perf_counter() - start
+
+        trips_before = service.round_trips
+        start = time.perf_counter()
+        fetched = watcher.fetch_messages(updates)
+        batched = time.perf_counter() - start
+
+    print(f"Messages:   {len(updates)} (fetched {len(fetched)})")
+    print(f"Sequential: {sequential:.2f}s ({len(updates)} round trips)")
+    print(f"Batched:    {batched:.2f}s ({service.round_trips - trips_before} round trips, batch size {args.batch_size})")
+    print(f"Speedup:    {sequential / batched if batched else float('inf'):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: history index build, incremental refresh and draft-context lookup latency
+Usage: python benchmarks/bench_history.py [--files 20000] [--lookups 200] [--budget 800]
+Fills a temporary vault like bench_vault_index.py (plus a handbook), indexes it,
+refreshes with no changes and with 100 edited files, then times context_for()
+for random senders and reports p50/p95 lookup latency.
+"""
+
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_vault_index import fill_vault  # noqa: E402
+from history_index import HistoryIndex, FTS5_AVAILABLE  # noqa: E402
+
+HANDBOOK = """# Company Handbook
+Use a warm, professional tone.
+
+## Invoices and Payments
+Invoices are paid net 30. Questions go to finance.
+
+## Meetings
+Offer two time slots of 30 minutes.
+
+## Support
+Acknowledge within one business day and give a ticket number.
+"""
+
+TOPICS = ["invoice overdue payment", "meeting next week", "support ticket login error", "contract renewal terms"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=20000)
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--budget', type=int, default=800, help="context token budget")
+    args = parser.parse_args()
+    if not FTS5_AVAILABLE:
+        sys.exit("SQLite FTS5 is not available in this Python build")
+    logging.disable(logging.INFO)
+    rng = random.Random(11)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        vault = tmp / "vault"
+        fill_vault(vault, args.files)
+        (vault / "Company_Handbook.md").write_text(HANDBOOK, encoding='utf-8')
+        index = HistoryIndex(vault, tmp / "history.sqlite3")
+
+        start = time.perf_counter()
+        index.refresh(force=True)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index.refresh(force=True)
+        idle = time.perf_counter() - start
+
+        files = sorted((vault / "Inbox").glob("EMAIL_*.md"))[:100]
+        for path in files:
+            path.write_text(path.read_text(encoding='utf-8') + "\nEdited.\n", encoding='utf-8')
+        start = time.perf_counter()
+        changed = index.refresh(force=True)
+        incremental = time.perf_counter() - start
+
+        timings, sizes = [], []
+        for _ in range(args.lookups):
+            sender = f"Sender {rng.randrange(300)} <s{rng.randrange(300)}@example.com>"
+            topic = rng.choice(TOPICS)
+            start = time.perf_counter()
+            context = index.context_for(sender, f"Re: {topic}", f"Hello, about the {topic} from last time.",
+                                        budget_tokens=args.budget)
+            timings.append(time.perf_counter() - start)
+            sizes.append(len(context) // 4)
+        index.close()
+
+    timings.sort()
+    print(f"Vault:        {args.files} files")
+    print(f"Full build:   {build:.2f}s ({args.files / build:,.0f} files/s)")
+    print(f"Refresh:      {idle * 1000:,.0f} ms with no changes, {incremental * 1000:,.0f} ms for {changed} edited files")
+    print(f"Lookup:       p50 {statistics.median(timings) * 1000:.2f} ms, "
+          f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:.2f} ms over {args.lookups}")
+    print(f"Context:      {statistics.mean(sizes):.0f} tokens on average (budget {args.budget})")
+
+
+if __name__ == "__main__":
+    main()
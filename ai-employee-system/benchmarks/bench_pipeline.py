@@ -0,0 +1,347 @@
+"""
+Benchmark: end-to-end GmailWatcher + EmailProcessor on fake Gmail and Anthropic backends
+Usage: python benchmarks/bench_pipeline.py [--scenarios cold_start,backlog,trickle,vault_scan]
+       [--gmail-latency 0.05] [--claude-latency 0.4] [--error-rate 0.01] [--concurrency 4]
+       [--json results.json] [--baseline results.json --max-regression 0.25]
+Reports throughput and p50/p99 time-to-file (delivery in the fake mailbox to
+EMAIL_*.md written). With --baseline, exits 1 if any scenario got slower by more
+than --max-regression, so CI can catch regressions.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_gmail import FakeGmailService  # noqa: E402
+from fake_anthropic import FakeAnthropic  # noqa: E402
+from gmail_watcher import GmailWatcher  # noqa: E402
+
+SCENARIOS = ("cold_start", "backlog", "trickle", "vault_scan")
+# Options that do not change what is measured
+IGNORED_ARGS = {"scenarios", "json", "baseline", "max_regression", "verbose"}
+
+VAULT_FILE = """---
+type: email
+from: Sender {i} <sender{i}@example.com>
+subject: Archived question {i}
+received: 2026-01-01T00:00:00
+status: pending
+priority: MEDIUM
+priority_reason: benchmark
+---
+
+## Email Content
+Synthetic vault file {i} for the scan benchmark.
+
+## Actions
+- [ ] Reply to sender
+- [{archive}] Archive
+"""
+
+
+def write_handbook(path: Path, tokens: int):
+    """A synthetic Company_Handbook.md of about `tokens` tokens (the cached prompt prefix)."""
+    sections = []
+    for i in range(max(1, tokens // 60)):
+        sections.append(f"## Policy {i}\nAnswer questions about topic {i} within one business day, "
+                        f"copy the account owner, and never promise dates we cannot keep. Keep replies short.\n")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("# Company Handbook\nUse a warm, professional tone.\n\n" + "\n".join(sections), encoding='utf-8')
+
+
+def percentile(values: list, q: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+class Harness:
+    """One fake mailbox, fake Claude client and watcher in a temporary directory."""
+
+    def __init__(self, args, workdir: Path):
+        self.args = args
+        self.workdir = workdir
+        # Each scenario starts with an empty LLM cache and outbox
+        os.environ['LLM_CACHE_PATH'] = str(workdir / "llm_cache.sqlite3")
+        self.service = FakeGmailService(latency=args.gmail_latency, jitter=args.gmail_latency / 2,
+                                        error_rate=args.error_rate, seed=args.seed)
+        self.claude = FakeAnthropic(latency=args.claude_latency, jitter=args.claude_latency / 2,
+                                    error_rate=args.error_rate, seed=args.seed) if args.claude_latency >= 0 else None
+        if args.handbook_tokens:
+            write_handbook(workdir / "vault" / "Company_Handbook.md", args.handbook_tokens)
+        self.watcher = None
+        self.time_to_file = []
+        self._filed = set()
+        self.folded = 0
+        self._lock = threading.Lock()
+
+    def create_watcher(self) -> GmailWatcher:
+        watcher = GmailWatcher(str(self.workdir / "vault"), token_path='unused.json',
+                               service=self.service, state_dir=str(self.workdir / "state"))
+        if watcher.processor:
+            watcher.processor.client = self.claude
+        if watcher.batcher is not None:
+            watcher.batcher.client = self.claude
+        write = watcher.write_action_file
+
+        def timed_write(email, processed=None, **kwargs):
+            path = write(email, processed, **kwargs)
+            self._record_filed(email['message_id'])
+            return path
+
+        fold = watcher._fold_duplicate
+
+        def timed_fold(email, priority):
+            # A folded near-duplicate is filed too: it is listed in its group's vault entry
+            folded = fold(email, priority)
+            if folded:
+                self.folded += 1
+                self._record_filed(email['message_id'])
+            return folded
+
+        watcher.write_action_file = timed_write
+        watcher._fold_duplicate = timed_fold
+        self.watcher = watcher
+        return watcher
+
+    def _record_filed(self, message_id: str):
+        delivered = self.service.delivered_at.get(message_id)
+        with self._lock:
+            if delivered is not None and message_id not in self._filed:
+                self._filed.add(message_id)
+                self.time_to_file.append(time.monotonic() - delivered)
+
+    @property
+    def filed(self) -> int:
+        with self._lock:
+            return len(self._filed)
+
+    def poll_until(self, expected: int, max_polls: int = 50):
+        """Poll until `expected` emails are filed (failed fetches retry on the next poll)."""
+        for _ in range(max_polls):
+            try:
+                self.watcher.run_once()
+            except Exception as e:
+                logging.getLogger('Benchmark').warning(f"poll failed: {e}")
+            if self.filed >= expected:
+                return
+
+    def result(self, scenario: str, seconds: float, count: int, **extra) -> dict:
+        result = {
+            "scenario": scenario,
+            "messages": count,
+            "seconds": round(seconds, 3),
+            "per_minute": round(count / seconds * 60, 1) if seconds else None,
+            "p50_ttf": percentile(self.time_to_file, 0.50),
+            "p99_ttf": percentile(self.time_to_file, 0.99),
+            "gmail_round_trips": self.service.round_trips,
+            "gmail_errors": self.service.errors,
+            "claude_calls": self.claude.calls if self.claude else 0,
+            "folded": self.folded,
+            "claude_errors": self.claude.errors if self.claude else 0,
+            "claude_input_tokens": self.claude.input_tokens if self.claude else 0,
+            "claude_cache_read_tokens": self.claude.cache_read_tokens if self.claude else 0,
+            "claude_cache_write_tokens": self.claude.cache_creation_tokens if self.claude else 0,
+        }
+        result.update(extra)
+        return result
+
+
+def cold_start(args, workdir: Path) -> dict:
+    """Empty state, N unread messages already waiting: full sync then process everything."""
+    harness = Harness(args, workdir)
+    harness.service.populate(args.cold_messages)
+    start = time.perf_counter()
+    watcher = harness.create_watcher()
+    harness.poll_until(args.cold_messages)
+    watcher.stop()
+    return harness.result("cold_start", time.perf_counter() - start, harness.filed)
+
+
+def backlog(args, workdir: Path) -> dict:
+    """A synced watcher comes back to a large backlog (e.g. after an outage)."""
+    harness = Harness(args, workdir)
+    watcher = harness.create_watcher()
+    watcher.run_once()  # Establishes the historyId cursor
+    harness.service.populate(args.backlog_messages)
+    start = time.perf_counter()
+    harness.poll_until(args.backlog_messages)
+    watcher.stop()
+    return harness.result("backlog", time.perf_counter() - start, harness.filed)
+
+
+def trickle(args, workdir: Path) -> dict:
+    """Steady arrivals while the watcher polls on its interval; time-to-file includes the poll wait."""
+    harness = Harness(args, workdir)
+    watcher = harness.create_watcher()
+    watcher.run_once()
+    total = int(args.trickle_rate * args.trickle_seconds)
+
+    def deliver():
+        for i in range(total):
+            harness.service.populate(1, seed=args.seed + i)
+            time.sleep(1 / args.trickle_rate)
+
+    sender = threading.Thread(target=deliver, daemon=True)
+    start = time.perf_counter()
+    sender.start()
+    while sender.is_alive() or harness.filed < total:
+        poll_started = time.monotonic()
+        try:
+            watcher.run_once()
+        except Exception as e:
+            logging.getLogger('Benchmark').warning(f"poll failed: {e}")
+        if time.perf_counter() - start > args.trickle_seconds * 3 + 30:
+            break  # Give up on messages lost to injected errors
+        time.sleep(max(0.0, args.poll_interval - (time.monotonic() - poll_started)))
+    watcher.stop()
+    return harness.result("trickle", time.perf_counter() - start, harness.filed)
+
+
+def vault_scan(args, workdir: Path) -> dict:
+    """A vault with many EMAIL_*.md files: first full scan, an idle rescan, and a rescan after edits."""
+    harness = Harness(args, workdir)
+    inbox = workdir / "vault" / "Inbox"
+    inbox.mkdir(parents=True)
+    # Already-read mail in the fake mailbox, so archiving the edited files succeeds
+    ids = [harness.service.deliver(f"Sender {i} <sender{i}@example.com>", f"Archived question {i}", unread=False)
+           for i in range(args.vault_files)]
+    for i, message_id in enumerate(ids):
+        (inbox / f"EMAIL_{message_id}.md").write_text(VAULT_FILE.format(i=i, archive=' '), encoding='utf-8')
+
+    start = time.perf_counter()
+    watcher = harness.create_watcher()
+    startup = time.perf_counter() - start
+
+    phases = {"startup": startup}
+    started = time.perf_counter()
+    watcher.scan_for_checkbox_triggers()
+    phases["first_scan"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    watcher.scan_for_checkbox_triggers()
+    phases["idle_scan"] = time.perf_counter() - started
+
+    # A handful of files edited in Obsidian (Archive checked)
+    time.sleep(0.01)
+    for i in range(0, args.vault_files, max(1, args.vault_files // 10)):
+        (inbox / f"EMAIL_{ids[i]}.md").write_text(VAULT_FILE.format(i=i, archive='x'), encoding='utf-8')
+    started = time.perf_counter()
+    watcher.scan_for_checkbox_triggers()
+    watcher.flush_label_ops()
+    phases["changed_scan"] = time.perf_counter() - started
+
+    if watcher.processor:
+        started = time.perf_counter()
+        watcher.processor._scan_folder_counts()
+        phases["dashboard_reconcile"] = time.perf_counter() - started
+    watcher.stop()
+
+    return harness.result(
+        "vault_scan", phases["first_scan"], args.vault_files,
+        **{f"{name}_seconds": round(value, 4) for name, value in phases.items()}
+    )
+
+
+def compare(results: list, args, baseline_path: str, max_regression: float) -> list:
+    """Scenarios whose throughput fell, or p99 time-to-file rose, by more than max_regression."""
+    data = json.loads(Path(baseline_path).read_text(encoding='utf-8'))
+    baseline = {r["scenario"]: r for r in data["results"]}
+    regressions = []
+    if {k: v for k, v in data.get("args", {}).items() if k not in IGNORED_ARGS} != \
+            {k: v for k, v in vars(args).items() if k not in IGNORED_ARGS}:
+        print("Note: the baseline was run with different options; numbers may not be comparable")
+    for result in results:
+        before = baseline.get(result["scenario"])
+        if not before:
+            continue
+        if before.get("per_minute") and result["per_minute"] is not None \
+                and result["per_minute"] < before["per_minute"] * (1 - max_regression):
+            regressions.append(f"{result['scenario']}: {result['per_minute']}/min vs {before['per_minute']}/min")
+        if before.get("p99_ttf") and result["p99_ttf"] is not None \
+                and result["p99_ttf"] > before["p99_ttf"] * (1 + max_regression):
+            regressions.append(f"{result['scenario']}: p99 {result['p99_ttf']:.2f}s vs {before['p99_ttf']:.2f}s")
+    return regressions
+
+
+def report(results: list):
+    print(f"{'Scenario':<12} {'Msgs':>6} {'Seconds':>8} {'Per min':>9} {'p50 TTF':>8} {'p99 TTF':>8}"
+          f" {'Gmail RT':>9} {'Claude':>7} {'Errors':>7}")
+    for r in results:
+        ttf = lambda v: f"{v:.2f}s" if v is not None else "-"  # noqa: E731
+        print(f"{r['scenario']:<12} {r['messages']:>6} {r['seconds']:>8.2f} {r['per_minute'] or 0:>9.0f}"
+              f" {ttf(r['p50_ttf']):>8} {ttf(r['p99_ttf']):>8} {r['gmail_round_trips']:>9}"
+              f" {r['claude_calls']:>7} {r['gmail_errors'] + r['claude_errors']:>7}")
+        phases = {k: v for k, v in r.items() if k.endswith('_seconds')}
+        if phases:
+            print("             " + ", ".join(f"{k[:-8]} {v:.3f}s" for k, v in phases.items()))
+        if r.get('claude_calls'):
+            print(f"             tokens: input {r['claude_input_tokens']}, cache read {r['claude_cache_read_tokens']},"
+                  f" cache write {r['claude_cache_write_tokens']}")
+        if r.get('folded'):
+            print(f"             {r['folded']} near-duplicate(s) folded into an earlier entry")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', default=",".join(SCENARIOS))
+    parser.add_argument('--gmail-latency', type=float, default=0.05, help="Seconds per Gmail round trip")
+    parser.add_argument('--claude-latency', type=float, default=0.4,
+                        help="Seconds per Claude call (negative: no Claude client, rules only)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of fake API calls that fail")
+    parser.add_argument('--concurrency', type=int, default=4, help="PROCESSOR_CONCURRENCY")
+    parser.add_argument('--cold-messages', type=int, default=200)
+    parser.add_argument('--backlog-messages', type=int, default=1000)
+    parser.add_argument('--trickle-rate', type=float, default=2.0, help="Messages per second")
+    parser.add_argument('--trickle-seconds', type=float, default=10.0)
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    parser.add_argument('--vault-files', type=int, default=10000)
+    parser.add_argument('--handbook-tokens', type=int, default=2000,
+                        help="Size of the synthetic Company_Handbook.md (0 = none)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help="Write results to this file")
+    parser.add_argument('--baseline', help="Compare against a previous --json file")
+    parser.add_argument('--max-regression', type=float, default=0.25)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.ERROR)  # Injected errors are counted in the report instead
+    os.environ.update(
+        VAULT_WATCH_MODE='poll',
+        PROCESSOR_CONCURRENCY=str(args.concurrency),
+        ANTHROPIC_REQUESTS_PER_MINUTE=os.getenv('ANTHROPIC_REQUESTS_PER_MINUTE', '100000'),
+        ANTHROPIC_BURST=os.getenv('ANTHROPIC_BURST', str(max(5, args.concurrency))),
+        LOCAL_CLASSIFIER_ENABLED='0',
+        GMAIL_PUSH_ENABLED='0',
+    )
+
+    results = []
+    for name in args.scenarios.split(","):
+        name = name.strip()
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+        with tempfile.TemporaryDirectory() as workdir:
+            results.append(globals()[name](args, Path(workdir)))
+
+    report(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps({"args": vars(args), "results": results}, indent=2), encoding='utf-8')
+    if args.baseline:
+        regressions = compare(results, args, args.baseline, args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
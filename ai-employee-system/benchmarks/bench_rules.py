@@ -0,0 +1,89 @@
+"""
+Benchmark: rule-based classification throughput on synthetic email
+Usage: python benchmarks/bench_rules.py [--emails 100000] [--extra-rules 200]
+Compares the compiled RuleEngine against a naive per-rule substring scan.
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rule_engine import DEFAULT_RULES, RuleSet  # noqa: E402
+
+WORDS = (
+    "project update meeting report invoice order shipment review draft plan team "
+    "budget schedule call notes follow thanks please attached account status week "
+    "customer service delivery payment receipt login security alert build release"
+).split()
+KEYWORDS = ["urgent", "asap", "newsletter", "unsubscribe", "question", "help", "deadline"]
+SENDERS = ["alice@example.com", "noreply@github.com", "Muniya <muniya@example.com>",
+           "news@marketing.shop.com", "bob@client.io", "mailer-daemon@google.com"]
+
+
+def synthetic_emails(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    for _ in range(count):
+        words = rng.choices(WORDS, k=30)
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), rng.choice(KEYWORDS))
+        yield rng.choice(SENDERS), ' '.join(words[:6]).title(), ' '.join(words[6:])
+
+
+def build_spec(extra_rules: int, seed: int = 7) -> dict:
+    """Default rules plus `extra_rules` generated keyword/domain rules (placed first)."""
+    rng = random.Random(seed)
+    generated = [
+        {
+            "name": f"generated-{i}",
+            "priority": rng.choice(["HIGH", "MEDIUM", "LOW"]),
+            "keywords": [f"kw{i}x{j}" for j in range(10)],
+            "domains": [f"vendor{i}.com"],
+        }
+        for i in range(extra_rules)
+    ]
+    return {"rules": generated + DEFAULT_RULES["rules"], "default": DEFAULT_RULES["default"]}
+
+
+def naive_classify(spec: dict, email_from: str, subject: str, content: str) -> str:
+    """Per-rule `in` scans, the way the original hardcoded fallback worked."""
+    text = f"{subject} {content}".lower()
+    email_lower = email_from.lower()
+    for rule in spec["rules"]:
+        if any(kw in text for kw in rule.get("keywords", [])):
+            return rule["priority"]
+        if any(s in email_lower for s in rule.get("senders", [])):
+            return rule["priority"]
+        if any(email_lower.endswith(d) or f"@{d}" in email_lower for d in rule.get("domains", [])):
+            return rule["priority"]
+    return spec["default"]["priority"]
+
+
+def run(label: str, func, emails: list):
+    start = time.perf_counter()
+    for email in emails:
+        func(*email)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<10} {len(emails) / elapsed:>12,.0f} emails/s  ({elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--emails', type=int, default=100000)
+    parser.add_argument('--extra-rules', type=int, default=200)
+    args = parser.parse_args()
+
+    emails = list(synthetic_emails(args.emails))
+    for extra in sorted({0, args.extra_rules}):
+        spec = build_spec(extra)
+        ruleset = RuleSet(spec)
+        print(f"{len(spec['rules'])} rules, {len(emails):,} emails:")
+        run("compiled", ruleset.match, emails)
+        run("naive", lambda f, s, c: naive_classify(spec, f, s, c), emails)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: vault frontmatter index vs reading every markdown file
+Usage: python benchmarks/bench_vault_index.py [--files 20000] [--repeat 20]
+Fills a temporary vault (Inbox, Pending_Approval and a month-sharded Done/),
+then answers "pending HIGH items older than 4h" by parsing every file's
+frontmatter and from the SQLite index, and reports the rebuild time.
+"""
+
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from datetime import datetime, timedelta
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from action_files import render_action_file, done_folder_for  # noqa: E402
+from frontmatter import parse_frontmatter  # noqa: E402
+from vault_index import VaultIndex, VAULT_FOLDERS  # noqa: E402
+
+PRIORITIES = ("URGENT", "HIGH", "MEDIUM", "LOW")
+
+
+def fill_vault(vault: Path, count: int, seed: int = 5):
+    rng = random.Random(seed)
+    now = datetime.now()
+    for i in range(count):
+        received = (now - timedelta(minutes=rng.randint(0, 60 * 24 * 400))).isoformat()
+        email = {'email_from': f"Sender {i % 300} <s{i % 300}@example.com>", 'subject': f"Subject {i}",
+                 'content': "Lorem ipsum " * 30, 'message_id': f"m{i:08d}"}
+        processed = {'priority': rng.choice(PRIORITIES), 'reason': "benchmark", 'draft': ""}
+        roll = rng.random()
+        if roll < 0.1:
+            folder = vault / "Inbox"
+        elif roll < 0.15:
+            folder = vault / "Pending_Approval"
+        else:
+            folder = done_folder_for(vault, received, 'month')
+        folder.mkdir(parents=True, exist_ok=True)
+        content = render_action_file(email, processed, received=received)
+        if roll >= 0.15:
+            content = content.replace("status: pending", "status: archived", 1)
+        (folder / f"EMAIL_{email['message_id']}.md").write_text(content, encoding='utf-8')
+
+
+def scan_files(vault: Path, cutoff: float) -> list:
+    """The query without an index: read every file's frontmatter."""
+    rows = []
+    for name in VAULT_FOLDERS:
+        for path in (vault / name).rglob("EMAIL_*.md"):
+            fields = parse_frontmatter(path.read_text(encoding='utf-8'))
+            if fields.get('status') == 'pending' and fields.get('priority') == 'HIGH' \
+                    and datetime.fromisoformat(fields['received']).timestamp() <= cutoff:
+                rows.append(path)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        vault = tmp / "vault"
+        fill_vault(vault, args.files)
+        index = VaultIndex(vault, tmp / "index.sqlite3")
+
+        start = time.perf_counter()
+        index.rebuild()
+        rebuild = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scanned = scan_files(vault, time.time() - 4 * 3600)
+        scan = time.perf_counter() - start
+
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            rows = index.query(status='pending', priority='HIGH', older_than=4 * 3600)
+            timings.append(time.perf_counter() - start)
+        index.close()
+
+    print(f"Vault:      {args.files} files")
+    print(f"Rebuild:    {rebuild:.2f}s ({args.files / rebuild:,.0f} files/s)")
+    print(f"File scan:  {scan * 1000:,.1f} ms ({len(scanned)} matches)")
+    print(f"Index:      {statistics.median(timings) * 1000:.2f} ms median over {args.repeat} "
+          f"({len(rows)} matches)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Fake Anthropic Client - In-process stand-in for `anthropic.Anthropic`
+Implements `client.messages.create(...)` with simulated latency, error rate
+and token usage. Categorization prompts get a keyword-based JSON answer and
+draft/acknowledgment prompts a canned reply, so EmailProcessor can be driven
+end to end without network access or an API key. System blocks marked with
+cache_control are treated like Anthropic prompt caching: a prefix of at least
+MIN_CACHE_TOKENS is reported as cache_creation_input_tokens on first use and
+as cache_read_input_tokens while it stays warm.
+`client.messages.batches` stands in for the Message Batches API: a batch is
+'in_progress' for `batch_delay` seconds, then 'ended' with one result per
+request (errored at `error_rate`), and its tokens are tallied separately
+because batch requests are billed at half price.
+"""
+
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from types import SimpleNamespace
+
+URGENT_WORDS = ("urgent", "asap", "immediately", "outage", "down")
+HIGH_WORDS = ("meeting", "invoice", "contract", "deadline", "client")
+LOW_WORDS = ("newsletter", "unsubscribe", "no-reply", "noreply", "digest", "promotion")
+
+# Prompt caching: shortest cacheable prefix (Sonnet models) and how long an entry stays warm
+MIN_CACHE_TOKENS = 1024
+CACHE_TTL_SECONDS = 300
+
+
+class FakeAnthropicError(Exception):
+    """Raised for injected failures; carries a status_code like anthropic.APIStatusError."""
+
+    def __init__(self, status_code: int = 529, message: str = "Overloaded"):
+        super().__init__(f"Error code: {status_code} - {message}")
+        self.status_code = status_code
+
+
+def _prompt_text(messages: list, system=None) -> str:
+    parts = []
+    for block in ([system] if isinstance(system, str) else system or []) + [m["content"] for m in messages]:
+        if isinstance(block, str):
+            parts.append(block)
+        elif isinstance(block, dict):
+            parts.append(block.get("text", ""))
+        else:
+            parts.extend(item.get("text", "") for item in block if isinstance(item, dict))
+    return "\n".join(parts)
+
+
+def _tokens(text: str) -> int:
+    """Roughly four characters per token, like the real tokenizer on English text."""
+    return max(1, len(re.sub(r"\s+", " ", text)) // 4)
+
+
+def _cached_prefix(system) -> str:
+    """Text of the system blocks up to the last cache_control breakpoint ('' if none)."""
+    if not isinstance(system, list):
+        return ""
+    marked = [i for i, block in enumerate(system) if isinstance(block, dict) and block.get("cache_control")]
+    if not marked:
+        return ""
+    return "\n".join(block.get("text", "") for block in system[:marked[-1] + 1])
+
+
+def fake_priority(text: str) -> str:
+    """Keyword guess at a priority, standing in for the model's judgement."""
+    email = text.rsplit("Email:", 1)[-1].lower()
+    if any(word in email for word in URGENT_WORDS):
+        return "URGENT"
+    if any(word in email for word in LOW_WORDS):
+        return "LOW"
+    if any(word in email for word in HIGH_WORDS):
+        return "HIGH"
+    return "MEDIUM"
+
+
+class _Batches:
+    """In-process Message Batches endpoint: create, retrieve, results and cancel."""
+
+    def __init__(self, client):
+        self.client = client
+        self._batches = {}  # batch id -> {"requests", "created", "canceled", "results"}
+        self._lock = threading.Lock()
+
+    def create(self, requests: list, **kwargs):
+        if not requests:
+            raise FakeAnthropicError(400, "requests: at least one request is required")
+        custom_ids = [request["custom_id"] for request in requests]
+        if len(set(custom_ids)) != len(custom_ids):
+            raise FakeAnthropicError(400, "requests: custom_id values must be unique")
+        with self._lock:
+            batch_id = f"msgbatch_fake_{len(self._batches) + 1:04d}"
+            self._batches[batch_id] = {"requests": list(requests), "created": time.monotonic(),
+                                       "canceled": False, "results": None}
+        with self.client._lock:
+            self.client.batch_calls += 1
+            self.client.batch_requests += len(requests)
+        return self.retrieve(batch_id)
+
+    def _get(self, batch_id: str) -> dict:
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            raise FakeAnthropicError(404, f"batch {batch_id} not found")
+        return batch
+
+    def _ended(self, batch: dict) -> bool:
+        return batch["canceled"] or time.monotonic() - batch["created"] >= self.client.batch_delay
+
+    def retrieve(self, batch_id: str):
+        with self._lock:
+            batch = self._get(batch_id)
+            ended = self._ended(batch)
+            if ended and batch["results"] is None:
+                batch["results"] = [self._run(request, batch["canceled"]) for request in batch["requests"]]
+            counts = {kind: 0 for kind in ("processing", "succeeded", "errored", "canceled", "expired")}
+            if ended:
+                for entry in batch["results"]:
+                    counts[entry.result.type] += 1
+            else:
+                counts["processing"] = len(batch["requests"])
+        return SimpleNamespace(
+            id=batch_id,
+            type="message_batch",
+            processing_status="ended" if ended else "in_progress",
+            request_counts=SimpleNamespace(**counts),
+        )
+
+    def results(self, batch_id: str):
+        if self.retrieve(batch_id).processing_status != "ended":
+            raise FakeAnthropicError(400, f"batch {batch_id} is still processing")
+        return iter(self._batches[batch_id]["results"])
+
+    def cancel(self, batch_id: str):
+        with self._lock:
+            self._get(batch_id)["canceled"] = True
+        return self.retrieve(batch_id)
+
+    def _run(self, request: dict, canceled: bool):
+        if canceled:
+            result = SimpleNamespace(type="canceled")
+        elif self.client._random.random() < self.client.error_rate:
+            result = SimpleNamespace(type="errored", error=SimpleNamespace(type="overloaded_error"))
+        else:
+            params = request["params"]
+            message = self.client._respond(params["model"], params["max_tokens"], params["messages"],
+                                           params.get("system"), batch=True)
+            result = SimpleNamespace(type="succeeded", message=message)
+        return SimpleNamespace(custom_id=request["custom_id"], result=result)
+
+
+class _Messages:
+    def __init__(self, client):
+        self.client = client
+        self.batches = _Batches(client)
+
+    def create(self, model: str, max_tokens: int, messages: list, system=None, **kwargs):
+        return self.client._create(model, max_tokens, messages, system)
+
+
+class FakeAnthropic:
+    """Thread-safe fake client; `calls`, `errors` and token totals are kept for reports."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 1,
+                 batch_delay: float = 0.0):
+        self.latency = latency          # Seconds per call
+        self.jitter = jitter            # Up to this many extra seconds, uniformly
+        self.error_rate = error_rate    # Share of calls (and batch requests) failing with a 529 Overloaded
+        self.batch_delay = batch_delay  # Seconds a Message Batch stays in_progress
+        self.messages = _Messages(self)
+        self.calls = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
+        self.batch_calls = 0            # messages.batches.create calls
+        self.batch_requests = 0         # Requests submitted in batches
+        self.batch_input_tokens = 0     # Tokens of batch requests (billed at 50%), also in the totals
+        self.batch_output_tokens = 0
+        self.batch_cache_read_tokens = 0
+        self.batch_cache_creation_tokens = 0
+        self._prompt_cache = {}  # prefix hash -> expiry time
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _create(self, model: str, max_tokens: int, messages: list, system):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.errors += 1
+            raise FakeAnthropicError()
+        return self._respond(model, max_tokens, messages, system)
+
+    def _respond(self, model: str, max_tokens: int, messages: list, system, batch: bool = False):
+        prompt = _prompt_text(messages, system)
+        if "valid JSON" in prompt:
+            priority = fake_priority(prompt)
+            result = {
+                "priority": priority,
+                "reason": "fake model keyword match",
+                "needs_response": priority != "LOW",
+                "suggested_action": "Review and respond" if priority != "LOW" else "Review when available",
+                "auto_reply": False,
+            }
+            if '"draft"' in prompt:
+                result["draft"] = "Thanks - I'm on it and will follow up shortly." if priority in ("URGENT", "HIGH") else None
+            text = json.dumps(result)
+        else:
+            text = "Thank you for your email. I'll review this and get back to you shortly."
+
+        input_tokens = _tokens(prompt)
+        output_tokens = min(max_tokens, max(1, len(text) // 4))
+        cache_read = cache_creation = 0
+        prefix = _cached_prefix(system)
+        with self._lock:
+            if prefix and _tokens(prefix) >= MIN_CACHE_TOKENS:
+                key = hashlib.sha256(f"{model}\x1f{prefix}".encode("utf-8")).hexdigest()
+                now = time.monotonic()
+                if self._prompt_cache.get(key, 0) > now:
+                    cache_read = _tokens(prefix)
+                else:
+                    cache_creation = _tokens(prefix)
+                self._prompt_cache[key] = now + CACHE_TTL_SECONDS
+                input_tokens = max(1, input_tokens - cache_read - cache_creation)
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.cache_read_tokens += cache_read
+            self.cache_creation_tokens += cache_creation
+            if batch:
+                self.batch_input_tokens += input_tokens
+                self.batch_output_tokens += output_tokens
+                self.batch_cache_read_tokens += cache_read
+                self.batch_cache_creation_tokens += cache_creation
+        return SimpleNamespace(
+            id=f"msg_fake_{self.calls}",
+            model=model,
+            content=[SimpleNamespace(type="text", text=text)],
+            usage=SimpleNamespace(
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cache_read_input_tokens=cache_read,
+                cache_creation_input_tokens=cache_creation,
+            ),
+            stop_reason="end_turn",
+        )
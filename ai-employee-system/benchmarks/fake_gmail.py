@@ -0,0 +1,272 @@
+"""
+Fake Gmail Service - In-process stand-in for the googleapiclient Gmail resource
+Mimics the chained `service.users().messages().get(...).execute()` API so
+GmailWatcher can be driven without a Google connection.
+"""
+
+import time
+import random
+import itertools
+import threading
+from googleapiclient.errors import HttpError
+
+
+class _FakeResponse(dict):
+    """Minimal httplib2-style response object for HttpError."""
+
+    def __init__(self, status: int, reason: str = ''):
+        super().__init__({'status': str(status)})
+        self.status = status
+        self.reason = reason
+
+
+class _Request:
+    """A deferred call; `execute()` performs one simulated HTTP round trip."""
+
+    def __init__(self, service, method: str, func):
+        self.service = service
+        self.method = method
+        self.func = func
+
+    def execute(self):
+        self.service._round_trip(self.method)
+        return self.func()
+
+
+class FakeBatch:
+    """Stand-in for BatchHttpRequest: many sub-requests, one round trip."""
+
+    def __init__(self, service, callback=None):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        if request_id is None:
+            request_id = str(len(self.requests) + 1)
+        self.requests.append((request_id, request, callback or self.callback))
+
+    def execute(self):
+        self.service._round_trip('batch')
+        for request_id, request, callback in self.requests:
+            self.service.calls[request.method] = self.service.calls.get(request.method, 0) + 1
+            try:
+                self.service._maybe_fail()
+                response, exception = request.func(), None
+            except HttpError as e:
+                response, exception = None, e
+            if callback:
+                callback(request_id, response, exception)
+
+
+class _Resource:
+    """Exposes the bound methods under attribute access, like discovery resources."""
+
+    def __init__(self, **methods):
+        self.__dict__.update(methods)
+
+
+class FakeGmailService:
+    """In-memory mailbox with history records, pagination, latency and error simulation."""
+
+    def __init__(self, latency: float = 0.0, page_size: int = 100, jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 1):
+        self.latency = latency
+        self.page_size = page_size
+        self.jitter = jitter          # Up to this many extra seconds per round trip
+        self.error_rate = error_rate  # Share of requests failing with a transient 503
+        self.errors = 0
+        self.delivered_at = {}        # message id -> time.monotonic() at delivery
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.messages = {}
+        self.history = []
+        self.history_id = 1000
+        self.oldest_history_id = self.history_id
+        self.sent = []
+        self.calls = {}
+        self.round_trips = 0
+        self.subscribers = []  # Called as f(email_address, history_id) on each change (see fake_pubsub.py)
+        self.watch_requests = []
+        self._ids = itertools.count(1)
+
+    # -- Mailbox setup ----------------------------------------------------
+
+    def deliver(self, email_from: str, subject: str, snippet: str = '', unread: bool = True,
+                headers: dict = None) -> str:
+        """Add a message to the mailbox and record a messageAdded history entry."""
+        message_id = f"{next(self._ids):016x}"
+        self.delivered_at[message_id] = time.monotonic()
+        self.history_id += 1
+        labels = ['INBOX'] + (['UNREAD'] if unread else [])
+        self.messages[message_id] = {
+            'id': message_id,
+            'threadId': message_id,
+            'labelIds': labels,
+            'snippet': snippet,
+            'historyId': str(self.history_id),
+            'headers': [
+                {'name': 'From', 'value': email_from},
+                {'name': 'Subject', 'value': subject},
+            ] + [{'name': name, 'value': value} for name, value in (headers or {}).items()],
+        }
+        self.history.append({
+            'id': str(self.history_id),
+            'messagesAdded': [{'message': {'id': message_id, 'threadId': message_id, 'labelIds': list(labels)}}],
+        })
+        for subscriber in self.subscribers:
+            subscriber('me@example.com', self.history_id)
+        return message_id
+
+    def populate(self, count: int, seed: int = 7) -> list:
+        """Deliver `count` synthetic messages (a mix of urgent, work and bulk mail)."""
+        rng = random.Random(seed)
+        kinds = [
+            (0.05, "Ops <ops@example.com>", "URGENT: production down #{i}", "Please look at this asap"),
+            (0.25, "Client {n} <client{n}@example.com>", "Contract review meeting {i}", "Can we meet about the invoice?"),
+            (0.30, "Colleague {n} <person{n}@example.com>", "Question about project {i}", "Quick question when you have time"),
+            (0.40, "News <newsletter@shop.example>", "Weekly newsletter {i}", "Deals inside - unsubscribe here"),
+        ]
+        ids = []
+        for i in range(count):
+            roll, total = rng.random(), 0.0
+            for share, sender, subject, snippet in kinds:
+                total += share
+                if roll < total:
+                    break
+            n = rng.randrange(50)
+            ids.append(self.deliver(sender.format(n=n), subject.format(i=i), snippet))
+        return ids
+
+    def expire_history(self):
+        """Drop all history records, as Gmail does after roughly a week."""
+        self.history = []
+        self.oldest_history_id = self.history_id
+
+    # -- googleapiclient surface ------------------------------------------
+
+    def users(self):
+        return _Resource(
+            messages=lambda: _Resource(
+                list=self._list,
+                get=self._get,
+                send=self._send,
+                modify=self._modify,
+                batchModify=self._batch_modify,
+            ),
+            history=lambda: _Resource(list=self._history_list),
+            getProfile=lambda userId: _Request(self, 'getProfile', lambda: {
+                'emailAddress': 'me@example.com',
+                'historyId': str(self.history_id),
+            }),
+            watch=self._watch,
+        )
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+    def _round_trip(self, method: str):
+        with self._lock:
+            self.round_trips += 1
+            if method != 'batch':
+                self.calls[method] = self.calls.get(method, 0) + 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if method != 'batch':
+            self._maybe_fail()
+
+    def _maybe_fail(self):
+        """Raise a transient 503 for `error_rate` of requests."""
+        if not self.error_rate:
+            return
+        with self._lock:
+            fail = self._random.random() < self.error_rate
+            self.errors += fail
+        if fail:
+            raise HttpError(_FakeResponse(503, 'Service Unavailable'), b'{"error": "backendError"}')
+
+    def _page(self, items: list, page_token, max_results):
+        start = int(page_token or 0)
+        size = min(max_results or self.page_size, self.page_size)
+        page = items[start:start + size]
+        next_token = str(start + size) if start + size < len(items) else None
+        return page, next_token
+
+    def _list(self, userId, q=None, pageToken=None, maxResults=None, **kwargs):
+        def run():
+            unread = [
+                {'id': m['id'], 'threadId': m['threadId']}
+                for m in reversed(list(self.messages.values()))
+                if q != 'is:unread' or 'UNREAD' in m['labelIds']
+            ]
+            page, next_token = self._page(unread, pageToken, maxResults)
+            result = {'messages': page, 'resultSizeEstimate': len(unread)}
+            if next_token:
+                result['nextPageToken'] = next_token
+            return result
+        return _Request(self, 'list', run)
+
+    def _get(self, userId, id, format='full', metadataHeaders=None, **kwargs):
+        def run():
+            if id not in self.messages:
+                raise HttpError(_FakeResponse(404, 'Not Found'), b'{}')
+            message = self.messages[id]
+            headers = message['headers']
+            if format == 'metadata' and metadataHeaders:
+                headers = [h for h in headers if h['name'] in metadataHeaders]
+            return {
+                'id': message['id'],
+                'threadId': message['threadId'],
+                'labelIds': list(message['labelIds']),
+                'snippet': message['snippet'],
+                'historyId': message['historyId'],
+                'payload': {'headers': headers},
+            }
+        return _Request(self, 'get', run)
+
+    def _history_list(self, userId, startHistoryId, historyTypes=None, pageToken=None, **kwargs):
+        def run():
+            if int(startHistoryId) < self.oldest_history_id:
+                raise HttpError(_FakeResponse(404, 'Not Found'), b'{}')
+            records = [r for r in self.history if int(r['id']) > int(startHistoryId)]
+            page, next_token = self._page(records, pageToken, None)
+            result = {'history': page, 'historyId': str(self.history_id)}
+            if next_token:
+                result['nextPageToken'] = next_token
+            return result
+        return _Request(self, 'history', run)
+
+    def _watch(self, userId, body):
+        def run():
+            self.watch_requests.append(body)
+            return {'historyId': str(self.history_id), 'expiration': str(int((time.time() + 7 * 86400) * 1000))}
+        return _Request(self, 'watch', run)
+
+    def _send(self, userId, body):
+        def run():
+            self.sent.append(body)
+            return {'id': f"sent{len(self.sent)}", 'labelIds': ['SENT']}
+        return _Request(self, 'send', run)
+
+    def _apply_labels(self, message_id, add, remove):
+        if message_id not in self.messages:
+            raise HttpError(_FakeResponse(404, 'Not Found'), b'{}')
+        labels = self.messages[message_id]['labelIds']
+        labels[:] = [l for l in labels if l not in remove] + [l for l in add if l not in labels]
+
+    def _modify(self, userId, id, body):
+        def run():
+            self._apply_labels(id, body.get('addLabelIds', []), body.get('removeLabelIds', []))
+            return {'id': id, 'labelIds': list(self.messages[id]['labelIds'])}
+        return _Request(self, 'modify', run)
+
+    def _batch_modify(self, userId, body):
+        def run():
+            # Like Gmail, an unknown ID rejects the whole request
+            if any(message_id not in self.messages for message_id in body.get('ids', [])):
+                raise HttpError(_FakeResponse(400, 'Bad Request'), b'{"error": "Invalid id value"}')
+            for message_id in body.get('ids', []):
+                self._apply_labels(message_id, body.get('addLabelIds', []), body.get('removeLabelIds', []))
+            return {}
+        return _Request(self, 'batchModify', run)
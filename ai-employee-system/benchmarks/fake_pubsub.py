@@ -0,0 +1,80 @@
+"""
+Fake Pub/Sub Publisher - Posts Gmail-style push notifications to a local receiver
+Wraps the JSON {"emailAddress", "historyId"} notification in a Pub/Sub push
+envelope, exactly as a push subscription would, without any Google connection.
+
+Usage:
+    python benchmarks/fake_pubsub.py --url http://127.0.0.1:8085/gmail/push --history-id 12345
+"""
+
+import json
+import time
+import base64
+import argparse
+import itertools
+import threading
+import urllib.request
+from datetime import datetime, timezone
+
+
+class FakePublisher:
+    """Publishes push envelopes to `url`; can subscribe to a FakeGmailService."""
+
+    def __init__(self, url: str, subscription: str = "projects/fake/subscriptions/gmail-push",
+                 delay: float = 0.0, duplicate: bool = False):
+        self.url = url
+        self.subscription = subscription
+        self.delay = delay          # Simulated Pub/Sub delivery latency
+        self.duplicate = duplicate  # Deliver every notification twice (at-least-once)
+        self.published = 0
+        self.failures = 0
+        self._ids = itertools.count(1)
+
+    def envelope(self, email_address: str, history_id: int) -> dict:
+        data = json.dumps({"emailAddress": email_address, "historyId": history_id}).encode('utf-8')
+        return {
+            "message": {
+                "data": base64.b64encode(data).decode('ascii'),
+                "messageId": str(next(self._ids)),
+                "publishTime": datetime.now(timezone.utc).isoformat(),
+            },
+            "subscription": self.subscription,
+        }
+
+    def publish(self, email_address: str, history_id: int) -> int:
+        """POST one notification; returns the HTTP status."""
+        body = json.dumps(self.envelope(email_address, history_id)).encode('utf-8')
+        status = 0
+        for _ in range(2 if self.duplicate else 1):
+            request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+                self.failures += 1
+            self.published += 1
+        return status
+
+    def attach(self, service):
+        """Publish (in the background) whenever the fake mailbox changes."""
+        def on_change(email_address, history_id):
+            def send():
+                if self.delay:
+                    time.sleep(self.delay)
+                self.publish(email_address, history_id)
+            threading.Thread(target=send, daemon=True).start()
+        service.subscribers.append(on_change)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a fake Gmail push notification")
+    parser.add_argument("--url", default="http://127.0.0.1:8085/gmail/push")
+    parser.add_argument("--email", default="me@example.com")
+    parser.add_argument("--history-id", type=int, default=int(time.time()))
+    args = parser.parse_args()
+    print(FakePublisher(args.url).publish(args.email, args.history_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Dedup - Streaming near-duplicate detection for incoming email
+Alert storms and mailing-list blasts arrive as many almost identical messages.
+Each email gets a 64-bit SimHash of its subject and snippet; emails from the
+same sender whose fingerprints differ in at most `max_distance` bits are
+folded into the first one (the group leader), which is processed once.
+Candidates are found with LSH bands (split the fingerprint into
+max_distance + 1 bands; near duplicates must share at least one band exactly),
+and groups expire after a sliding time window, so memory stays bounded.
+Only list and automated mail is folded (see is_bulk); short personal mails look
+alike too often ("Thanks!", "Sounds good") to be merged safely.
+"""
+
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import parseaddr
+from work_queue import PRIORITY_RANK
+
+FINGERPRINT_BITS = 64
+
+_WORD = re.compile(r"[a-z0-9]+")
+_DIGITS = re.compile(r"\d+")
+# Local parts of addresses that only send automated mail
+_AUTOMATED_SENDER = re.compile(
+    r"^(no-?reply|do-?not-?reply|mailer-daemon|postmaster|bounces?|alerts?|notifications?|notify|monitoring)\b"
+)
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def features(subject: str, snippet: str) -> dict:
+    """Weighted tokens: subject words count double; numbers (ticket IDs, counts, times) are masked."""
+    weights = {}
+    for text, weight in ((subject, 2), (snippet, 1)):
+        words = _WORD.findall(_DIGITS.sub('0', text.lower()))
+        for word in words:
+            weights[word] = weights.get(word, 0) + weight
+        # Word pairs keep some word order
+        for first, second in zip(words, words[1:]):
+            pair = f"{first} {second}"
+            weights[pair] = weights.get(pair, 0) + weight
+    return weights
+
+
+def simhash(weights: dict) -> int:
+    """64-bit SimHash of weighted tokens."""
+    totals = [0] * FINGERPRINT_BITS
+    for token, weight in weights.items():
+        value = _hash64(token)
+        for bit in range(FINGERPRINT_BITS):
+            totals[bit] += weight if value >> bit & 1 else -weight
+    fingerprint = 0
+    for bit, total in enumerate(totals):
+        if total > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def sender_key(email_from: str) -> str:
+    """Lower-cased address part of a From header."""
+    return (parseaddr(email_from)[1] or email_from).lower()
+
+
+def is_bulk(email: dict) -> bool:
+    """True for mailing-list and automated mail: list headers, bulk Precedence, Auto-Submitted or a no-reply sender."""
+    headers = {name.lower(): str(value).strip().lower() for name, value in (email.get('headers') or {}).items()}
+    if headers.get('list-id') or headers.get('list-unsubscribe'):
+        return True
+    if headers.get('precedence') in ('bulk', 'list', 'junk'):
+        return True
+    if headers.get('auto-submitted', 'no') != 'no':
+        return True
+    return bool(_AUTOMATED_SENDER.match(sender_key(email['email_from']).split('@')[0]))
+
+
+def fingerprint(email: dict) -> int:
+    return simhash(features(email['subject'], email['content']))
+
+
+class NearDuplicateIndex:
+    """LSH index of recent group leaders; thread-safe and bounded in size and age."""
+
+    def __init__(self, window_seconds: float = 3600, max_groups: int = 5000, max_distance: int = 3,
+                 max_members: int = 50):
+        self.window_seconds = window_seconds
+        self.max_groups = max_groups
+        self.max_distance = max_distance
+        self.max_members = max_members  # Member IDs kept per group (the count keeps going)
+        self.bands = max_distance + 1
+        self.band_bits = FINGERPRINT_BITS // self.bands
+        self.groups = OrderedDict()  # leader id -> group dict, least recently active first
+        self._buckets = {}           # (sender, band number, band value) -> set of leader ids
+        self._lock = threading.Lock()
+        self.folded = 0
+
+    def __len__(self):
+        return len(self.groups)
+
+    def _band_keys(self, sender: str, value: int):
+        mask = (1 << self.band_bits) - 1
+        return [(sender, band, value >> (band * self.band_bits) & mask) for band in range(self.bands)]
+
+    def _evict(self, now: float):
+        while self.groups:
+            leader_id, group = next(iter(self.groups.items()))
+            if len(self.groups) <= self.max_groups and now - group['last_seen'] <= self.window_seconds:
+                break
+            self._remove(leader_id)
+
+    def _remove(self, leader_id: str):
+        group = self.groups.pop(leader_id, None)
+        if group is None:
+            return
+        for key in self._band_keys(group['sender'], group['fingerprint']):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(leader_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def match(self, email: dict, priority: str = None, now: float = None):
+        """
+        Return the leader ID of a recent group this email nearly duplicates, or None.
+        On a match the email is added to the group; otherwise it starts a new group.
+        An email never joins a group whose leader was pre-classified as less urgent.
+        """
+        now = time.time() if now is None else now
+        sender = sender_key(email['email_from'])
+        value = fingerprint(email)
+        with self._lock:
+            self._evict(now)
+            if email['message_id'] in self.groups:
+                return None  # Already leads a group (offered again before it was processed)
+            candidates = set()
+            for key in self._band_keys(sender, value):
+                candidates |= self._buckets.get(key, set())
+            best = None
+            for leader_id in candidates:
+                group = self.groups[leader_id]
+                distance = bin(group['fingerprint'] ^ value).count('1')
+                if distance <= self.max_distance and _at_least_as_urgent(group['priority'], priority) \
+                        and (best is None or distance < best[0]):
+                    best = (distance, leader_id)
+            if best is not None:
+                leader_id = best[1]
+                group = self.groups[leader_id]
+                group['count'] += 1
+                group['last_seen'] = now
+                group['members'].append({
+                    'message_id': email['message_id'],
+                    'email_from': email['email_from'],
+                    'subject': email['subject'],
+                })
+                del group['members'][:-self.max_members]
+                self.groups.move_to_end(leader_id)
+                self.folded += 1
+                return leader_id
+
+            self.groups[email['message_id']] = {
+                'sender': sender, 'fingerprint': value, 'priority': priority,
+                'count': 1, 'members': [], 'last_seen': now,
+            }
+            for key in self._band_keys(sender, value):
+                self._buckets.setdefault(key, set()).add(email['message_id'])
+            return None
+
+    def group(self, leader_id: str):
+        """A copy of the group led by `leader_id` (count and recent members), or None."""
+        with self._lock:
+            group = self.groups.get(leader_id)
+            if group is None:
+                return None
+            return {'count': group['count'], 'members': list(group['members'])}
+
+    def forget(self, leader_id: str):
+        """Close a group (e.g. its file was handled); later look-alikes start a new one."""
+        with self._lock:
+            self._remove(leader_id)
+
+
+def _at_least_as_urgent(leader_priority: str, priority: str) -> bool:
+    if leader_priority is None or priority is None:
+        return True
+    return PRIORITY_RANK.get(leader_priority, len(PRIORITY_RANK)) <= PRIORITY_RANK.get(priority, len(PRIORITY_RANK))
@@ -6,12 +6,23 @@ Handles email categorization, draft generation, auto-replies, and notifications.
 import os
 import sys
 import json
+import time
 import base64
+import hashlib
+import threading
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from email.mime.text import MIMEText
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
+from rate_limiter import TokenBucket
+from llm_cache import LLMCache, cache_key
+from rule_engine import RuleEngine
+from local_classifier import LocalClassifier, REASON_PREFIX
+from send_queue import SendQueue
+from history_index import HistoryIndex, FTS5_AVAILABLE
+from metrics import timed, API_CALLS, API_ERRORS, TOKENS, CATEGORIZED, LLM_CACHE, dashboard_section
 
 # Load environment variables
 load_dotenv()
@@ -38,6 +49,49 @@ try:
 except ImportError:
     CLAUDE_AVAILABLE = False
 
+CLAUDE_MODEL = "claude-sonnet-4-20250514"
+
+# Fields filled in when the local classifier (not Claude) decides the priority
+LOCAL_DEFAULTS = {
+    "URGENT": {"needs_response": True, "suggested_action": "Respond immediately"},
+    "HIGH": {"needs_response": True, "suggested_action": "Respond within 4 hours"},
+    "MEDIUM": {"needs_response": True, "suggested_action": "Review and respond"},
+    "LOW": {"needs_response": False, "suggested_action": "Review when available"},
+}
+
+# Shared by the categorize-only and combined categorize+draft prompts
+CATEGORIZE_RULES = """Priority Rules:
+- URGENT: Contains "urgent", "ASAP", "deadline today", "immediate action", time-sensitive requests
+- HIGH: From important contacts, meeting invites, project deliverables, client requests
+- MEDIUM: General inquiries, personal contacts, follow-ups
+- LOW: Newsletters, automated notifications, marketing, no-reply addresses
+
+Auto-reply Rules:
+- Set auto_reply=true ONLY for LOW priority emails that deserve a brief acknowledgment
+- Set auto_reply=false for newsletters, no-reply addresses, and marketing emails
+- Never auto_reply to URGENT/HIGH/MEDIUM emails
+"""
+
+DRAFT_RULES = """Draft Rules:
+- Brief and professional (2-4 sentences), with specific next steps if needed
+- Match formality to sender (casual for personal, professional for business)
+- Body only: no subject line, no signature (the user adds their own)
+- Stay consistent with earlier replies to this sender, if any are shown
+"""
+
+# Static instructions sent as the system prompt of every call. With the handbook
+# appended they form one prompt-cache prefix shared by all call types.
+SYSTEM_PROMPT = f"""You triage and answer email for a busy professional.
+
+{CATEGORIZE_RULES}
+{DRAFT_RULES}"""
+
+CATEGORY_FIELDS = """  "priority": "URGENT or HIGH or MEDIUM or LOW",
+  "reason": "brief 5-10 word explanation",
+  "needs_response": true or false,
+  "suggested_action": "brief action recommendation",
+  "auto_reply": true or false (true only for LOW priority that needs a simple acknowledgment)"""
+
 # Windows notification support - using winotify or fallback to win10toast with fix
 TOAST_AVAILABLE = False
 toaster = None
@@ -77,25 +131,130 @@ except ImportError:
         logger.warning("No notification library available")
 
 
+def _short_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+
+def _count_md(path) -> int:
+    """Number of .md files under `path` (recursing into e.g. Done/YYYY/MM/)."""
+    try:
+        with os.scandir(path) as entries:
+            return sum(
+                _count_md(e.path) if e.is_dir() else e.name.endswith('.md') and e.is_file()
+                for e in entries
+            )
+    except FileNotFoundError:
+        return 0
+
+
 class EmailProcessor:
     """Processes emails using Claude API (optional) and Gmail API for sending."""
 
-    def __init__(self, vault_path: str, gmail_service=None):
+    def __init__(self, vault_path: str, gmail_service=None, state_dir=None):
         self.vault_path = Path(vault_path)
         self.gmail_service = gmail_service
+        # Per-account state (classifier, outbox) lives here when several accounts share a process
+        self.state_dir = Path(state_dir) if state_dir else None
         self.handbook_path = self.vault_path / "Company_Handbook.md"
         self.dashboard_path = self.vault_path / "Dashboard.md"
         self.done_folder = self.vault_path / "Done"
         self.done_folder.mkdir(parents=True, exist_ok=True)
 
+        # Concurrency settings (1 = sequential, the default)
+        self.concurrency = int(os.getenv('PROCESSOR_CONCURRENCY', '1'))
+        self.email_timeout = float(os.getenv('PROCESSOR_EMAIL_TIMEOUT', '60'))
+        self._pool = None
+        self._local = threading.local()
+
+        # Combined mode: one Claude call returns category and draft together
+        self.combined_prompt = os.getenv('CLAUDE_COMBINED_PROMPT', '0') == '1'
+
+        # Shared token bucket so concurrent workers stay under the API rate limit
+        self.rate_limiter = TokenBucket.per_minute(
+            float(os.getenv('ANTHROPIC_REQUESTS_PER_MINUTE', '50')),
+            burst=float(os.getenv('ANTHROPIC_BURST', '5'))
+        )
+
         # Initialize Claude client if available
         if CLAUDE_AVAILABLE:
-            self.client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+            self.client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'), timeout=self.email_timeout)
         else:
             self.client = None
 
-        # Load tone guidelines if available
-        self.tone_guidelines = self._load_handbook()
+        # Company_Handbook.md: re-read when it changes (see tone_guidelines)
+        self._handbook_lock = threading.Lock()
+        self._handbook_signature = ()
+        self._handbook_text = ""
+        self._handbook_hash = ""
+
+        # Anthropic prompt caching: the system prompt and handbook are a cached prefix
+        self.prompt_cache = os.getenv('PROMPT_CACHE_ENABLED', '1') == '1'
+        self.handbook_max_chars = int(os.getenv('HANDBOOK_MAX_CHARS', '40000'))
+
+        # Full-text index of earlier mail and handbook sections, retrieved into draft prompts
+        if os.getenv('HISTORY_INDEX_ENABLED', '1') == '1' and FTS5_AVAILABLE:
+            self.history = HistoryIndex(
+                self.vault_path,
+                self._state_file("history_index.sqlite3") or os.getenv('HISTORY_INDEX_PATH') or None,
+                handbook_path=self.handbook_path,
+                refresh_interval=float(os.getenv('HISTORY_REFRESH_SECONDS', '300'))
+            )
+        else:
+            self.history = None
+            if not FTS5_AVAILABLE:
+                logger.warning("SQLite FTS5 not available - drafts use the handbook excerpt only")
+        self.history_budget = int(os.getenv('HISTORY_CONTEXT_TOKENS', '800'))
+        self.history_exchanges = int(os.getenv('HISTORY_TOP_K', '3'))
+        self.handbook_sections = int(os.getenv('HANDBOOK_TOP_K', '3'))
+
+        # Rule-based categorization (Priority_Rules.yaml in the vault, hot-reloaded)
+        self.rules = RuleEngine(os.getenv('RULES_PATH') or self.vault_path / "Priority_Rules.yaml")
+
+        # Persistent cache of Claude results for repeated (templated) mail
+        if os.getenv('LLM_CACHE_ENABLED', '1') == '1':
+            self.cache = LLMCache(
+                os.getenv('LLM_CACHE_PATH') or None,
+                ttl_seconds=float(os.getenv('LLM_CACHE_TTL_HOURS', '168')) * 3600,
+                max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '10000'))
+            )
+        else:
+            self.cache = None
+
+        # Dashboard: folder counts kept in memory, writes debounced
+        self.dashboard_folders = ["Inbox", "Pending_Approval", "Approved", "Done"]
+        self.dashboard_interval = float(os.getenv('DASHBOARD_INTERVAL', '10'))
+        self.reconcile_interval = float(os.getenv('DASHBOARD_RECONCILE_INTERVAL', '600'))
+        self._counts_lock = threading.Lock()
+        self.folder_counts = self._scan_folder_counts()
+        self.dashboard_dirty = False
+        self._last_dashboard_write = float('-inf')
+        self._last_reconcile = time.monotonic()
+
+        # Local classifier in front of Claude, trained on labelled mail in Done/
+        if os.getenv('LOCAL_CLASSIFIER_ENABLED', '1') == '1':
+            self.classifier = LocalClassifier(
+                self._state_file("local_classifier.json") or os.getenv('LOCAL_CLASSIFIER_PATH') or None,
+                min_examples=int(os.getenv('LOCAL_CLASSIFIER_MIN_EXAMPLES', '50')),
+                # LOCAL_CLASSIFIER_THRESHOLD is the older name of the setting
+                target_precision=float(os.getenv('LOCAL_CLASSIFIER_PRECISION')
+                                       or os.getenv('LOCAL_CLASSIFIER_THRESHOLD', '0.95'))
+            )
+        else:
+            self.classifier = None
+        self.classifier_retrain_interval = float(os.getenv('LOCAL_CLASSIFIER_RETRAIN_MINUTES', '30')) * 60
+        self._classifier_lock = threading.Lock()
+        self._last_classifier_train = float('-inf')
+        self.api_calls_saved = 0
+
+        # Durable outbox: replies are queued and sent by a background thread
+        if self.gmail_service and os.getenv('SEND_QUEUE_ENABLED', '1') == '1':
+            self.outbox = SendQueue(
+                self._gmail_send,
+                self._state_file("outbox.sqlite3") or os.getenv('SEND_QUEUE_PATH') or None,
+                per_minute=float(os.getenv('SEND_QUOTA_PER_MINUTE', '20'))
+            )
+        else:
+            self.outbox = None
 
         # Auto-reply templates for LOW priority
         self.auto_reply_templates = {
@@ -110,57 +269,327 @@ class EmailProcessor:
             return self.handbook_path.read_text(encoding='utf-8')
         return "Use a professional and friendly tone."
 
-    def categorize_email(self, email_from: str, subject: str, content: str) -> dict:
+    @property
+    def tone_guidelines(self) -> str:
+        """The handbook text, re-read only when the file's mtime or size changes."""
+        try:
+            stat = self.handbook_path.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        if signature != self._handbook_signature:
+            with self._handbook_lock:
+                if signature != self._handbook_signature:
+                    self._reload_handbook(signature)
+        return self._handbook_text
+
+    def _reload_handbook(self, signature):
+        text = self._load_handbook()
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+        if self._handbook_hash and digest != self._handbook_hash:
+            # A new hash means new cache keys and a new prompt-cache prefix
+            logger.info(f"[HANDBOOK] Reloaded {self.handbook_path.name} ({self._handbook_hash} -> {digest})")
+            if self.history is not None:
+                self.history.refresh_handbook()
+        self._handbook_text, self._handbook_hash = text, digest
+        self._handbook_signature = signature
+
+    def _system_prompt(self) -> list:
+        """System blocks: static instructions, plus the handbook as a cached prefix when prompt caching is on."""
+        blocks = [{"type": "text", "text": SYSTEM_PROMPT}]
+        if self.prompt_cache:
+            blocks.append({
+                "type": "text",
+                "text": f"Company Handbook (tone and policies):\n{self.tone_guidelines[:self.handbook_max_chars]}",
+                "cache_control": {"type": "ephemeral"},
+            })
+        return blocks
+
+    def _state_file(self, name: str):
+        """Path under state_dir, or None for the module's default location."""
+        return self.state_dir / name if self.state_dir else None
+
+    def _claude_create(self, **kwargs):
+        """Call messages.create once the rate limiter allows it."""
+        waited_from = time.monotonic()
+        self.rate_limiter.acquire()
+
+        # Time queued on the rate limiter doesn't count against the email's timeout
+        clock = getattr(self._local, 'clock', None)
+        if clock:
+            started, index = clock
+            started[index] += time.monotonic() - waited_from
+
+        API_CALLS.inc(api='claude', method='messages.create')
+        started = time.perf_counter()
+        try:
+            with timed('claude_call'):
+                response = self.client.messages.create(model=CLAUDE_MODEL, system=self._system_prompt(), **kwargs)
+        except Exception:
+            API_ERRORS.inc(api='claude', method='messages.create')
+            raise
+
+        usage = getattr(response, 'usage', None)
+        counts = {}
+        for kind in ('input_tokens', 'output_tokens', 'cache_read_input_tokens', 'cache_creation_input_tokens'):
+            counts[kind] = getattr(usage, kind, None) or 0
+            if counts[kind]:
+                TOKENS.inc(counts[kind], kind=kind.replace('_tokens', ''))
+        logger.info(f"[CLAUDE] {time.perf_counter() - started:.2f}s - input {counts['input_tokens']} "
+                    f"+ cache read {counts['cache_read_input_tokens']} / written {counts['cache_creation_input_tokens']}, "
+                    f"output {counts['output_tokens']}")
+        return response
+
+    def _cache_get(self, kind: str, key_args: tuple):
+        if self.cache is None:
+            return None
+        result = self.cache.get(cache_key(kind, *key_args))
+        LLM_CACHE.inc(kind=kind, result='miss' if result is None else 'hit')
+        return result
+
+    def _cache_put(self, kind: str, key_args: tuple, result):
+        if self.cache is not None:
+            self.cache.put(cache_key(kind, *key_args), kind, result)
+
+    def _cached_call(self, kind: str, key_args: tuple, call):
+        """Return a cached Claude result for `key_args`, or run `call` and cache it."""
+        cached = self._cache_get(kind, key_args)
+        if cached is not None:
+            return cached
+
+        result = call()
+        self._cache_put(kind, key_args, result)
+        return result
+
+    def _local_categorize(self, email_from: str, subject: str, content: str):
+        """Return the local classifier's answer if it is confident enough, else None."""
+        if self.classifier is None:
+            return None
+
+        self._start_classifier_training()
+        prediction = self.classifier.predict(email_from, subject, content)
+        if not self.classifier.confident(prediction):
+            return None
+
+        priority, margin = prediction
+        self.api_calls_saved += 1
+        CATEGORIZED.inc(source='local')
+        logger.info(f"[LOCAL] {priority} (margin {margin:.1f}) - {self.api_calls_saved} API call(s) saved")
+        return {
+            "priority": priority,
+            "reason": f"{REASON_PREFIX} (margin {margin:.1f})",
+            "needs_response": LOCAL_DEFAULTS[priority]["needs_response"],
+            "suggested_action": LOCAL_DEFAULTS[priority]["suggested_action"],
+            "auto_reply": False  # Never auto-send on a model guess
+        }
+
+    def _start_classifier_training(self):
+        """Pick up newly labelled files in Done/ in a background thread (one at a time, at most every interval)."""
+        if time.monotonic() - self._last_classifier_train < self.classifier_retrain_interval:
+            return
+        if not self._classifier_lock.acquire(blocking=False):
+            return  # Still training
+        self._last_classifier_train = time.monotonic()
+        threading.Thread(target=self._train_classifier, name='classifier-train', daemon=True).start()
+
+    def _train_classifier(self):
+        try:
+            self.classifier.train_from_folder(self.done_folder)
+        except Exception as e:
+            logger.error(f"[LOCAL] Training failed: {e}")
+        finally:
+            self._classifier_lock.release()
+
+    def _handbook_version(self) -> str:
+        """Short hash of the tone guidelines, so handbook edits invalidate cached drafts."""
+        self.tone_guidelines  # Reload first if the file changed
+        return self._handbook_hash
+
+    def _draft_guidance(self, email_from: str, subject: str, content: str, message_id: str = None) -> str:
+        """
+        Prompt block for drafting: retrieved exchanges (and handbook sections,
+        unless the whole handbook is in the cached system prompt), else the handbook excerpt.
+        """
+        if self.history is not None:
+            try:
+                context = self.history.context_for(
+                    email_from, subject, content, budget_tokens=self.history_budget,
+                    exchanges=self.history_exchanges, sections=self.handbook_sections, handbook=not self.prompt_cache,
+                    message_id=message_id
+                )
+                if context:
+                    return f"Context:\n{context}\n"
+            except Exception as e:
+                logger.warning(f"[HISTORY] Lookup failed: {e}")
+        if self.prompt_cache:
+            return ""
+        return f"Tone Guidelines:\n{self.tone_guidelines[:1000]}\n"
+
+    @timed('categorize')
+    def categorize_email(self, email_from: str, subject: str, content: str, headers: dict = None) -> dict:
         """
         Categorize email priority using Claude API or fallback rules.
         Returns: {"priority": "URGENT|HIGH|MEDIUM|LOW", "reason": str, "needs_response": bool, "suggested_action": str, "auto_reply": bool}
         """
-        # Try Claude API first if available
+        # Rules marked final are trusted as-is (cheap first pass in front of Claude)
+        rule = self.rules.match(email_from, subject, content, headers)
+        if rule and rule.final:
+            CATEGORIZED.inc(source='rule')
+            return rule.result()
+
+        # Try Claude API first if available (cache, then local classifier, then the API)
         if self.client:
+            key_args = self._categorize_args(email_from, subject, content)
+            cached = self._cache_get('categorize', key_args)
+            if cached is not None:
+                CATEGORIZED.inc(source='cache')
+                return cached
+
+            local = self._local_categorize(email_from, subject, content)
+            if local is not None:
+                return local
+
             try:
-                return self._claude_categorize(email_from, subject, content)
+                result = self._claude_categorize(email_from, subject, content)
+                self._cache_put('categorize', key_args, result)
+                CATEGORIZED.inc(source='claude')
+                return result
             except Exception as e:
                 logger.warning(f"Claude API error: {e}, using fallback")
 
         # Fallback to rule-based
-        return self._fallback_categorize(email_from, subject, content)
+        CATEGORIZED.inc(source='fallback')
+        return rule.result() if rule else dict(self.rules.ruleset.default)
+
+    def categorize_offline(self, email_from: str, subject: str, content: str, headers: dict = None):
+        """
+        The category from a final rule, the cache or the local classifier, or None
+        if only Claude can decide (used before deferring to a Message Batch, and by
+        backfill's 'cached' mode). Without a client the rules answer the rest.
+        """
+        rule = self.rules.match(email_from, subject, content, headers)
+        if rule and rule.final:
+            return rule.result()
+        cached = self._cache_get('categorize', self._categorize_args(email_from, subject, content))
+        if cached is not None:
+            return cached
+        local = self._local_categorize(email_from, subject, content)
+        if local is not None or self.client:
+            return local
+        return rule.result() if rule else dict(self.rules.ruleset.default)
+
+    def categorize_request(self, email_from: str, subject: str, content: str) -> dict:
+        """messages.create parameters for categorizing one email (a Message Batches request)."""
+        return {
+            "model": CLAUDE_MODEL,
+            "max_tokens": 200,
+            "system": self._system_prompt(),
+            "messages": [{"role": "user", "content": self._categorize_prompt(email_from, subject, content)}],
+        }
+
+    def _categorize_args(self, email_from: str, subject: str, content: str) -> tuple:
+        """Cache key fields for a categorization; the handbook is in the system prompt, so its hash too."""
+        return email_from, subject, content, self._handbook_version()
+
+    def categorize_key(self, email_from: str, subject: str, content: str) -> str:
+        """Key shared by equivalent categorization requests (the LLM cache key)."""
+        return cache_key('categorize', *self._categorize_args(email_from, subject, content))
+
+    def batch_category(self, email: dict, message) -> dict:
+        """Parse a categorization that came back from a Message Batch, and cache it."""
+        result = self._parse_json_response(message.content[0].text)
+        self._cache_put('categorize', self._categorize_args(email['email_from'], email['subject'], email['content']),
+                        result)
+        CATEGORIZED.inc(source='batch')
+        return result
 
     def _claude_categorize(self, email_from: str, subject: str, content: str) -> dict:
         """Use Claude API to categorize email priority."""
-        prompt = f"""Analyze this email and return ONLY valid JSON (no markdown, no explanation):
+        response = self._claude_create(
+            max_tokens=200,
+            messages=[{"role": "user", "content": self._categorize_prompt(email_from, subject, content)}]
+        )
+
+        return self._parse_json_response(response.content[0].text)
+
+    @staticmethod
+    def _categorize_prompt(email_from: str, subject: str, content: str) -> str:
+        return f"""Analyze this email with the priority and auto-reply rules and return ONLY valid JSON (no markdown, no explanation):
 
 {{
-  "priority": "URGENT or HIGH or MEDIUM or LOW",
-  "reason": "brief 5-10 word explanation",
-  "needs_response": true or false,
-  "suggested_action": "brief action recommendation",
-  "auto_reply": true or false (true only for LOW priority that needs a simple acknowledgment)
+{CATEGORY_FIELDS}
 }}
 
-Priority Rules:
-- URGENT: Contains "urgent", "ASAP", "deadline today", "immediate action", time-sensitive requests
-- HIGH: From important contacts, meeting invites, project deliverables, client requests
-- MEDIUM: General inquiries, personal contacts, follow-ups
-- LOW: Newsletters, automated notifications, marketing, no-reply addresses
+Email:
+From: {email_from}
+Subject: {subject}
+Content: {content[:500]}
+"""
 
-Auto-reply Rules:
-- Set auto_reply=true ONLY for LOW priority emails that deserve a brief acknowledgment
-- Set auto_reply=false for newsletters, no-reply addresses, and marketing emails
-- Never auto_reply to URGENT/HIGH/MEDIUM emails
+    @timed('categorize')
+    def categorize_and_draft(self, email_from: str, subject: str, content: str, headers: dict = None,
+                             message_id: str = None) -> dict:
+        """
+        Categorize and (for URGENT/HIGH) draft a reply in a single Claude call.
+        Returns the categorize_email() fields plus "draft" (str or None).
+        """
+        rule = self.rules.match(email_from, subject, content, headers)
+        if rule and rule.final:
+            CATEGORIZED.inc(source='rule')
+            return rule.result()
+
+        if self.client:
+            guidance = self._draft_guidance(email_from, subject, content, message_id)
+            key_args = (email_from, subject, content, self._handbook_version(), _short_hash(guidance))
+            cached = self._cache_get('combined', key_args)
+            if cached is not None:
+                CATEGORIZED.inc(source='cache')
+                return cached
+
+            # A confident local answer has no draft; process_email() drafts separately if needed
+            local = self._local_categorize(email_from, subject, content)
+            if local is not None:
+                return local
 
+            try:
+                result = self._claude_categorize_and_draft(email_from, subject, content, guidance)
+                self._cache_put('combined', key_args, result)
+                CATEGORIZED.inc(source='claude')
+                return result
+            except Exception as e:
+                logger.warning(f"Claude API error (combined): {e}, using fallback")
+
+        CATEGORIZED.inc(source='fallback')
+        return rule.result() if rule else dict(self.rules.ruleset.default)
+
+    def _claude_categorize_and_draft(self, email_from: str, subject: str, content: str, guidance: str) -> dict:
+        """Use one Claude call to return priority, reason, action, auto_reply and draft."""
+        prompt = f"""Analyze this email with the priority and auto-reply rules and return ONLY valid JSON (no markdown, no explanation):
+
+{{
+{CATEGORY_FIELDS},
+  "draft": "response body" or null
+}}
+
+Write a draft (following the draft rules) ONLY when priority is URGENT or HIGH and needs_response is true, otherwise null.
+
+{guidance}
 Email:
 From: {email_from}
 Subject: {subject}
 Content: {content[:500]}
 """
 
-        response = self.client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=200,
+        response = self._claude_create(
+            max_tokens=500,
             messages=[{"role": "user", "content": prompt}]
         )
+        return self._parse_json_response(response.content[0].text)
 
-        result_text = response.content[0].text.strip()
+    @staticmethod
+    def _parse_json_response(result_text: str) -> dict:
+        """Parse a JSON reply, tolerating ```json fences around it."""
+        result_text = result_text.strip()
         if result_text.startswith("```"):
             result_text = result_text.split("```")[1]
             if result_text.startswith("json"):
@@ -169,60 +598,33 @@ Content: {content[:500]}
 
         return json.loads(result_text)
 
-    def _fallback_categorize(self, email_from: str, subject: str, content: str) -> dict:
-        """Fallback categorization when Claude API is unavailable."""
-        text = f"{subject} {content}".lower()
-        email_lower = email_from.lower()
-
-        # Check for urgent keywords
-        urgent_keywords = ['urgent', 'asap', 'deadline', 'immediate', 'today', 'emergency']
-        if any(kw in text for kw in urgent_keywords):
-            return {"priority": "URGENT", "reason": "Contains urgent keywords", "needs_response": True, "suggested_action": "Respond immediately", "auto_reply": False}
-
-        # Check for high priority senders
-        if 'muniya' in email_lower or 'm95251957' in email_lower:
-            return {"priority": "HIGH", "reason": "Important sender", "needs_response": True, "suggested_action": "Respond within 4 hours", "auto_reply": False}
+    def _fallback_categorize(self, email_from: str, subject: str, content: str, headers: dict = None) -> dict:
+        """Fallback categorization when Claude API is unavailable (see rule_engine.py)."""
+        return self.rules.classify(email_from, subject, content, headers)
 
-        # Check for no-reply/automated (no response needed)
-        if 'no-reply' in email_lower or 'noreply' in email_lower or 'mailer-daemon' in email_lower:
-            return {"priority": "LOW", "reason": "Automated/no-reply", "needs_response": False, "suggested_action": "Archive", "auto_reply": False}
-
-        # Check for newsletters (no response needed)
-        if 'newsletter' in text or 'unsubscribe' in text or 'marketing' in email_lower:
-            return {"priority": "LOW", "reason": "Newsletter/marketing", "needs_response": False, "suggested_action": "Archive or unsubscribe", "auto_reply": False}
-
-        # Medium priority - general emails that may need auto-reply
-        if any(kw in text for kw in ['question', 'inquiry', 'help', 'support', 'information']):
-            return {"priority": "MEDIUM", "reason": "General inquiry", "needs_response": True, "suggested_action": "Review and respond", "auto_reply": False}
-
-        # Default LOW priority with potential auto-reply
-        return {"priority": "LOW", "reason": "General email", "needs_response": True, "suggested_action": "Review when available", "auto_reply": True}
-
-    def generate_draft(self, email_from: str, subject: str, content: str, priority: str) -> str:
+    @timed('draft')
+    def generate_draft(self, email_from: str, subject: str, content: str, priority: str,
+                       message_id: str = None) -> str:
         """Generate a draft response using Claude API or template."""
         if self.client:
             try:
-                return self._claude_generate_draft(email_from, subject, content, priority)
+                guidance = self._draft_guidance(email_from, subject, content, message_id)
+                return self._cached_call(
+                    'draft', (email_from, subject, content, priority, self._handbook_version(), _short_hash(guidance)),
+                    lambda: self._claude_generate_draft(email_from, subject, content, priority, guidance)
+                )
             except Exception as e:
                 logger.warning(f"Claude API error (draft): {e}")
 
         # Fallback template
         return "Thank you for your email. I'll review this and get back to you shortly."
 
-    def _claude_generate_draft(self, email_from: str, subject: str, content: str, priority: str) -> str:
+    def _claude_generate_draft(self, email_from: str, subject: str, content: str, priority: str,
+                               guidance: str) -> str:
         """Use Claude API to generate a draft response."""
-        prompt = f"""Write a brief, professional email response (2-4 sentences).
-
-Tone Guidelines:
-{self.tone_guidelines[:1000]}
-
-Rules:
-- Be concise and actionable
-- Include specific next steps if needed
-- Match formality to sender (casual for personal, professional for business)
-- Do NOT include subject line, just the body
-- Do NOT include signature (user will add their own)
+        prompt = f"""Write a brief, professional email response (2-4 sentences) following the draft rules.
 
+{guidance}
 Original Email:
 From: {email_from}
 Subject: {subject}
@@ -232,18 +634,30 @@ Priority: {priority}
 
 Write the response body only:"""
 
-        response = self.client.messages.create(
-            model="claude-sonnet-4-20250514",
+        response = self._claude_create(
             max_tokens=300,
             messages=[{"role": "user", "content": prompt}]
         )
         return response.content[0].text.strip()
 
+    @timed('auto_reply')
     def generate_auto_reply(self, email_from: str, subject: str, content: str) -> str:
         """Generate a simple auto-reply for LOW priority emails."""
         if self.client:
             try:
-                prompt = f"""Write a very brief (1-2 sentences) acknowledgment email.
+                # The prompt only uses sender and subject, so content is not part of the key
+                return self._cached_call(
+                    'auto_reply', (email_from, subject),
+                    lambda: self._claude_generate_auto_reply(email_from, subject)
+                )
+            except Exception as e:
+                logger.warning(f"Claude API error (auto-reply): {e}")
+
+        return self.auto_reply_templates["default"]
+
+    def _claude_generate_auto_reply(self, email_from: str, subject: str) -> str:
+        """Use Claude API to write a brief acknowledgment."""
+        prompt = f"""Write a very brief (1-2 sentences) acknowledgment email.
 Keep it simple and professional. Just acknowledge receipt.
 Do NOT include subject line or signature.
 
@@ -253,17 +667,13 @@ Subject: {subject}
 
 Write the brief acknowledgment:"""
 
-                response = self.client.messages.create(
-                    model="claude-sonnet-4-20250514",
-                    max_tokens=100,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                return response.content[0].text.strip()
-            except Exception as e:
-                logger.warning(f"Claude API error (auto-reply): {e}")
-
-        return self.auto_reply_templates["default"]
+        response = self._claude_create(
+            max_tokens=100,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return response.content[0].text.strip()
 
+    @timed('send_email')
     def send_email(self, to: str, subject: str, body: str) -> bool:
         """Send an email using Gmail API."""
         if not self.gmail_service:
@@ -271,20 +681,7 @@ Write the brief acknowledgment:"""
             return False
 
         try:
-            # Create message
-            message = MIMEText(body)
-            message['to'] = to
-            message['subject'] = subject
-
-            # Encode message
-            raw = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
-
-            # Send
-            self.gmail_service.users().messages().send(
-                userId='me',
-                body={'raw': raw}
-            ).execute()
-
+            self._gmail_send(to, subject, body)
             logger.info(f"[SENT] Auto-reply to: {to}")
             return True
 
@@ -292,6 +689,27 @@ Write the brief acknowledgment:"""
             logger.error(f"Send email error: {e}")
             return False
 
+    def _gmail_send(self, to: str, subject: str, body: str):
+        """Send one email through the Gmail API; raises on failure (used by the outbox)."""
+        # Create message
+        message = MIMEText(body)
+        message['to'] = to
+        message['subject'] = subject
+
+        # Encode message
+        raw = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
+
+        # Send
+        API_CALLS.inc(api='gmail', method='messages.send')
+        try:
+            self.gmail_service.users().messages().send(
+                userId='me',
+                body={'raw': raw}
+            ).execute()
+        except Exception:
+            API_ERRORS.inc(api='gmail', method='messages.send')
+            raise
+
     def send_notification(self, title: str, message: str, priority: str = "MEDIUM"):
         """Send Windows desktop notification for important emails."""
         if not TOAST_AVAILABLE:
@@ -323,22 +741,60 @@ Write the brief acknowledgment:"""
             logger.warning(f"Notification error (continuing anyway): {e}")
             logger.info(f"[NOTIFICATION] {title}: {message}")
 
-    def update_dashboard(self):
-        """Update Dashboard.md with current counts."""
-        folders = {
-            "Inbox": self.vault_path / "Inbox",
-            "Pending_Approval": self.vault_path / "Pending_Approval",
-            "Approved": self.vault_path / "Approved",
-            "Done": self.vault_path / "Done"
-        }
+    def _scan_folder_counts(self) -> dict:
+        """Count .md files in each dashboard folder, subfolders included (the slow path, used to reconcile)."""
+        return {name: _count_md(self.vault_path / name) for name in self.dashboard_folders}
+
+    def record_file_added(self, folder: str):
+        """Note a new file in a vault folder and schedule a dashboard refresh."""
+        with self._counts_lock:
+            if folder in self.folder_counts:
+                self.folder_counts[folder] += 1
+        self.update_dashboard()
+
+    def record_file_moved(self, from_folder: str, to_folder: str):
+        """Note a file moved between vault folders and schedule a dashboard refresh."""
+        with self._counts_lock:
+            if from_folder in self.folder_counts:
+                self.folder_counts[from_folder] = max(0, self.folder_counts[from_folder] - 1)
+            if to_folder in self.folder_counts:
+                self.folder_counts[to_folder] += 1
+        self.update_dashboard()
+
+    @timed('update_dashboard')
+    def update_dashboard(self, force: bool = False):
+        """Request a Dashboard.md refresh; writes are coalesced to one per dashboard_interval."""
+        self.dashboard_dirty = True
+        self.flush_dashboard(force=force)
+
+    def flush_dashboard(self, force: bool = False) -> bool:
+        """Write Dashboard.md if a refresh is pending and due. Returns True if written."""
+        now = time.monotonic()
+        if now - self._last_reconcile >= self.reconcile_interval:
+            # Periodic full scan corrects drift (files moved by hand in Obsidian, etc.)
+            counts = self._scan_folder_counts()
+            with self._counts_lock:
+                if counts != self.folder_counts:
+                    self.folder_counts = counts
+                    self.dashboard_dirty = True
+            self._last_reconcile = now
+
+        if not self.dashboard_dirty:
+            return False
+        if not force and now - self._last_dashboard_write < self.dashboard_interval:
+            return False
 
-        counts = {}
-        for name, path in folders.items():
-            if path.exists():
-                counts[name] = len(list(path.glob("*.md")))
-            else:
-                counts[name] = 0
+        with self._counts_lock:
+            counts = dict(self.folder_counts)
+        if self._write_dashboard(counts):
+            self.dashboard_dirty = False
+            self._last_dashboard_write = now
+            return True
+        return False
 
+    @timed('dashboard_write')
+    def _write_dashboard(self, counts: dict) -> bool:
+        """Render and write Dashboard.md with the given folder counts."""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         dashboard_content = f"""# AI Employee Dashboard
@@ -369,6 +825,9 @@ Write the brief acknowledgment:"""
 
 ---
 
+{dashboard_section()}
+---
+
 *Auto-generated by AI Employee System*
 """
 
@@ -377,10 +836,9 @@ Write the brief acknowledgment:"""
         for attempt in range(max_retries):
             try:
                 self.dashboard_path.write_text(dashboard_content, encoding='utf-8')
-                return  # Success
+                return True  # Success
             except PermissionError as e:
                 if attempt < max_retries - 1:
-                    import time
                     time.sleep(0.5)  # Wait 500ms before retry
                     logger.warning(f"Dashboard write retry {attempt + 1}/{max_retries}")
                 else:
@@ -388,18 +846,24 @@ Write the brief acknowledgment:"""
             except Exception as e:
                 logger.error(f"Dashboard update error: {e}")
                 break
+        return False
 
-    def process_email(self, email_from: str, subject: str, content: str, message_id: str) -> dict:
+    @timed('process_email')
+    def process_email(self, email_from: str, subject: str, content: str, message_id: str,
+                      headers: dict = None, category: dict = None) -> dict:
         """
         Full email processing pipeline:
-        1. Categorize priority
+        1. Categorize priority (skipped when `category` is given, e.g. from a Message Batch)
         2. Generate draft if HIGH/URGENT
         3. Auto-reply if LOW and auto_reply=True
         4. Send notification if HIGH/URGENT
         5. Return processed data
         """
-        # Step 1: Categorize
-        category = self.categorize_email(email_from, subject, content)
+        # Step 1: Categorize (and draft, in combined mode)
+        if category is None and self.combined_prompt:
+            category = self.categorize_and_draft(email_from, subject, content, headers, message_id)
+        elif category is None:
+            category = self.categorize_email(email_from, subject, content, headers)
         priority = category.get("priority", "MEDIUM")
         auto_reply = category.get("auto_reply", False)
 
@@ -415,7 +879,9 @@ Write the brief acknowledgment:"""
 
         # Step 2: Generate draft for HIGH/URGENT
         if priority in ["URGENT", "HIGH"] and category.get("needs_response", True):
-            result["draft"] = self.generate_draft(email_from, subject, content, priority)
+            result["draft"] = category.get("draft") or self.generate_draft(
+                email_from, subject, content, priority, message_id
+            )
 
         # Step 3: Auto-reply for LOW priority (if enabled)
         if priority == "LOW" and auto_reply and self.gmail_service:
@@ -429,12 +895,22 @@ Write the brief acknowledgment:"""
             reply_body = self.generate_auto_reply(email_from, subject, content)
             reply_subject = f"Re: {subject}"
 
-            if self.send_email(reply_to, reply_subject, reply_body):
+            if not self._claim_result():
+                logger.info(f"[TIMEOUT] {subject[:50]} - result already replaced, not auto-replying")
+            elif self.outbox:
+                # Sent in the background; dedup means a re-processed email isn't answered twice
+                self.outbox.enqueue(
+                    f"auto_reply:{message_id}", reply_to, reply_subject, reply_body,
+                    kind='auto_reply', message_id=message_id
+                )
+                result["auto_replied"] = True
+                result["suggested_action"] = "Auto-reply queued and archived"
+            elif self.send_email(reply_to, reply_subject, reply_body):
                 result["auto_replied"] = True
                 result["suggested_action"] = "Auto-replied and archived"
 
         # Step 4: Send notification for HIGH/URGENT
-        if priority in ["URGENT", "HIGH"]:
+        if priority in ["URGENT", "HIGH"] and self._claim_result():
             icon = "URGENT" if priority == "URGENT" else "HIGH"
             self.send_notification(
                 title=f"{icon} Email from {email_from.split('<')[0].strip()}",
@@ -444,6 +920,80 @@ Write the brief acknowledgment:"""
 
         return result
 
+    def process_emails(self, emails: list) -> list:
+        """
+        Process a batch of emails (dicts of process_email kwargs).
+        Runs up to `concurrency` emails at once; results keep the input order.
+        """
+        if self.concurrency <= 1 or len(emails) <= 1:
+            return [self.process_email(**email) for email in emails]
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='email')
+
+        started = {}
+        owners = {}  # index -> 'worker' once it has side effects, 'timeout' once its result is replaced
+        owners_lock = threading.Lock()
+
+        def claim(index, owner):
+            with owners_lock:
+                return owners.setdefault(index, owner) == owner
+
+        def run(index, email):
+            started[index] = time.monotonic()
+            self._local.clock = (started, index)
+            self._local.claim = lambda: claim(index, 'worker')
+            try:
+                return self.process_email(**email)
+            finally:
+                self._local.clock = None
+                self._local.claim = None
+
+        futures = [self._pool.submit(run, i, email) for i, email in enumerate(emails)]
+        return [
+            self._await_result(index, email, future, started, claim)
+            for index, (email, future) in enumerate(zip(emails, futures))
+        ]
+
+    def _claim_result(self) -> bool:
+        """
+        Called before a side effect (auto-reply, notification). False when
+        process_emails() already timed this email out and used the fallback result.
+        """
+        claim = getattr(self._local, 'claim', None)
+        return claim is None or claim()
+
+    def _await_result(self, index: int, email: dict, future, started: dict, claim) -> dict:
+        """Wait for one email, measuring its timeout from when a worker picked it up."""
+        while not future.done():
+            begun = started.get(index)
+            # A worker that has started its side effects is waited for, so the file matches what was sent
+            if begun is not None and time.monotonic() - begun > self.email_timeout and claim(index, 'timeout'):
+                logger.warning(f"[TIMEOUT] {email['subject'][:50]} - using rule-based result")
+                return self._fallback_result(email, "timed out")
+            wait([future], timeout=0.1)
+
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f"Processing error ({email['subject'][:50]}): {e}")
+            return self._fallback_result(email, "processing error")
+
+    def _fallback_result(self, email: dict, why: str) -> dict:
+        """Rule-based result used when concurrent processing fails or times out."""
+        category = self._fallback_categorize(
+            email['email_from'], email['subject'], email['content'], email.get('headers')
+        )
+        return {
+            "message_id": email['message_id'],
+            "priority": category["priority"],
+            "reason": f"{category['reason']} ({why})",
+            "needs_response": category["needs_response"],
+            "suggested_action": category["suggested_action"],
+            "draft": None,
+            "auto_replied": False
+        }
+
 
 # Standalone test
 if __name__ == "__main__":
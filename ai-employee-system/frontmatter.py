@@ -0,0 +1,42 @@
+"""
+Frontmatter - Minimal helpers for the EMAIL_*.md files the watcher writes
+The files use flat `key: value` frontmatter, so no YAML parser is needed.
+"""
+
+import re
+
+_FRONTMATTER = re.compile(r'\A---\n(.*?)\n---\n', re.DOTALL)
+
+
+def parse_frontmatter(content: str) -> dict:
+    """Return the `key: value` pairs between the leading --- markers."""
+    match = _FRONTMATTER.match(content)
+    if not match:
+        return {}
+    fields = {}
+    for line in match.group(1).split('\n'):
+        key, sep, value = line.partition(':')
+        if sep and key and not key.startswith(' '):
+            fields[key.strip()] = value.strip()
+    return fields
+
+
+def get_section(content: str, heading: str) -> str:
+    """Return the body of a `## heading` section (up to the next ## heading)."""
+    match = re.search(rf'^## {re.escape(heading)}\s*\n(.*?)(?=^## |\Z)', content, re.MULTILINE | re.DOTALL)
+    return match.group(1).strip() if match else ''
+
+
+def set_frontmatter_field(content: str, key: str, value: str) -> str:
+    """Set (or add) a `key: value` line in the leading frontmatter."""
+    match = _FRONTMATTER.match(content)
+    if not match:
+        return content
+    lines = match.group(1).split('\n')
+    for i, line in enumerate(lines):
+        if line.partition(':')[0] == key:
+            lines[i] = f"{key}: {value}"
+            break
+    else:
+        lines.append(f"{key}: {value}")
+    return "---\n" + '\n'.join(lines) + "\n---\n" + content[match.end():]
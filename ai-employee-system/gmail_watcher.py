@@ -6,6 +6,7 @@ Monitors Gmail, auto-categorizes, and sends when you check "Reply to sender".
 import os
 import re
 import sys
+import time
 import shutil
 import logging
 from pathlib import Path
@@ -13,7 +14,20 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from base_watcher import BaseWatcher
+from state_store import StateStore
+from label_ops import LabelBatcher
+from push_receiver import PushReceiver
+from scheduler import PollPolicy
+from work_queue import PriorityWorkQueue, LatencyTracker
+from metrics import REGISTRY, MetricsServer, timed, API_CALLS, API_ERRORS, EMAILS, QUEUE_DEPTH, DUPLICATES
+from frontmatter import parse_frontmatter, set_frontmatter_field
+from dedup import NearDuplicateIndex, is_bulk
+from action_files import render_action_file, target_folder_name, analysis, done_folder_for
+from vault_index import VaultIndex, default_index_path
+from batch_categorizer import BatchCategorizer
+from vault_events import VaultChangeTracker
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -51,14 +65,35 @@ SCOPES = [
     'https://www.googleapis.com/auth/gmail.modify'  # To mark as read
 ]
 
+# Only these headers are requested (format=metadata) when fetching messages;
+# the list/automation headers feed header conditions in Priority_Rules.yaml
+METADATA_HEADERS = ['From', 'Subject', 'List-Id', 'List-Unsubscribe', 'Precedence', 'Auto-Submitted']
+
+# A checked action checkbox not yet queued/done (re-checking a FAILED one retries it)
+CHECKED_REPLY = re.compile(r'^- \[[xX]\] Reply to sender(?: \(FAILED[^\n]*\))?[ \t]*$', re.MULTILINE)
+CHECKED_ARCHIVE = re.compile(r'^- \[[xX]\] Archive(?: \(FAILED[^\n]*\))?[ \t]*$', re.MULTILINE)
+
+# Labels that `is:unread` excludes; history records carrying them are ignored
+SKIP_LABELS = {'SPAM', 'TRASH', 'DRAFT'}
+
+# Failed processing attempts before an email is dropped from the work queue
+MAX_WORK_ATTEMPTS = 3
+
 
 class GmailWatcher(BaseWatcher):
-    def __init__(self, vault_path: str, token_path: str):
+    def __init__(self, vault_path: str, token_path: str, service=None, state_path: str = None, state_dir: str = None):
         super().__init__(vault_path, check_interval=120)
         self.token_path = token_path
-        self.creds = self._get_credentials()
-        self.service = build('gmail', 'v1', credentials=self.creds)
-        self.processed_ids = set()
+        if service is not None:
+            # Injected service (e.g. benchmarks/fake_gmail.py) - skip OAuth
+            self.creds = None
+            self.service = service
+        else:
+            self.creds = self._get_credentials()
+            self.service = build('gmail', 'v1', credentials=self.creds)
+
+        # Mark-read/archive changes are collected and applied in bulk once per cycle
+        self.label_ops = LabelBatcher(self.service)
 
         # Folders to scan for checkbox triggers
         self.scan_folders = [
@@ -68,9 +103,77 @@ class GmailWatcher(BaseWatcher):
         self.done_folder = self.vault_path / "Done"
         self.done_folder.mkdir(parents=True, exist_ok=True)
 
+        # Only changed files are re-read when scanning for checkbox triggers
+        self.vault_tracker = VaultChangeTracker(
+            self.scan_folders,
+            mode=os.getenv('VAULT_WATCH_MODE', 'events').lower(),
+            poll_interval=float(os.getenv('VAULT_POLL_INTERVAL', '5'))
+        )
+        self.checkbox_retry = set()
+
+        # Persistent state: processed IDs, per-message stage and the sync cursor
+        self.state = StateStore(
+            state_path or (Path(state_dir) / "gmail_state.sqlite3" if state_dir else os.getenv('GMAIL_STATE_PATH') or None),
+            retention_days=float(os.getenv('GMAIL_STATE_RETENTION_DAYS', '90'))
+        )
+        if self.state.is_new:
+            # Upgrading from the in-memory set: don't re-process mail already in the vault
+            self.state.seed_from_vault(self.scan_folders + [self.done_folder])
+        # Emails still open in the vault keep their IDs, however old, so a resync can't overwrite their files
+        self.state.prune(keep={f.stem[len('EMAIL_'):] for folder in self.scan_folders if folder.exists()
+                               for f in folder.glob("EMAIL_*.md")})
+
+        # Frontmatter index of the vault files (vault_index.py queries it without reading markdown)
+        if os.getenv('VAULT_INDEX_ENABLED', '1') == '1':
+            self.index = VaultIndex(vault_path, default_index_path(vault_path, state_dir))
+            if self.index.is_new:
+                self.index.rebuild()
+        else:
+            self.index = None
+
+        # Messages per BatchHttpRequest (Gmail allows up to 100, recommends <= 50)
+        self.fetch_batch_size = int(os.getenv('GMAIL_FETCH_BATCH_SIZE', '50'))
+        # Messages interrupted mid-pipeline last run are fetched again
+        self.retry_fetch = [{'id': message_id} for message_id in self.state.unfinished()]
+
+        # Sync mode: 'incremental' uses users.history.list, 'full' re-lists unread mail
+        self.query = 'is:unread'
+        self.sync_mode = os.getenv('GMAIL_SYNC_MODE', 'incremental').lower()
+
+        # Two-stage pipeline: rule pre-classification queues emails by priority for processing
+        self.work_queue = PriorityWorkQueue()
+        self.work_attempts = {}  # message_id -> failed processing attempts (see _requeue)
+        self.latency = LatencyTracker()
+        # While draining a backlog, check Gmail for newer (possibly urgent) mail this often
+        self.recheck_interval = float(os.getenv('PIPELINE_RECHECK_INTERVAL', '30'))
+
+        # Near-duplicates (alert storms, list blasts) are folded into one vault entry
+        if os.getenv('DEDUP_ENABLED', '1') == '1':
+            self.dedup = NearDuplicateIndex(
+                window_seconds=float(os.getenv('DEDUP_WINDOW_MINUTES', '60')) * 60,
+                max_groups=int(os.getenv('DEDUP_MAX_GROUPS', '5000')),
+                max_distance=int(os.getenv('DEDUP_MAX_DISTANCE', '3'))
+            )
+        else:
+            self.dedup = None
+
+        # Push mode: notifications trigger a sync at once; polling is only a safety net
+        self.push_receiver = None
+        self.push_topic = os.getenv('GMAIL_PUSH_TOPIC') or None
+        self.watch_renew_interval = float(os.getenv('GMAIL_WATCH_RENEW_HOURS', '24')) * 3600
+        self._watch_renew_at = 0.0
+        self._email_address = None
+
+        # Metrics export: a Prometheus textfile and/or a local /metrics endpoint
+        self.metrics_textfile = os.getenv('METRICS_TEXTFILE') or None
+        self.metrics_interval = float(os.getenv('METRICS_TEXTFILE_INTERVAL', '15'))
+        self.metrics_port = os.getenv('METRICS_PORT') or None
+        self.metrics_server = None
+        self._metrics_written_at = 0.0
+
         # Initialize email processor (works with or without Claude API)
         if PROCESSOR_AVAILABLE:
-            self.processor = EmailProcessor(vault_path, gmail_service=self.service)
+            self.processor = EmailProcessor(vault_path, gmail_service=self.service, state_dir=state_dir)
             if os.getenv('ANTHROPIC_API_KEY'):
                 logger.info("Mode: AI-Powered (Claude API + Gmail Send)")
             else:
@@ -79,6 +182,69 @@ class GmailWatcher(BaseWatcher):
             self.processor = None
             logger.warning("email_processor not available. Running in basic mode.")
 
+        # Message Batches: mail pre-classified MEDIUM/LOW is categorized in deferred batches
+        if self.processor and os.getenv('BATCH_MODE_ENABLED', '0') == '1':
+            self.batcher = BatchCategorizer(
+                self.processor.client,
+                lambda email: self.processor.categorize_request(email['email_from'], email['subject'], email['content']),
+                Path(state_dir) / "batches.sqlite3" if state_dir else os.getenv('BATCH_STATE_PATH') or None,
+                max_size=int(os.getenv('BATCH_MAX_SIZE', '500')),
+                max_wait=float(os.getenv('BATCH_MAX_WAIT_SECONDS', '300')),
+                poll_interval=float(os.getenv('BATCH_POLL_INTERVAL', '60'))
+            )
+            if len(self.batcher):
+                logger.info(f"[BATCH] Resuming with {len(self.batcher)} deferred email(s) "
+                            f"in {self.batcher.open_batches()} open batch(es)")
+        else:
+            self.batcher = None
+        self.batch_priorities = {p.strip().upper() for p in os.getenv('BATCH_PRIORITIES', 'MEDIUM,LOW').split(',')}
+
+    @staticmethod
+    def push_enabled() -> bool:
+        return os.getenv('GMAIL_PUSH_ENABLED', '0') == '1'
+
+    def create_poll_policy(self):
+        """With push enabled, poll only as a slow safety net for missed notifications."""
+        if self.push_enabled():
+            return PollPolicy(float(os.getenv('GMAIL_PUSH_SAFETY_INTERVAL', '900')))
+        return super().create_poll_policy()
+
+    @property
+    def email_address(self) -> str:
+        """The mailbox address (used to route push notifications)."""
+        if self._email_address is None:
+            profile = self.service.users().getProfile(userId='me').execute()
+            self._email_address = profile.get('emailAddress', '').lower()
+        return self._email_address
+
+    def _on_push(self, history_id: int):
+        """Called from the receiver thread: poll now."""
+        self.waker.trigger(f"push historyId {history_id}")
+
+    def renew_watch(self):
+        """Ask Gmail to publish mailbox changes to GMAIL_PUSH_TOPIC (expires after 7 days)."""
+        try:
+            response = self.service.users().watch(userId='me', body={
+                'topicName': self.push_topic,
+                'labelIds': ['INBOX'],
+                'labelFilterBehavior': 'INCLUDE',
+            }).execute()
+            self._watch_renew_at = time.monotonic() + self.watch_renew_interval
+            logger.info(f"[PUSH] Gmail watch active on {self.push_topic} (historyId {response.get('historyId')})")
+        except Exception as e:
+            # Polling still covers us; try again in an hour
+            self._watch_renew_at = time.monotonic() + 3600
+            logger.error(f"[PUSH] Could not start Gmail watch: {e}")
+
+    @property
+    def history_id(self):
+        """Last Gmail historyId synced (persisted in the state store)."""
+        return self.state.get_cursor('history_id')
+
+    @history_id.setter
+    def history_id(self, value):
+        self.state.set_cursor('history_id', value)
+
     def _get_credentials(self):
         creds = None
         if os.path.exists(self.token_path):
@@ -96,45 +262,431 @@ class GmailWatcher(BaseWatcher):
                 token.write(creds.to_json())
         return creds
 
+    @timed('check_for_updates')
     def check_for_updates(self) -> list:
-        results = self.service.users().messages().list(
-            userId='me', q='is:unread'
-        ).execute()
-        messages = results.get('messages', [])
-        return [m for m in messages if m['id'] not in self.processed_ids]
+        """Return unread messages not yet processed (incremental when a historyId is known)."""
+        if self.sync_mode == 'incremental' and self.history_id:
+            try:
+                messages = self._incremental_sync()
+            except HttpError as e:
+                API_ERRORS.inc(api='gmail', method='history.list')
+                if e.resp.status != 404:
+                    raise
+                # historyId too old (Gmail keeps roughly a week) - start over
+                logger.warning(f"[SYNC] historyId {self.history_id} expired, running full resync")
+                self.history_id = None
+                messages = self._full_sync()
+        else:
+            messages = self._full_sync()
 
-    def mark_as_read(self, message_id: str):
-        """Mark an email as read in Gmail."""
-        try:
-            self.service.users().messages().modify(
+        # Re-offer messages whose fetch failed last cycle (history won't list them again)
+        if self.retry_fetch:
+            known = {m['id'] for m in messages}
+            messages = [m for m in self.retry_fetch if m['id'] not in known] + messages
+            self.retry_fetch = []
+
+        updates = self.state.filter_unprocessed(messages)
+        self.state.set_stages([m['id'] for m in updates], 'seen')
+        return updates
+
+    def _full_sync(self) -> list:
+        """List every unread message, following nextPageToken to the last page."""
+        start_history_id = None
+        if self.sync_mode == 'incremental':
+            # Take the cursor before listing so mail arriving mid-listing is not lost
+            API_CALLS.inc(api='gmail', method='getProfile')
+            profile = self.service.users().getProfile(userId='me').execute()
+            start_history_id = profile.get('historyId')
+
+        messages = []
+        page_token = None
+        while True:
+            API_CALLS.inc(api='gmail', method='messages.list')
+            results = self.service.users().messages().list(
+                userId='me', q=self.query, pageToken=page_token, maxResults=500
+            ).execute()
+            messages.extend(results.get('messages', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
+        if start_history_id:
+            self.history_id = start_history_id
+        logger.info(f"[SYNC] Full sync: {len(messages)} unread message(s)")
+        return messages
+
+    def _incremental_sync(self) -> list:
+        """Fetch only messages added (or marked unread) since the stored historyId."""
+        messages = []
+        seen = set()
+        latest_history_id = self.history_id
+        page_token = None
+        while True:
+            API_CALLS.inc(api='gmail', method='history.list')
+            results = self.service.users().history().list(
                 userId='me',
-                id=message_id,
-                body={'removeLabelIds': ['UNREAD']}
+                startHistoryId=self.history_id,
+                historyTypes=['messageAdded', 'labelAdded'],
+                pageToken=page_token
             ).execute()
-            logger.info(f"  [GMAIL] Marked as read: {message_id[:10]}...")
+
+            for record in results.get('history', []):
+                added = [item['message'] for item in record.get('messagesAdded', [])]
+                added += [
+                    item['message'] for item in record.get('labelsAdded', [])
+                    if 'UNREAD' in item.get('labelIds', [])
+                ]
+                for message in added:
+                    labels = set(message.get('labelIds', []))
+                    if 'UNREAD' not in labels or labels & SKIP_LABELS:
+                        continue
+                    if message['id'] in seen:
+                        continue
+                    seen.add(message['id'])
+                    messages.append({'id': message['id'], 'threadId': message.get('threadId')})
+
+            latest_history_id = results.get('historyId', latest_history_id)
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
+        self.history_id = latest_history_id
+        if messages:
+            logger.info(f"[SYNC] Incremental sync: {len(messages)} new message(s)")
+        return messages
+
+    @timed('fetch_messages')
+    def fetch_messages(self, messages: list) -> list:
+        """Fetch From/Subject/snippet for many messages with batched HTTP requests."""
+        fetched = {}
+
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                API_ERRORS.inc(api='gmail', method='messages.get')
+                logger.error(f"  [ERROR] Could not fetch {request_id[:10]}...: {exception}")
+                # Deleted messages (404) are dropped; anything else is retried next cycle
+                if not (isinstance(exception, HttpError) and exception.resp.status == 404):
+                    self.retry_fetch.append({'id': request_id})
+            else:
+                fetched[request_id] = response
+
+        ids = [m['id'] for m in messages]
+        for start in range(0, len(ids), self.fetch_batch_size):
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for message_id in ids[start:start + self.fetch_batch_size]:
+                batch.add(
+                    self.service.users().messages().get(
+                        userId='me', id=message_id,
+                        format='metadata', metadataHeaders=METADATA_HEADERS
+                    ),
+                    request_id=message_id
+                )
+            API_CALLS.inc(api='gmail', method='batch')
+            API_CALLS.inc(len(ids[start:start + self.fetch_batch_size]), api='gmail', method='messages.get')
+            batch.execute()
+
+        self.state.set_stages(list(fetched), 'fetched')
+        return [fetched[i] for i in ids if i in fetched]
+
+    def process_messages(self, messages: list) -> list:
+        """Run a batch of fetched messages through the processing pipeline."""
+        self.enqueue_messages(messages)
+        return self.drain_work_queue()
+
+    def enqueue_messages(self, messages: list):
+        """Stage 1: pre-classify with headers and rules only, and queue by priority."""
+        for message in messages:
+            email = self._parse_message(message)
+            priority = self._pre_classify(email)
+            if self.dedup is not None and self._is_bulk(email) and self._fold_duplicate(email, priority):
+                continue
+            self.work_queue.push(email['message_id'], email, priority)
+        if len(self.work_queue) > 1:
+            summary = ', '.join(f"{p}: {n}" for p, n in self.work_queue.counts().items())
+            logger.info(f"[PRIORITY] Queued {len(self.work_queue)} email(s) ({summary})")
+
+    def _is_bulk(self, email: dict) -> bool:
+        """Only list and automated mail is folded; personal mail is always processed on its own."""
+        if is_bulk(email):
             return True
-        except Exception as e:
-            logger.error(f"  [ERROR] Could not mark as read: {e}")
+        if not self.processor:
+            return False
+        # A rule that files the email as LOW (newsletters, no-reply); the default LOW does not count
+        rule = self.processor.rules.match(email['email_from'], email['subject'], email['content'], email['headers'])
+        return rule is not None and rule.result()['priority'] == 'LOW'
+
+    def _fold_duplicate(self, email: dict, priority: str) -> bool:
+        """Fold a near-duplicate into its group's vault entry. Returns True if folded."""
+        leader_id = self.dedup.match(email, priority)
+        if leader_id is None:
+            return False
+
+        leader_file = self._find_email_file(leader_id)
+        if (leader_file is None and self.state.is_processed(leader_id)) or \
+                (leader_file is not None and self._in_done(leader_file)):
+            # The earlier entry was handled (or deleted) - start a new group instead
+            self.dedup.forget(leader_id)
+            self.dedup.match(email, priority)
             return False
 
-    def scan_for_checkbox_triggers(self):
-        """Scan folders for emails with checked 'Reply to sender' checkbox."""
-        for folder in self.scan_folders:
-            if not folder.exists():
+        self.state.set_stage(email['message_id'], 'written')
+        DUPLICATES.inc()
+        group = self.dedup.group(leader_id)
+        logger.info(f"[DEDUP] {email['subject'][:50]} folded into EMAIL_{leader_id}.md ({group['count']} similar)")
+        if leader_file is not None:
+            # Otherwise the leader is still queued and write_action_file adds the members
+            try:
+                content = leader_file.read_text(encoding='utf-8')
+                self._save(leader_file, self._with_duplicates(leader_id, content))
+            except OSError as e:
+                logger.error(f"  [DEDUP] Could not update {leader_file.name}: {e}")
+        return True
+
+    def _with_duplicates(self, leader_id: str, content: str) -> str:
+        """Add the group's count and member list to a leader's file content."""
+        group = self.dedup.group(leader_id) if self.dedup is not None else None
+        if not group or not group['members']:
+            return content
+        # Every member ID stays in the file (so Archive covers the whole group);
+        # only the most recent members are listed
+        ids = [i for i in parse_frontmatter(content).get('duplicate_ids', '').split(',') if i]
+        known = set(ids)
+        ids += [m['message_id'] for m in group['members'] if m['message_id'] not in known]
+        content = set_frontmatter_field(content, 'duplicate_count', str(group['count']))
+        content = set_frontmatter_field(content, 'duplicate_ids', ','.join(ids))
+        lines = [f"## Similar Messages ({group['count'] - 1} more)"]
+        lines += [f"- {m['email_from']} - {m['subject']} (`{m['message_id']}`)" for m in group['members']]
+        if group['count'] - 1 > len(group['members']):
+            lines.append(f"- ... and {group['count'] - 1 - len(group['members'])} earlier")
+        section = '\n'.join(lines) + '\n\n'
+        content = re.sub(r'^## Similar Messages.*?(?=^## |\Z)', '', content, flags=re.MULTILINE | re.DOTALL)
+        if '## Actions' in content:
+            return content.replace('## Actions', section + '## Actions', 1)
+        return content + '\n' + section
+
+    def _pre_classify(self, email: dict) -> str:
+        if not self.processor:
+            return 'MEDIUM'
+        return self.processor.rules.classify(
+            email['email_from'], email['subject'], email['content'], email['headers']
+        )['priority']
+
+    def drain_work_queue(self) -> list:
+        """
+        Stage 2: categorize, draft, notify and write files, most urgent first.
+        During a long backlog, newer mail is fetched and queued every recheck_interval.
+        """
+        written = []
+        batch_size = self.processor.concurrency if self.processor else 1
+        next_check = time.monotonic() + self.recheck_interval
+        while len(self.work_queue):
+            if time.monotonic() >= next_check:
+                updates = self.check_for_updates()
+                if updates:
+                    self.enqueue_messages(self.fetch_messages(updates))
+                next_check = time.monotonic() + self.recheck_interval
+
+            entries = [self.work_queue.pop() for _ in range(min(batch_size, len(self.work_queue)))]
+            unfinished = list(entries)
+            try:
+                if self.batcher is not None:
+                    # Non-urgent mail waits for a Message Batch; a provisional file is written now
+                    for entry in entries:
+                        path = self._defer(*entry)
+                        if path is not None:
+                            written.append(path)
+                            unfinished.remove(entry)
+                    entries = list(unfinished)
+                    if not entries:
+                        continue
+                emails = [email for email, _, _ in entries]
+                if not self.processor:
+                    results = [None] * len(emails)
+                elif batch_size <= 1:
+                    results = [self.processor.process_email(**emails[0])]
+                else:
+                    # Concurrent mode: LLM work runs in parallel, files are written in queue order
+                    results = self.processor.process_emails(emails)
+                self.state.set_stages([email['message_id'] for email in emails], 'processed')
+
+                for entry, processed in zip(entries, results):
+                    email, lane, enqueued_at = entry
+                    written.append(self.write_action_file(email, processed))
+                    unfinished.remove(entry)
+                    self.work_attempts.pop(email['message_id'], None)
+                    priority = processed.get('priority', lane) if processed else lane
+                    self.latency.record(priority, time.monotonic() - enqueued_at)
+            finally:
+                # An exception must not lose the popped emails: put them back for the next poll
+                self._requeue(unfinished)
+
+        if len(written) > 1:
+            logger.info(f"[PRIORITY] Latency {self.latency.format()}")
+        return written
+
+    def _requeue(self, entries: list):
+        """Return popped work-queue entries to the queue, up to MAX_WORK_ATTEMPTS times each."""
+        if entries:
+            logger.warning(f"[PRIORITY] Processing stopped early - returning {len(entries)} email(s) to the queue")
+        for email, lane, enqueued_at in entries:
+            message_id = email['message_id']
+            attempts = self.work_attempts.get(message_id, 0) + 1
+            if attempts >= MAX_WORK_ATTEMPTS:
+                self.work_attempts.pop(message_id, None)
+                logger.error(f"[PRIORITY] Giving up on {email['subject'][:50]} ({message_id}) "
+                             f"after {attempts} failed attempts")
                 continue
+            self.work_attempts[message_id] = attempts
+            self.work_queue.push(message_id, email, lane, enqueued_at)
+
+    def _defer(self, email: dict, lane: str, enqueued_at: float):
+        """Queue an email for batch categorization if its lane allows it; returns the provisional file."""
+        if lane not in self.batch_priorities or not self.batcher.client:
+            return None
+        if self.processor.categorize_offline(email['email_from'], email['subject'],
+                                             email['content'], email['headers']) is not None:
+            return None  # A rule, cached result or the local classifier answers it at no cost
+
+        self.batcher.add(email, self.processor.categorize_key(email['email_from'], email['subject'], email['content']))
+        self.state.set_stage(email['message_id'], 'processed')
+        provisional = dict(self.processor.rules.classify(
+            email['email_from'], email['subject'], email['content'], email['headers']
+        ))
+        provisional['suggested_action'] = "Awaiting batch categorization"
+        path = self.write_action_file(email, provisional, extra_fields={'batch_status': 'pending'})
+        self.latency.record(lane, time.monotonic() - enqueued_at)
+        return path
+
+    def process_batches(self, force: bool = False) -> list:
+        """Submit due Message Batches and re-file the emails of finished ones."""
+        if self.batcher is None:
+            return []
+        finished = [(email, None) for email in self.batcher.flush(force=force)]
+        finished += self.batcher.poll(force=force)
 
-            for email_file in folder.glob("EMAIL_*.md"):
+        jobs = []
+        for email, message in finished:
+            provisional = self._provisional_file(email['message_id'])
+            if provisional is None:
+                continue
+            category = None
+            if message is not None:
                 try:
+                    category = self.processor.batch_category(email, message)
+                except (ValueError, IndexError, AttributeError) as e:
+                    logger.warning(f"[BATCH] Unreadable result for {email['message_id'][:10]}...: {e}")
+            # Without a category (failed request) process_email categorizes it synchronously
+            jobs.append((email, category, *provisional))
+        if not jobs:
+            return []
+
+        results = self.processor.process_emails([dict(email, category=category) for email, category, _, _ in jobs])
+        written = []
+        for (email, _, existing, received), processed in zip(jobs, results):
+            folder_name, target_folder = self._target_folder(processed, received)
+            if existing.parent != target_folder:
+                # Escalated to Pending_Approval, or auto-replied into Done/: move, then rewrite in place
+                target_folder.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(existing), str(target_folder / existing.name))
+                self.processor.record_file_moved(existing.parent.name, folder_name)
+            written.append(self.write_action_file(email, processed, received=received))
+        logger.info(f"[BATCH] Re-filed {len(written)} deferred email(s)")
+        return written
+
+    def _provisional_file(self, message_id: str):
+        """(path, received) of a deferred email's file, or None if it is gone or was acted on meanwhile."""
+        existing = self._find_email_file(message_id)
+        if existing is None:
+            logger.info(f"[BATCH] EMAIL_{message_id}.md was removed from the vault - result dropped")
+            return None
+        try:
+            content = existing.read_text(encoding='utf-8')
+        except OSError as e:
+            logger.error(f"  [BATCH] Could not read {existing.name}: {e}")
+            return None
+        fields = parse_frontmatter(content)
+        # A box ticked by hand (either case), or one the watcher already stamped (QUEUED, PENDING...)
+        acted_on = CHECKED_REPLY.search(content) or CHECKED_ARCHIVE.search(content) or '- [x]' in content
+        if fields.get('batch_status') != 'pending' or fields.get('status') != 'pending' \
+                or acted_on or self._in_done(existing):
+            logger.info(f"[BATCH] {existing.name} was handled meanwhile - keeping it as is")
+            return None
+        return existing, fields.get('received')
+
+    def mark_as_read(self, message_id: str):
+        """Queue marking an email as read (applied by flush_label_ops)."""
+        self.label_ops.mark_read(message_id)
+        return True
+
+    def archive(self, message_id: str):
+        """Queue archiving (and marking as read) an email in Gmail."""
+        self.label_ops.mark_read(message_id)
+        self.label_ops.archive(message_id)
+
+    def flush_label_ops(self, force: bool = False):
+        """Apply queued label changes with batchModify and report each result to its file."""
+        for message_id, (ops, error) in self.label_ops.flush(force=force).items():
+            email_file = self._find_email_file(message_id)
+            if error is not None:
+                logger.error(f"  [ERROR] Could not {'/'.join(ops)} {message_id[:10]}...: {error}")
+            if email_file is None:
+                continue
+            try:
+                content = email_file.read_text(encoding='utf-8')
+                if error is None:
+                    content = set_frontmatter_field(content, 'gmail_updated', ', '.join(ops))
+                    if 'archive' in ops:
+                        content = content.replace('- [x] Archive (PENDING)', '- [x] Archive (ARCHIVED)')
+                        content = re.sub(r'^status: pending$', 'status: archived', content, count=1, flags=re.MULTILINE)
+                        # A reply still in the outbox moves the file when it is sent (finalize_queued_sends)
+                        if not self._in_done(email_file) and '- [x] Reply to sender (QUEUED)' not in content:
+                            self._move_to_done(email_file, content)
+                            continue
+                else:
+                    reason = str(error).splitlines()[0][:120]
+                    content = set_frontmatter_field(content, 'gmail_error', f"{'/'.join(ops)}: {reason}")
+                    content = content.replace('- [x] Archive (PENDING)', f'- [ ] Archive (FAILED: {reason})')
+                self._save(email_file, content)
+            except OSError as e:
+                logger.error(f"  [LABELS] Could not update {email_file.name}: {e}")
+
+    @timed('scan_checkboxes')
+    def scan_for_checkbox_triggers(self, retry: bool = False):
+        """
+        Check changed EMAIL_*.md files for a checked 'Reply to sender' checkbox.
+        With retry=True, files whose send failed earlier are checked again too.
+        """
+        email_files = self.vault_tracker.changed_files()
+        if retry and self.checkbox_retry:
+            email_files = sorted(set(email_files) | self.checkbox_retry)
+            self.checkbox_retry = set()
+
+        for email_file in email_files:
+            try:
+                content = email_file.read_text(encoding='utf-8')
+                if self.index is not None:
+                    self.index.upsert(email_file, content)  # Picks up edits made in Obsidian
+
+                # Check if "Reply to sender" is checked
+                if CHECKED_REPLY.search(content):
+                    if not self._process_checked_email(email_file, content):
+                        # Send failed - try again next poll cycle
+                        self.checkbox_retry.add(email_file)
+                        continue
+                    if not email_file.exists():
+                        continue  # Sent and moved to Done/
                     content = email_file.read_text(encoding='utf-8')
 
-                    # Check if "Reply to sender" is checked
-                    if '- [x] Reply to sender' in content or '- [X] Reply to sender' in content:
-                        self._process_checked_email(email_file, content)
-                except Exception as e:
-                    logger.error(f"Error scanning {email_file.name}: {e}")
+                # Check if "Archive" is checked
+                if CHECKED_ARCHIVE.search(content):
+                    self._process_archive(email_file, content)
+            except FileNotFoundError:
+                pass  # Moved or deleted since it changed
+            except Exception as e:
+                logger.error(f"Error scanning {email_file.name}: {e}")
 
-    def _process_checked_email(self, email_file: Path, content: str):
-        """Process an email that has 'Reply to sender' checked."""
+    def _process_checked_email(self, email_file: Path, content: str) -> bool:
+        """Queue (or send) the reply for an email with 'Reply to sender' checked."""
         logger.info(f"[CHECKBOX] Processing: {email_file.name}")
 
         # Extract email details from frontmatter
@@ -143,7 +695,7 @@ class GmailWatcher(BaseWatcher):
 
         if not from_match:
             logger.error(f"  Error: Could not find 'from' in {email_file.name}")
-            return
+            return True  # Nothing to retry
 
         email_from = from_match.group(1).strip()
         subject = subject_match.group(1).strip() if subject_match else "No Subject"
@@ -166,141 +718,322 @@ class GmailWatcher(BaseWatcher):
 
         reply_subject = f"Re: {subject}" if not subject.startswith("Re:") else subject
 
+        # Extract message ID from filename (EMAIL_xxxxx.md)
+        gmail_message_id = email_file.stem.replace('EMAIL_', '')
+
+        # Queue the reply; the file moves to Done/ once the background sender confirms
+        if self.processor and self.processor.outbox:
+            self.processor.outbox.enqueue(
+                f"reply:{gmail_message_id}", reply_to, reply_subject, reply_body,
+                kind='reply', message_id=gmail_message_id, source_path=str(email_file)
+            )
+            updated_content = re.sub(r'^status: (pending|send_failed)$', 'status: queued', content, count=1, flags=re.MULTILINE)
+            updated_content = CHECKED_REPLY.sub('- [x] Reply to sender (QUEUED)', updated_content)
+            self._save(email_file, updated_content)
+            return True
+
         # Send the email
         if self.processor and self.processor.send_email(reply_to, reply_subject, reply_body):
             logger.info(f"  [SENT] Reply sent to: {reply_to}")
+            self._complete_sent_reply(email_file, content, gmail_message_id)
+            return True
+
+        logger.error(f"  [FAILED] Could not send reply to: {reply_to}")
+        return False
+
+    def _process_archive(self, email_file: Path, content: str):
+        """Queue archiving the original email; the result is written back after the flush."""
+        logger.info(f"[CHECKBOX] Archiving: {email_file.name}")
+        self.archive(email_file.stem.replace('EMAIL_', ''))
+        # Folded near-duplicates are archived with their group
+        for duplicate_id in filter(None, parse_frontmatter(content).get('duplicate_ids', '').split(',')):
+            self.archive(duplicate_id)
+        self._save(email_file, CHECKED_ARCHIVE.sub('- [x] Archive (PENDING)', content))
+
+    def _complete_sent_reply(self, email_file: Path, content: str, gmail_message_id: str):
+        """Mark the original as read, stamp the file as sent and move it to Done/."""
+        # Mark original email as read in Gmail
+        self.mark_as_read(gmail_message_id)
+        self.state.set_stage(gmail_message_id, 'sent')
+
+        # Update the file content - mark as sent
+        updated_content = re.sub(r'^status: (pending|queued|send_failed)$', 'status: sent', content, count=1, flags=re.MULTILINE)
+        updated_content = updated_content.replace('- [x] Reply to sender (QUEUED)', '- [x] Reply to sender (SENT)')
+        updated_content = CHECKED_REPLY.sub('- [x] Reply to sender (SENT)', updated_content)
+
+        # Add sent timestamp
+        sent_timestamp = datetime.now().isoformat()
+        updated_content = set_frontmatter_field(updated_content, 'sent_at', sent_timestamp)
+
+        self._move_to_done(email_file, updated_content)
+
+    def _move_to_done(self, email_file: Path, content: str):
+        """Write the updated file to its dated Done/ subfolder and remove the original."""
+        target = done_folder_for(self.vault_path, parse_frontmatter(content).get('received'))
+        if self._in_done(email_file) or target == email_file.parent:
+            # Already archived: update it where it is (unlinking would delete the only copy)
+            self._save(email_file, content)
+            return
+        target.mkdir(parents=True, exist_ok=True)
+        self._save(target / email_file.name, content)
+        email_file.unlink()  # Delete original
+
+        logger.info(f"  [MOVED] {email_file.name} → {target.relative_to(self.vault_path).as_posix()}/")
 
-            # Extract message ID from filename (EMAIL_xxxxx.md)
-            gmail_message_id = email_file.stem.replace('EMAIL_', '')
+        # Update dashboard counts (written on the next debounced flush)
+        if self.processor:
+            self.processor.record_file_moved(email_file.parent.name, 'Done')
+
+    def finalize_queued_sends(self):
+        """Report outbox results back to the vault: move sent replies, flag failed ones."""
+        if not (self.processor and self.processor.outbox):
+            return
+
+        outbox = self.processor.outbox
+        for row in outbox.completed():
+            email_file = self._find_email_file(row['message_id'], row['source_path'])
+            try:
+                if email_file is None:
+                    logger.warning(f"  [QUEUE] File for {row['message_id']} no longer in vault")
+                elif row['status'] == 'sent' and row['kind'] == 'reply':
+                    self._complete_sent_reply(email_file, email_file.read_text(encoding='utf-8'), row['message_id'])
+                elif row['status'] == 'failed':
+                    content = email_file.read_text(encoding='utf-8')
+                    error = (row['last_error'] or 'unknown error').splitlines()[0][:120]
+                    # Uncheck so the reviewer can re-check it to try again
+                    content = content.replace('- [x] Reply to sender (QUEUED)', f'- [ ] Reply to sender (FAILED: {error})')
+                    content = content.replace('Auto-reply queued and archived', f'Auto-reply FAILED: {error}')
+                    content = re.sub(r'^status: (pending|queued)$', 'status: send_failed', content, count=1, flags=re.MULTILINE)
+                    self._save(email_file, content)
+                    logger.error(f"  [FAILED] {row['kind']} to {row['to_addr']}: {error}")
+            except OSError as e:
+                logger.error(f"  [QUEUE] Could not update {email_file.name}: {e}")
+                continue  # Try again next cycle
+            outbox.mark_finalized(row['id'])
+
+    def _find_email_file(self, message_id: str, source_path: str = None):
+        """
+        Locate EMAIL_<id>.md: its recorded or indexed path, else any scanned folder or Done/.
+        A file that is nowhere in the vault (deleted in Obsidian) is dropped from the index.
+        """
+        if source_path and Path(source_path).exists():
+            return Path(source_path)
+        indexed = None
+        if self.index is not None:
+            indexed = self.index.path_for(message_id)
+            if indexed is not None and indexed.exists():
+                return indexed
+        name = f'EMAIL_{message_id}.md'
+        for folder in self.scan_folders + [self.done_folder]:
+            candidate = folder / name
+            if candidate.exists():
+                return candidate
+        # Slow path: search the dated Done/ subfolders
+        found = next(self.done_folder.rglob(name), None)
+        if found is None and indexed is not None:
+            self.index.remove(message_id)
+        return found
 
-            # Mark original email as read in Gmail
-            self.mark_as_read(gmail_message_id)
+    def _in_done(self, path: Path) -> bool:
+        return self.done_folder in path.parents
 
-            # Update the file content - mark as sent
-            updated_content = content.replace('status: pending', 'status: sent')
-            updated_content = updated_content.replace('- [x] Reply to sender', '- [x] Reply to sender (SENT)')
-            updated_content = updated_content.replace('- [X] Reply to sender', '- [x] Reply to sender (SENT)')
+    def _save(self, path: Path, content: str):
+        """Write a vault file and record it in the frontmatter and history indexes."""
+        path.write_text(content, encoding='utf-8')
+        if self.index is not None:
+            self.index.upsert(path, content)
+        if self.processor and self.processor.history is not None:
+            self.processor.history.add_email(path, content)
 
-            # Add sent timestamp
-            sent_timestamp = datetime.now().isoformat()
-            updated_content = updated_content.replace(
-                '---\n\n## Email Content',
-                f'sent_at: {sent_timestamp}\n---\n\n## Email Content'
+    @property
+    def idle_interval(self) -> float:
+        """How often on_idle() runs between polls under the multi-watcher runtime."""
+        interval = 1.0 if self.vault_tracker.mode == "events" else self.vault_tracker.poll_interval
+        if self.processor and self.processor.dashboard_dirty:
+            interval = min(interval, self.processor.dashboard_interval)
+        return interval
+
+    def start(self):
+        """Start the vault observer, wake-up triggers and the background sender."""
+        self.vault_tracker.start()
+        # A signal or the touch-file also interrupts the vault wait
+        self.waker.on_wake = self.vault_tracker.wake
+        super().start()
+        if self.processor and self.processor.outbox:
+            # Wake the loop as soon as a queued send finishes
+            self.processor.outbox.on_complete = self.vault_tracker.wake
+            self.processor.outbox.start()
+        if self.push_enabled():
+            self.push_receiver = PushReceiver.shared(
+                os.getenv('GMAIL_PUSH_HOST', '127.0.0.1'),
+                int(os.getenv('GMAIL_PUSH_PORT', '8085')),
+                os.getenv('GMAIL_PUSH_PATH', '/gmail/push'),
+                os.getenv('GMAIL_PUSH_TOKEN')
+            )
+            self.push_receiver.register(self.email_address, self._on_push)
+            self.push_receiver.start()
+        REGISTRY.add_collector(self._collect_metrics)
+        if self.metrics_port:
+            self.metrics_server = MetricsServer.shared(
+                os.getenv('METRICS_HOST', '127.0.0.1'), int(self.metrics_port)
             )
+            self.metrics_server.start()
 
-            # Move to Done folder
-            done_path = self.done_folder / email_file.name
-            done_path.write_text(updated_content, encoding='utf-8')
-            email_file.unlink()  # Delete original
+    def stop(self):
+        self.flush_label_ops(force=True)  # Last chance for changes still backing off
+        self.vault_tracker.stop()
+        super().stop()
+        if self.processor and self.processor.outbox:
+            self.processor.outbox.stop()
+        if self.push_receiver:
+            self.push_receiver.unregister(self.email_address)
+            self.push_receiver.stop()
+            self.push_receiver = None
+        self.export_metrics(force=True)
+        REGISTRY.remove_collector(self._collect_metrics)
+        if self.metrics_server:
+            self.metrics_server.stop()
+            self.metrics_server = None
 
-            logger.info(f"  [MOVED] {email_file.name} → Done/")
+    def run_once(self) -> int:
+        """Poll Gmail, file new emails and run a vault cycle; returns the number of new emails."""
+        if self.push_receiver and self.push_topic and time.monotonic() >= self._watch_renew_at:
+            self.renew_watch()
 
-            # Update dashboard
-            if self.processor:
-                self.processor.update_dashboard()
-        else:
-            logger.error(f"  [FAILED] Could not send reply to: {reply_to}")
+        # 1. Check for new emails (bulk fetch, then process as one batch)
+        updates = self.check_for_updates()
+        if updates:
+            self.process_messages(self.fetch_messages(updates))
+        elif len(self.work_queue):
+            self.drain_work_queue()
+
+        # 2. Scan for checkbox triggers (and retry failed sends)
+        self._vault_cycle(retry=True)
+        return len(updates)
+
+    def on_idle(self):
+        """Between polls: react to vault edits and finished sends."""
+        self._vault_cycle()
+
+    def _vault_cycle(self, retry: bool = False):
+        self.scan_for_checkbox_triggers(retry=retry)
+        self.finalize_queued_sends()
+        self.process_batches()
+
+        # Apply this cycle's mark-read/archive changes in bulk
+        self.flush_label_ops()
+
+        # 3. Write Dashboard.md if counts changed (at most once per interval)
+        if self.processor:
+            self.processor.flush_dashboard()
+        self.export_metrics()
+
+    def _collect_metrics(self):
+        """Refresh queue-depth gauges before metrics are rendered."""
+        vault = self.vault_path.name
+        QUEUE_DEPTH.set(len(self.work_queue), queue='work', vault=vault)
+        QUEUE_DEPTH.set(len(self.label_ops), queue='labels', vault=vault)
+        if self.batcher is not None:
+            QUEUE_DEPTH.set(len(self.batcher), queue='batch', vault=vault)
+        if self.processor and self.processor.outbox:
+            QUEUE_DEPTH.set(self.processor.outbox.pending_count(), queue='outbox', vault=vault)
+
+    def export_metrics(self, force: bool = False):
+        """Write the METRICS_TEXTFILE at most once per metrics_interval."""
+        if not self.metrics_textfile:
+            return
+        now = time.monotonic()
+        if force or now - self._metrics_written_at >= self.metrics_interval:
+            REGISTRY.write_textfile(self.metrics_textfile)
+            self._metrics_written_at = now
 
     def run(self):
         """Override run to include checkbox scanning."""
-        logger.info(f"Watcher started. Checking every {self.check_interval} seconds...")
+        logger.info(f"Watcher started. Checking Gmail {self.poll_policy.describe()}...")
         logger.info("Checkbox trigger: Check '- [x] Reply to sender' to auto-send")
         logger.info("-" * 50)
 
+        self.start()
         try:
+            next_poll = 0
             while True:
-                # 1. Check for new emails
-                updates = self.check_for_updates()
-                for update in updates:
-                    self.create_action_file(update)
+                if time.monotonic() >= next_poll:
+                    interval = self.poll_policy.next_interval(self.run_once())
+                    next_poll = time.monotonic() + interval
+                    logger.debug(f"[SCHEDULE] Next Gmail check in {interval:.0f}s")
+                else:
+                    self.on_idle()
 
-                # 2. Scan for checkbox triggers
-                self.scan_for_checkbox_triggers()
+                wait_for = next_poll - time.monotonic()
+                if self.processor and self.processor.dashboard_dirty:
+                    wait_for = min(wait_for, self.processor.dashboard_interval)
 
-                import time
-                time.sleep(self.check_interval)
+                # Wakes within a second of a vault change, else at the next poll
+                self.vault_tracker.wait(wait_for)
+                if self.waker.consume():
+                    next_poll = 0
         except KeyboardInterrupt:
             logger.info("Watcher stopped.")
+        finally:
+            self.stop()
 
+    @timed('create_action_file')
     def create_action_file(self, message) -> Path:
-        msg = self.service.users().messages().get(
-            userId='me', id=message['id']
-        ).execute()
+        email = self._parse_message(message)
+        processed = self.processor.process_email(**email) if self.processor else None
+        self.state.set_stage(email['message_id'], 'processed')
+        return self.write_action_file(email, processed)
+
+    def _parse_message(self, message) -> dict:
+        """Turn a Gmail message into process_email() keyword arguments."""
+        # Messages from fetch_messages() already carry their headers
+        if 'payload' in message:
+            msg = message
+        else:
+            API_CALLS.inc(api='gmail', method='messages.get')
+            msg = self.service.users().messages().get(
+                userId='me', id=message['id'],
+                format='metadata', metadataHeaders=METADATA_HEADERS
+            ).execute()
 
         headers = {h['name']: h['value'] for h in msg['payload']['headers']}
 
-        email_from = headers.get('From', 'Unknown')
-        subject = headers.get('Subject', 'No Subject')
-        snippet = msg.get('snippet', '')
-        message_id = message['id']
+        return {
+            'email_from': headers.get('From', 'Unknown'),
+            'subject': headers.get('Subject', 'No Subject'),
+            'content': msg.get('snippet', ''),
+            'message_id': message['id'],
+            'headers': headers
+        }
 
-        # Process with email processor if available
-        if self.processor:
-            processed = self.processor.process_email(
-                email_from=email_from,
-                subject=subject,
-                content=snippet,
-                message_id=message_id
-            )
-            priority = processed.get('priority', 'MEDIUM')
-            reason = processed.get('reason', '')
-            suggested_action = processed.get('suggested_action', '')
-            draft = processed.get('draft', '')
-        else:
-            priority = 'MEDIUM'
-            reason = 'Auto-assigned (no AI)'
-            suggested_action = 'Review manually'
-            draft = ''
-
-        # Build the markdown content
-        content = f'''---
-type: email
-from: {email_from}
-subject: {subject}
-received: {datetime.now().isoformat()}
-status: pending
-priority: {priority}
-priority_reason: {reason}
----
-
-## Email Content
-{snippet}
-
-## AI Analysis
-- **Priority**: {priority}
-- **Reason**: {reason}
-- **Suggested Action**: {suggested_action}
-
-## Actions
-- [ ] Reply to sender
-- [ ] Archive
-'''
-
-        # Add draft section if generated
-        if draft:
-            content += f'''
-## Draft Response
-> {draft.replace(chr(10), chr(10) + '> ')}
-
-*Check "Reply to sender" above to send this draft automatically.*
-'''
-
-        # Determine folder based on priority and auto-reply status
-        auto_replied = processed.get('auto_replied', False) if self.processor else False
-
-        if auto_replied:
-            target_folder = self.vault_path / "Done"
-            target_folder.mkdir(parents=True, exist_ok=True)
-            filepath = target_folder / f'EMAIL_{message_id}.md'
-        elif priority in ['URGENT', 'HIGH'] and draft:
-            target_folder = self.vault_path / "Pending_Approval"
-            target_folder.mkdir(parents=True, exist_ok=True)
-            filepath = target_folder / f'EMAIL_{message_id}.md'
-        else:
-            filepath = self.needs_action / f'EMAIL_{message_id}.md'
+    def _target_folder(self, processed: dict, received: str = None):
+        """(folder name, folder path) an email's file belongs in."""
+        folder_name = target_folder_name(processed)
+        if folder_name == "Done":
+            return folder_name, done_folder_for(self.vault_path, received)
+        return folder_name, self.vault_path / folder_name
+
+    @timed('write_file')
+    def write_action_file(self, email: dict, processed: dict = None, received: str = None,
+                          extra_fields: dict = None) -> Path:
+        """Write the EMAIL_*.md file for a (possibly processed) email."""
+        subject = email['subject']
+        message_id = email['message_id']
+        result = analysis(processed)
+        priority = result['priority']
+        auto_replied = result['auto_replied']
+        content = self._with_duplicates(message_id, render_action_file(email, processed, received, extra_fields))
+
+        # Folder depends on priority and auto-reply status
+        folder_name, target_folder = self._target_folder(processed, parse_frontmatter(content).get('received'))
+        target_folder.mkdir(parents=True, exist_ok=True)
+        filepath = target_folder / f'EMAIL_{message_id}.md'
 
-        filepath.write_text(content, encoding='utf-8')
-        self.processed_ids.add(message_id)
+        is_new_file = not filepath.exists()
+        self._save(filepath, content)
+        self.state.set_stage(message_id, 'written')
+        if is_new_file:
+            EMAILS.inc(priority=priority)
 
         # Console output
         priority_icons = {'URGENT': '[!!!]', 'HIGH': '[!!]', 'MEDIUM': '[!]', 'LOW': '[.]'}
@@ -308,9 +1041,9 @@ priority_reason: {reason}
         auto_tag = " [AUTO-REPLIED]" if auto_replied else ""
         logger.info(f"{icon} {priority} - {subject[:50]}{'...' if len(subject) > 50 else ''}{auto_tag}")
 
-        # Update dashboard
-        if self.processor:
-            self.processor.update_dashboard()
+        # Update dashboard counts (written on the next debounced flush)
+        if self.processor and is_new_file:
+            self.processor.record_file_added(folder_name)
 
         return filepath
 
@@ -323,9 +1056,9 @@ if __name__ == "__main__":
     logger.info("AI Employee System - Gmail Watcher")
     logger.info("=" * 50)
     logger.info(f"Vault: {VAULT_PATH}")
-    logger.info(f"Check Interval: 120 seconds")
     logger.info(f"Log File: {LOG_FILE}")
-    logger.info("=" * 50)
 
     watcher = GmailWatcher(VAULT_PATH, TOKEN_PATH)
+    logger.info(f"Polling: {watcher.poll_policy.describe()}")
+    logger.info("=" * 50)
     watcher.run()
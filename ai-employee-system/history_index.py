@@ -0,0 +1,344 @@
+"""
+History Index - Full-text retrieval of past exchanges and handbook sections for drafts
+Vault emails (with the reply that was sent, if any) and the sections of
+Company_Handbook.md are kept in a SQLite FTS5 index. For each draft, the
+earlier emails from the same sender and the handbook sections most relevant
+to the new email (BM25 ranking) are packed into a fixed token budget, so the
+prompt carries context without pasting whole files.
+Indexing is incremental: only files whose mtime or size changed are re-read.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from frontmatter import parse_frontmatter, get_section
+from dedup import sender_key
+from metrics import timed
+
+logger = logging.getLogger('HistoryIndex')
+
+DEFAULT_INDEX_PATH = Path(__file__).parent / "state" / "history_index.sqlite3"
+
+# Folders holding EMAIL_*.md files (searched recursively, so Done/YYYY/MM/ is included)
+VAULT_FOLDERS = ("Inbox", "Pending_Approval", "Approved", "Done")
+
+try:
+    sqlite3.connect(':memory:').execute("CREATE VIRTUAL TABLE probe USING fts5(x)")
+    FTS5_AVAILABLE = True
+except sqlite3.OperationalError:
+    FTS5_AVAILABLE = False
+
+# Rough token estimate for budgeting (English text averages ~4 characters per token)
+CHARS_PER_TOKEN = 4
+
+MAX_QUERY_TERMS = 24
+MAX_SECTION_CHARS = 1200
+MAX_EXCERPT_CHARS = 400
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9']{2,}")
+_HEADING = re.compile(r'^#{1,6}\s+\S', re.MULTILINE)
+STOPWORDS = frozenset("""
+about after again also and any are because been before being but can could did does doing down during each
+few for from further had has have having her here hers him his how into its just more most not now off once
+only other our ours out over own same she should some such than that the their theirs them then there these
+they this those through too under until very was were what when where which while who whom why will with
+would you your yours hello thanks thank regards dear please best kind sent re fwd
+""".split())
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+    subject, body, reply, tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS sources (
+    doc_key TEXT PRIMARY KEY,
+    doc_rowid INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    sender TEXT,
+    received TEXT,
+    path TEXT,
+    mtime REAL,
+    size INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_sources_sender ON sources(sender, received);
+CREATE INDEX IF NOT EXISTS idx_sources_kind ON sources(kind);
+"""
+
+
+def query_terms(*texts: str) -> list:
+    """Distinct content words of the texts, in order (stopwords and short words dropped)."""
+    terms = []
+    seen = set()
+    for text in texts:
+        for word in _WORD.findall((text or '').lower()):
+            word = word.strip("'")
+            if word not in STOPWORDS and word not in seen and not word.isdigit():
+                seen.add(word)
+                terms.append(word)
+                if len(terms) >= MAX_QUERY_TERMS:
+                    return terms
+    return terms
+
+
+def split_sections(text: str) -> list:
+    """Split markdown at its headings into (heading, body) chunks of at most MAX_SECTION_CHARS."""
+    starts = [m.start() for m in _HEADING.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    sections = []
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        chunk = text[start:end].strip()
+        if not chunk:
+            continue
+        heading, _, body = chunk.partition('\n')
+        if not heading.startswith('#'):
+            heading, body = '', chunk
+        body = body.strip()
+        # Long sections are split at paragraph breaks
+        piece = ''
+        for paragraph in re.split(r'\n\s*\n', body) or ['']:
+            if piece and len(piece) + len(paragraph) > MAX_SECTION_CHARS:
+                sections.append((heading, piece))
+                piece = ''
+            piece = f"{piece}\n\n{paragraph}".strip() if piece else paragraph[:MAX_SECTION_CHARS]
+        if piece or heading:
+            sections.append((heading, piece))
+    return sections
+
+
+def _excerpt(text: str, limit: int) -> str:
+    text = ' '.join((text or '').split())
+    return text if len(text) <= limit else text[:limit].rsplit(' ', 1)[0] + ' ...'
+
+
+class HistoryIndex:
+    """FTS5 index of vault emails and handbook sections, refreshed incrementally."""
+
+    def __init__(self, vault_path, path=None, handbook_path=None, refresh_interval: float = 300):
+        self.vault_path = Path(vault_path)
+        self.handbook_path = Path(handbook_path) if handbook_path else self.vault_path / "Company_Handbook.md"
+        self.path = Path(path) if path else DEFAULT_INDEX_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.refresh_interval = refresh_interval
+        self._last_refresh = float('-inf')
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    # -- Indexing -----------------------------------------------------------
+
+    def _put(self, doc_key: str, kind: str, subject: str, body: str, reply: str = '',
+             sender: str = None, received: str = None, path: str = None, mtime: float = None, size: int = None):
+        """Insert or replace one document (caller holds the lock and commits)."""
+        row = self.conn.execute("SELECT doc_rowid FROM sources WHERE doc_key = ?", (doc_key,)).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM docs WHERE rowid = ?", (row[0],))
+        rowid = self.conn.execute(
+            "INSERT INTO docs (subject, body, reply) VALUES (?, ?, ?)", (subject, body, reply)
+        ).lastrowid
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sources (doc_key, doc_rowid, kind, sender, received, path, mtime, size) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (doc_key, rowid, kind, sender, received, path, mtime, size)
+        )
+
+    def _delete(self, doc_key: str):
+        row = self.conn.execute("SELECT doc_rowid FROM sources WHERE doc_key = ?", (doc_key,)).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM docs WHERE rowid = ?", (row[0],))
+            self.conn.execute("DELETE FROM sources WHERE doc_key = ?", (doc_key,))
+
+    def _put_email(self, path: Path, content: str, stat=None):
+        fields = parse_frontmatter(content)
+        reply = ''
+        if fields.get('status') == 'sent':
+            # The draft that was sent is the reply; drop the "> " quoting
+            reply = re.sub(r'^> ?', '', get_section(content, 'Draft Response'), flags=re.MULTILINE)
+            reply = reply.split('\n*Check', 1)[0].strip()
+        self._put(
+            f"email:{path.stem[len('EMAIL_'):]}", 'email', fields.get('subject', ''),
+            get_section(content, 'Email Content'), reply,
+            sender=sender_key(fields.get('from', '')), received=fields.get('received'), path=str(path),
+            mtime=stat.st_mtime if stat else None, size=stat.st_size if stat else None,
+        )
+
+    def add_email(self, path, content: str = None):
+        """Index (or re-index) one EMAIL_*.md file, e.g. right after the watcher writes it."""
+        path = Path(path)
+        try:
+            if content is None:
+                content = path.read_text(encoding='utf-8')
+            stat = path.stat()
+        except OSError:
+            return
+        with self._lock:
+            self._put_email(path, content, stat)
+            self.conn.commit()
+
+    def _refresh_handbook(self) -> bool:
+        """Re-split the handbook into sections if it changed. Returns True if re-indexed."""
+        try:
+            stat = self.handbook_path.stat()
+        except FileNotFoundError:
+            stat = None
+        row = self.conn.execute(
+            "SELECT mtime, size FROM sources WHERE kind = 'handbook' ORDER BY doc_key LIMIT 1"
+        ).fetchone()
+        if stat is None and row is None:
+            return False
+        if stat is not None and row is not None and tuple(row) == (stat.st_mtime, stat.st_size):
+            return False
+
+        for (doc_key,) in self.conn.execute("SELECT doc_key FROM sources WHERE kind = 'handbook'").fetchall():
+            self._delete(doc_key)
+        if stat is not None:
+            text = self.handbook_path.read_text(encoding='utf-8')
+            for number, (heading, body) in enumerate(split_sections(text)):
+                self._put(f"handbook:{number:04d}", 'handbook', heading.lstrip('#').strip(), body,
+                          path=str(self.handbook_path), mtime=stat.st_mtime, size=stat.st_size)
+        return True
+
+    def refresh_handbook(self) -> bool:
+        """Re-split the handbook now if it changed (e.g. the processor saw it change)."""
+        with self._lock:
+            changed = self._refresh_handbook()
+            self.conn.commit()
+        return changed
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Bring the index up to date with the vault: re-read changed files, drop
+        deleted ones. Runs at most once per refresh_interval unless forced.
+        Returns the number of documents added, updated or removed.
+        """
+        if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+            return 0
+        started = time.perf_counter()
+        changed = 0
+        with self._lock:
+            self._last_refresh = time.monotonic()
+            changed += self._refresh_handbook()
+            known = {
+                row[0]: (row[1], row[2], row[3])
+                for row in self.conn.execute("SELECT doc_key, path, mtime, size FROM sources WHERE kind = 'email'")
+            }
+            seen = set()
+            for name in VAULT_FOLDERS:
+                for directory, _, files in os.walk(self.vault_path / name):
+                    for file_name in files:
+                        if not (file_name.startswith('EMAIL_') and file_name.endswith('.md')):
+                            continue
+                        doc_key = f"email:{file_name[6:-3]}"
+                        path = os.path.join(directory, file_name)
+                        try:
+                            stat = os.stat(path)
+                        except FileNotFoundError:
+                            continue
+                        seen.add(doc_key)
+                        if known.get(doc_key) == (path, stat.st_mtime, stat.st_size):
+                            continue
+                        try:
+                            self._put_email(Path(path), Path(path).read_text(encoding='utf-8'), stat)
+                            changed += 1
+                        except (OSError, UnicodeDecodeError) as e:
+                            logger.warning(f"[HISTORY] Skipped {file_name}: {e}")
+            for doc_key in known.keys() - seen:
+                self._delete(doc_key)
+                changed += 1
+            self.conn.commit()
+        if changed:
+            logger.info(f"[HISTORY] Indexed {changed} change(s) in {time.perf_counter() - started:.2f}s")
+        return changed
+
+    # -- Retrieval ----------------------------------------------------------
+
+    def _exchanges(self, sender: str, match: str, limit: int, exclude: str = '') -> list:
+        """Earlier emails from `sender` (except doc `exclude`): best BM25 matches first, then the most recent."""
+        columns = "s.doc_key, s.received, d.subject, d.body, d.reply"
+        rows = []
+        if match:
+            rows = self.conn.execute(
+                f"SELECT {columns} FROM docs d JOIN sources s ON s.doc_rowid = d.rowid "
+                "WHERE docs MATCH ? AND d.rowid IN (SELECT doc_rowid FROM sources WHERE sender = ?) "
+                "AND s.doc_key != ? ORDER BY bm25(docs, 2.0, 1.0, 1.0) LIMIT ?", (match, sender, exclude, limit)
+            ).fetchall()
+        if len(rows) < limit:
+            found = {row[0] for row in rows}
+            recent = self.conn.execute(
+                f"SELECT {columns} FROM sources s JOIN docs d ON d.rowid = s.doc_rowid "
+                "WHERE s.kind = 'email' AND s.sender = ? AND s.doc_key != ? ORDER BY s.received DESC LIMIT ?",
+                (sender, exclude, limit + len(found))
+            ).fetchall()
+            rows += [row for row in recent if row[0] not in found][:limit - len(rows)]
+        return rows
+
+    def _handbook_sections(self, match: str, limit: int) -> list:
+        """The handbook's opening section (general tone guidance), then sections by BM25 relevance."""
+        columns = "s.doc_key, d.subject, d.body FROM docs d JOIN sources s ON s.doc_rowid = d.rowid"
+        rows = self.conn.execute(
+            f"SELECT {columns} WHERE s.kind = 'handbook' ORDER BY s.doc_key LIMIT 1"
+        ).fetchall()
+        if match and limit > 1:
+            rows += self.conn.execute(
+                f"SELECT {columns} WHERE docs MATCH ? AND s.kind = 'handbook' AND s.doc_key != ? "
+                "ORDER BY bm25(docs, 2.0, 1.0, 1.0) LIMIT ?",
+                (match, rows[0][0] if rows else '', limit - 1)
+            ).fetchall()
+        return [(heading, body) for _, heading, body in rows[:limit]]
+
+    @timed('history_lookup')
+    def context_for(self, email_from: str, subject: str, content: str, budget_tokens: int = 800,
+                    exchanges: int = 3, sections: int = 3, handbook: bool = True, message_id: str = None) -> str:
+        """
+        Prompt text with the most relevant earlier exchanges with the sender and
+        handbook sections, at most `budget_tokens` (estimated) long. Empty if none.
+        The email being answered (`message_id`) is never one of the exchanges.
+        """
+        self.refresh()
+        started = time.perf_counter()
+        terms = query_terms(subject, content)
+        match = ' OR '.join(f'"{term}"' for term in terms)
+        with self._lock:
+            history = self._exchanges(sender_key(email_from), match, exchanges,
+                                      exclude=f"email:{message_id}" if message_id else '')
+            handbook_rows = self._handbook_sections(match, sections) if handbook else []
+
+        history_items = []
+        for _, received, past_subject, body, reply in history:
+            text = f'- {(received or "")[:10]} "{past_subject}"\n  They wrote: {_excerpt(body, MAX_EXCERPT_CHARS)}'
+            if reply:
+                text += f"\n  You replied: {_excerpt(reply, MAX_EXCERPT_CHARS)}"
+            history_items.append(text)
+        handbook_items = [f"### {heading}\n{body}" if heading else body for heading, body in handbook_rows]
+
+        # Take exchanges and sections alternately (each in rank order) while they fit the budget
+        picked = {'history': [], 'handbook': []}
+        remaining = budget_tokens * CHARS_PER_TOKEN
+        for rank in range(max(len(history_items), len(handbook_items))):
+            for kind, candidates in (('history', history_items), ('handbook', handbook_items)):
+                if rank < len(candidates) and len(candidates[rank]) <= remaining:
+                    picked[kind].append(candidates[rank])
+                    remaining -= len(candidates[rank])
+
+        parts = []
+        if picked['history']:
+            parts.append("Earlier emails from this sender:\n" + '\n'.join(picked['history']))
+        if picked['handbook']:
+            parts.append("Relevant handbook sections:\n" + '\n\n'.join(picked['handbook']))
+        context = '\n\n'.join(parts)
+        logger.info(f"[HISTORY] {len(picked['history'])} exchange(s), {len(picked['handbook'])} handbook section(s), "
+                    f"~{len(context) // CHARS_PER_TOKEN} tokens in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return context
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
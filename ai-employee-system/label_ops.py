@@ -0,0 +1,128 @@
+"""
+Label Ops - Accumulate Gmail label changes and apply them in bulk
+Mark-read and archive operations collected during a cycle are grouped
+by identical label changes and flushed with users.messages.batchModify
+(up to 1000 IDs per call) instead of one messages.modify call per email.
+Messages that fail transiently are retried with exponential backoff.
+"""
+
+import logging
+import random
+import time
+from send_queue import is_transient
+from metrics import API_CALLS, API_ERRORS
+
+logger = logging.getLogger('LabelOps')
+
+# Gmail's limit on IDs per batchModify request
+MAX_BATCH_IDS = 1000
+
+# Named operations -> (labels to add, labels to remove)
+OPERATIONS = {
+    'mark_read': ((), ('UNREAD',)),
+    'archive': ((), ('INBOX',)),
+}
+
+
+class LabelBatcher:
+    """Collects per-message label changes and applies them with batchModify."""
+
+    def __init__(self, service, max_ids: int = MAX_BATCH_IDS, base_delay: float = 5.0, max_delay: float = 900.0):
+        self.service = service
+        self.max_ids = max_ids
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # message_id -> {'add': set, 'remove': set, 'ops': list, 'attempts': int, 'next_attempt': float}
+        self.pending = {}
+
+    def __len__(self):
+        return len(self.pending)
+
+    def _change(self, message_id: str, add, remove, op: str):
+        entry = self.pending.setdefault(
+            message_id, {'add': set(), 'remove': set(), 'ops': [], 'attempts': 0, 'next_attempt': 0.0}
+        )
+        entry['add'].difference_update(remove)
+        entry['add'].update(add)
+        entry['remove'].difference_update(add)
+        entry['remove'].update(remove)
+        if op not in entry['ops']:
+            entry['ops'].append(op)
+
+    def queue(self, message_id: str, op: str):
+        """Queue a named operation ('mark_read' or 'archive')."""
+        add, remove = OPERATIONS[op]
+        self._change(message_id, add, remove, op)
+
+    def mark_read(self, message_id: str):
+        self.queue(message_id, 'mark_read')
+
+    def archive(self, message_id: str):
+        self.queue(message_id, 'archive')
+
+    def flush(self, force: bool = False) -> dict:
+        """
+        Apply everything queued and due (everything with force=True). Returns
+        {message_id: (ops, error)} where error is None on success. Transiently
+        failed messages stay queued (and are left out) until their backoff ends.
+        """
+        now = time.monotonic()
+        due = [message_id for message_id, entry in self.pending.items()
+               if force or entry['next_attempt'] <= now]
+        if not due:
+            return {}
+
+        # Messages with the same label changes share a request
+        groups = {}
+        pending = {}
+        for message_id in due:
+            entry = pending[message_id] = self.pending.pop(message_id)
+            key = (tuple(sorted(entry['add'])), tuple(sorted(entry['remove'])))
+            groups.setdefault(key, []).append(message_id)
+
+        results = {}
+        calls = 0
+        for (add, remove), ids in groups.items():
+            for start in range(0, len(ids), self.max_ids):
+                chunk = ids[start:start + self.max_ids]
+                calls += 1
+                for message_id, error in self._apply(chunk, add, remove).items():
+                    if error is not None and is_transient(error):
+                        self._retry_later(message_id, pending[message_id])
+                        continue
+                    results[message_id] = (pending[message_id]['ops'], error)
+
+        failed = sum(1 for _, error in results.values() if error is not None)
+        logger.info(f"[LABELS] Updated {len(results) - failed} message(s) in {calls} call(s)"
+                    f" ({failed} failed, {len(self.pending)} to retry)")
+        return results
+
+    def _retry_later(self, message_id: str, entry: dict):
+        """Re-queue a transiently failed entry, due after an exponential backoff."""
+        entry['attempts'] += 1
+        delay = min(self.max_delay, self.base_delay * 2 ** (entry['attempts'] - 1))
+        delay *= random.uniform(0.8, 1.2)  # Jitter so retries don't line up
+        entry['next_attempt'] = time.monotonic() + delay
+        self.pending[message_id] = entry
+
+    def _apply(self, ids: list, add: tuple, remove: tuple) -> dict:
+        body = {'ids': ids}
+        if add:
+            body['addLabelIds'] = list(add)
+        if remove:
+            body['removeLabelIds'] = list(remove)
+        API_CALLS.inc(api='gmail', method='messages.batchModify')
+        try:
+            self.service.users().messages().batchModify(userId='me', body=body).execute()
+            return {message_id: None for message_id in ids}
+        except Exception as e:
+            API_ERRORS.inc(api='gmail', method='messages.batchModify')
+            if len(ids) == 1 or is_transient(e):
+                return {message_id: e for message_id in ids}
+            # One bad ID (e.g. a message deleted in Gmail) rejects the whole
+            # request - split it in half until the bad IDs are isolated
+            logger.warning(f"[LABELS] batchModify of {len(ids)} message(s) failed ({e}); splitting")
+            middle = len(ids) // 2
+            results = self._apply(ids[:middle], add, remove)
+            results.update(self._apply(ids[middle:], add, remove))
+            return results
@@ -0,0 +1,158 @@
+"""
+LLM Cache - Persistent, content-addressed cache for Claude results
+Categorizations are keyed on a normalized hash of (sender domain, subject
+template, content prefix, prompt version) so repeated automated mail doesn't
+cost an API call each time. Results that contain reply text (drafts, combined
+results, auto-replies) are keyed on the full sender address and the exact
+subject and content, so they are never reused for another person or for mail
+that differs in times, amounts or IDs.
+Stored in SQLite (WAL mode) so several watcher processes can share it.
+"""
+
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger('LLMCache')
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / "state" / "llm_cache.sqlite3"
+
+# Bump a version when its prompt changes so stale answers are never served
+PROMPT_VERSIONS = {
+    'categorize': 2,
+    'combined': 3,
+    'draft': 3,
+    'auto_reply': 2,
+}
+
+# Kinds whose result is text addressed to the sender: exact keys only
+EXACT_KINDS = {'combined', 'draft', 'auto_reply'}
+
+_REPLY_PREFIX = re.compile(r'^\s*((re|fwd?|aw|sv)\s*:\s*)+', re.IGNORECASE)
+_VOLATILE = re.compile(r'\b[0-9a-f]*\d[0-9a-f]*\b|\d+', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def sender_domain(email_from: str) -> str:
+    """'Name <user@Example.com>' -> 'example.com'."""
+    return sender_address(email_from).rsplit('@', 1)[-1]
+
+
+def sender_address(email_from: str) -> str:
+    """'Name <User@Example.com>' -> 'user@example.com'."""
+    address = email_from
+    if '<' in email_from and '>' in email_from:
+        address = email_from.split('<')[1].split('>')[0]
+    return address.strip().lower()
+
+
+def normalize_text(text: str, limit: int = None) -> str:
+    """Lowercase, mask numbers/hex ids and collapse whitespace so templated mail matches."""
+    text = (text or '')[:limit] if limit else (text or '')
+    text = _VOLATILE.sub('#', text.lower())
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def cache_key(kind: str, email_from: str, subject: str, content: str = '', *extra) -> str:
+    """
+    Hash of the email fields plus the prompt version for `kind`: normalized
+    (sender domain, masked numbers) for categorization, exact for EXACT_KINDS.
+    """
+    if kind in EXACT_KINDS:
+        parts = [kind, str(PROMPT_VERSIONS.get(kind, 0)), sender_address(email_from), subject or '', content or '']
+    else:
+        parts = [
+            kind,
+            str(PROMPT_VERSIONS.get(kind, 0)),
+            sender_domain(email_from),
+            normalize_text(_REPLY_PREFIX.sub('', subject or '')),
+            normalize_text(content, limit=500),
+        ]
+    parts.extend(str(e) for e in extra)
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed cache with TTL expiry and LRU eviction."""
+
+    def __init__(self, path=None, ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 10000):
+        self.path = Path(path) if path else DEFAULT_CACHE_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+        self.conn.commit()
+
+    def get(self, key: str):
+        """Return the cached value, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM entries WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                self.conn.commit()
+            lookups = self.hits + self.misses
+
+        if row is not None:
+            logger.info(f"[CACHE] Hit (hits={self.hits}, misses={self.misses})")
+        elif lookups % 50 == 0:
+            logger.info(f"[CACHE] Stats: hits={self.hits}, misses={self.misses}, hit rate={self.hit_rate():.0%}")
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, key: str, kind: str, value):
+        """Store a JSON-serializable value; evicts expired/LRU entries every 100 writes."""
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, kind, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(value), now, now)
+            )
+            self._puts += 1
+            if self._puts % 100 == 0:
+                self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now: float):
+        self.conn.execute("DELETE FROM entries WHERE created_at <= ?", (now - self.ttl_seconds,))
+        count = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
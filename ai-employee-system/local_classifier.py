@@ -0,0 +1,202 @@
+"""
+Local Classifier - Hashed n-gram naive Bayes priority model
+Trains incrementally on the labelled emails in the vault's Done/ folder and
+answers in microseconds, so Claude is only asked when the model is unsure.
+Naive Bayes probabilities are overconfident, so answers are gated on the
+log-odds margin over the runner-up priority instead. The minimum margin is
+calibrated on held-out files: each new file in Done/ is predicted before it
+is learned, and the threshold is the lowest margin at which those
+predictions reached the target precision.
+"""
+
+import os
+import re
+import json
+import math
+import zlib
+import logging
+import threading
+from pathlib import Path
+from frontmatter import parse_frontmatter, get_section
+
+logger = logging.getLogger('LocalClassifier')
+
+DEFAULT_MODEL_PATH = Path(__file__).parent / "state" / "local_classifier.json"
+PRIORITIES = ["URGENT", "HIGH", "MEDIUM", "LOW"]
+
+# Files whose label came from this model are never trained on (no feedback loop)
+REASON_PREFIX = "Local classifier"
+
+# Held-out predictions kept for calibration, and how many must clear a margin
+MAX_HOLDOUT = 5000
+MIN_CALIBRATION_SUPPORT = 30
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+def extract_features(email_from: str, subject: str, content: str, n_buckets: int) -> dict:
+    """Hashed unigram + bigram counts from sender domain, subject and content."""
+    address = email_from.split('<')[1].split('>')[0] if '<' in email_from and '>' in email_from else email_from
+    grams = ["d:" + address.rsplit('@', 1)[-1].strip().lower()]
+    for prefix, text in (("s:", subject), ("b:", content[:500])):
+        tokens = _TOKEN.findall(text.lower())
+        grams.extend(prefix + t for t in tokens)
+        grams.extend(f"{prefix}{a} {b}" for a, b in zip(tokens, tokens[1:]))
+
+    features = {}
+    for gram in grams:
+        # crc32 rather than hash(): stable across processes, so the saved model stays valid
+        bucket = zlib.crc32(gram.encode('utf-8')) % n_buckets
+        features[bucket] = features.get(bucket, 0) + 1
+    return features
+
+
+class LocalClassifier:
+    """Multinomial naive Bayes over hashed features, persisted as JSON."""
+
+    def __init__(self, path=None, n_buckets: int = 2 ** 18, alpha: float = 0.1, min_examples: int = 50,
+                 target_precision: float = 0.95):
+        self.path = Path(path) if path else DEFAULT_MODEL_PATH
+        self.n_buckets = n_buckets
+        self.alpha = alpha
+        self.min_examples = min_examples
+        self.target_precision = target_precision
+        self._lock = threading.Lock()
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.doc_counts = {p: 0 for p in PRIORITIES}
+        self.feature_counts = {p: {} for p in PRIORITIES}
+        self.feature_totals = {p: 0 for p in PRIORITIES}
+        self.trained_files = set()
+        self.holdout = []  # [margin, 1 if the prediction was right else 0], oldest first
+        self.min_margin = None  # Calibrated from self.holdout; None = never confident yet
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            if data.get("n_buckets") != self.n_buckets:
+                logger.info("[LOCAL] Feature size changed - retraining from scratch")
+                return
+            if "holdout" not in data:
+                logger.info("[LOCAL] Model has no calibration data - retraining from scratch")
+                return
+            self.doc_counts = data["doc_counts"]
+            self.feature_counts = {p: {int(k): v for k, v in counts.items()} for p, counts in data["feature_counts"].items()}
+            self.feature_totals = data["feature_totals"]
+            self.trained_files = set(data["trained_files"])
+            self.holdout = data["holdout"]
+            self.min_margin = self._calibrate()
+        except Exception as e:
+            logger.warning(f"[LOCAL] Could not load model ({e}) - retraining from scratch")
+            self._reset()
+
+    def save(self):
+        with self._lock:
+            data = {
+                "n_buckets": self.n_buckets,
+                "doc_counts": self.doc_counts,
+                "feature_counts": self.feature_counts,
+                "feature_totals": self.feature_totals,
+                "trained_files": sorted(self.trained_files),
+                "holdout": self.holdout,
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(data), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+    @property
+    def examples(self) -> int:
+        return sum(self.doc_counts.values())
+
+    def learn(self, email_from: str, subject: str, content: str, priority: str):
+        """Add one labelled example."""
+        if priority not in self.doc_counts:
+            return
+        features = extract_features(email_from, subject, content, self.n_buckets)
+        with self._lock:
+            self.doc_counts[priority] += 1
+            counts = self.feature_counts[priority]
+            for bucket, count in features.items():
+                counts[bucket] = counts.get(bucket, 0) + count
+            self.feature_totals[priority] += sum(features.values())
+
+    def train_from_folder(self, folder: Path) -> int:
+        """
+        Learn from EMAIL_*.md files in `folder` (recursively) not seen before,
+        oldest path first. Each is predicted before it is learned (held out).
+        """
+        if not folder.exists():
+            return 0
+        learned = 0
+        for email_file in sorted(folder.rglob("EMAIL_*.md")):
+            name = email_file.name
+            if name in self.trained_files:
+                continue
+            self.trained_files.add(name)
+            try:
+                content = email_file.read_text(encoding='utf-8')
+            except OSError:
+                continue
+            fields = parse_frontmatter(content)
+            if fields.get("priority_reason", "").startswith(REASON_PREFIX):
+                continue
+            example = (fields.get("from", ""), fields.get("subject", ""), get_section(content, "Email Content"))
+            priority = fields.get("priority", "").upper()
+            if priority not in self.doc_counts:
+                continue
+            prediction = self.predict(*example)
+            if prediction is not None:
+                with self._lock:
+                    self.holdout.append([round(prediction[1], 3), int(prediction[0] == priority)])
+            self.learn(*example, priority)
+            learned += 1
+        if learned:
+            with self._lock:
+                del self.holdout[:-MAX_HOLDOUT]
+                self.min_margin = self._calibrate()
+            self.save()
+            margin = "not yet calibrated" if self.min_margin is None else f"min margin {self.min_margin:.1f}"
+            logger.info(f"[LOCAL] Trained on {learned} new email(s) ({self.examples} total, {margin})")
+        return learned
+
+    def _calibrate(self):
+        """Lowest margin at which held-out predictions reached the target precision, or None."""
+        correct = 0
+        threshold = None
+        for n, (margin, right) in enumerate(sorted(self.holdout, key=lambda h: -h[0]), 1):
+            correct += right
+            if n >= MIN_CALIBRATION_SUPPORT and correct >= self.target_precision * n:
+                threshold = margin
+        return threshold
+
+    def confident(self, prediction) -> bool:
+        """Whether a predict() result clears the calibrated margin."""
+        return prediction is not None and self.min_margin is not None and prediction[1] >= self.min_margin
+
+    def predict(self, email_from: str, subject: str, content: str):
+        """
+        Return (priority, margin), or None until enough examples are learned. The
+        margin is the log-odds of the best priority over the runner-up (in nats).
+        """
+        features = extract_features(email_from, subject, content, self.n_buckets)
+        scores = {}
+        with self._lock:
+            trained = [p for p in PRIORITIES if self.doc_counts[p] > 0]
+            total_docs = sum(self.doc_counts.values())
+            if total_docs < self.min_examples or len(trained) < 2:
+                return None
+            for priority in trained:
+                counts = self.feature_counts[priority]
+                denominator = self.feature_totals[priority] + self.alpha * self.n_buckets
+                score = math.log(self.doc_counts[priority] / total_docs)
+                for bucket, count in features.items():
+                    score += count * math.log((counts.get(bucket, 0) + self.alpha) / denominator)
+                scores[priority] = score
+
+        best, runner_up = sorted(scores, key=scores.get, reverse=True)[:2]
+        return best, scores[best] - scores[runner_up]
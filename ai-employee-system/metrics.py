@@ -0,0 +1,371 @@
+"""
+Metrics - Counters, gauges and latency histograms for the watcher pipeline
+Dependency-free; rendered in the Prometheus text format and exported either
+as a textfile (for node_exporter's textfile collector) or on a local
+/metrics endpoint. Dashboard.md gets a short summary of the same numbers.
+"""
+
+import os
+import time
+import bisect
+import logging
+import threading
+import functools
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger('Metrics')
+
+# Seconds; covers a cached lookup (ms) up to a slow Claude call or full sync
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_key(labelnames: tuple, labels: dict) -> tuple:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames: tuple, key: tuple, extra: dict = None) -> str:
+    pairs = list(zip(labelnames, key)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def values(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> list:
+        lines = self._header()
+        for key, value in sorted(self.values().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), then sum
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def time(self, **labels):
+        """Context manager (or decorator) observing the wall time of a block."""
+        return _Timer(self, labels)
+
+    def series(self) -> dict:
+        """{label key: (cumulative bucket counts, count, sum)}."""
+        with self._lock:
+            snapshot = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        result = {}
+        for key, (counts, total) in snapshot.items():
+            cumulative, running = [], 0
+            for count in counts:
+                running += count
+                cumulative.append(running)
+            result[key] = (cumulative, running, total)
+        return result
+
+    def quantile(self, q: float, **labels):
+        """Estimate a quantile by interpolating within buckets (like histogram_quantile)."""
+        entry = self.series().get(_label_key(self.labelnames, labels))
+        if not entry or not entry[1]:
+            return None
+        return self._estimate(q, entry[0], entry[1])
+
+    def _estimate(self, q: float, cumulative: list, count: int) -> float:
+        rank = q * count
+        index = bisect.bisect_left(cumulative, rank)
+        if index >= len(self.buckets):
+            return self.buckets[-1]  # Beyond the largest bucket: report its bound
+        lower = self.buckets[index - 1] if index else 0.0
+        below = cumulative[index - 1] if index else 0
+        in_bucket = cumulative[index] - below
+        if not in_bucket:
+            return self.buckets[index]
+        return lower + (self.buckets[index] - lower) * (rank - below) / in_bucket
+
+    def summary(self) -> dict:
+        """{label key: {'count', 'sum', 'p50', 'p95'}} for every series."""
+        return {
+            key: {
+                "count": count,
+                "sum": total,
+                "p50": self._estimate(0.5, cumulative, count),
+                "p95": self._estimate(0.95, cumulative, count),
+            }
+            for key, (cumulative, count, total) in sorted(self.series().items()) if count
+        }
+
+    def render(self) -> list:
+        lines = self._header()
+        for key, (cumulative, count, total) in sorted(self.series().items()):
+            for bound, value in zip(self.buckets + (float('inf'),), cumulative):
+                le = "+Inf" if bound == float('inf') else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': le})} {value}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total:.6f}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+        self._started = []
+
+    def __enter__(self):
+        self._started.append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self._started.pop(), **self.labels)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.histogram.time(**self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class Registry:
+    """Named metrics plus collect hooks that refresh gauges just before export."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, callback):
+        with self._lock:
+            self.collectors.append(callback)
+
+    def remove_collector(self, callback):
+        with self._lock:
+            if callback in self.collectors:
+                self.collectors.remove(callback)
+
+    def collect(self):
+        with self._lock:
+            collectors = list(self.collectors)
+        for callback in collectors:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"[METRICS] Collector failed: {e}")
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        self.collect()
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path) -> bool:
+        """Atomically write render() to `path` (node_exporter skips half-written files)."""
+        path = Path(str(path).format(pid=os.getpid()))
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp.write_text(self.render(), encoding='utf-8')
+            os.replace(tmp, path)
+            return True
+        except OSError as e:
+            logger.warning(f"[METRICS] Could not write {path}: {e}")
+            return False
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "ai_employee_stage_seconds", "Time spent in each pipeline stage", ("stage",)))
+API_CALLS = REGISTRY.register(Counter(
+    "ai_employee_api_calls_total", "Requests made to external APIs", ("api", "method")))
+API_ERRORS = REGISTRY.register(Counter(
+    "ai_employee_api_errors_total", "Failed requests to external APIs", ("api", "method")))
+TOKENS = REGISTRY.register(Counter(
+    "ai_employee_claude_tokens_total", "Claude tokens used, by kind", ("kind",)))
+CATEGORIZED = REGISTRY.register(Counter(
+    "ai_employee_categorized_total", "Categorizations by where the answer came from", ("source",)))
+LLM_CACHE = REGISTRY.register(Counter(
+    "ai_employee_llm_cache_total", "LLM result cache lookups", ("kind", "result")))
+EMAILS = REGISTRY.register(Counter(
+    "ai_employee_emails_total", "Emails filed to the vault, by priority", ("priority",)))
+DUPLICATES = REGISTRY.register(Counter(
+    "ai_employee_duplicates_folded_total", "Near-duplicate emails folded into an existing vault entry"))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "ai_employee_queue_depth", "Items waiting in a queue", ("queue", "vault")))
+
+
+def timed(stage: str):
+    """Decorator/context manager recording a block's duration under `stage`."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = None  # Set on the per-server subclass
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"[METRICS] {self.address_string()} {format % args}")
+
+
+class MetricsServer:
+    """Serves /metrics on a background thread; shared by every watcher in the process."""
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9464, registry: Registry = None):
+        self.host = host
+        self.port = port
+        self.registry = registry or REGISTRY
+        self.server = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._users = 0
+        self._key = (host, port)
+
+    @classmethod
+    def shared(cls, host: str = "127.0.0.1", port: int = 9464):
+        with cls._shared_lock:
+            server = cls._shared.get((host, port))
+            if server is None:
+                server = cls._shared[(host, port)] = cls(host, port)
+            return server
+
+    def start(self):
+        with self._lock:
+            self._users += 1
+            if self.server:
+                return
+            handler = type("MetricsHandler", (_Handler,), {"registry": self.registry})
+            self.server = ThreadingHTTPServer((self.host, self.port), handler)
+            self.server.daemon_threads = True
+            self.port = self.server.server_address[1]
+            self._thread = threading.Thread(target=self.server.serve_forever, name='metrics-server', daemon=True)
+            self._thread.start()
+        logger.info(f"[METRICS] Serving http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        with self._lock:
+            self._users = max(0, self._users - 1)
+            if self._users or not self.server:
+                return
+            server, self.server = self.server, None
+        server.shutdown()
+        server.server_close()
+        self._thread.join(timeout=5)
+        with self._shared_lock:
+            if self._shared.get(self._key) is self:
+                del self._shared[self._key]
+
+
+def dashboard_section(registry: Registry = None) -> str:
+    """Markdown summary of stage latencies and counters for Dashboard.md."""
+    registry = registry or REGISTRY
+    registry.collect()
+    lines = ["## Performance", ""]
+    stages = STAGE_SECONDS.summary()
+    if stages:
+        lines += ["| Stage | Count | p50 | p95 | Total |", "|-------|-------|-----|-----|-------|"]
+        for (stage,), s in stages.items():
+            lines.append(f"| {stage} | {s['count']} | {s['p50'] * 1000:.0f} ms | {s['p95'] * 1000:.0f} ms "
+                         f"| {s['sum']:.2f} s |")
+    else:
+        lines.append("No timings recorded yet.")
+
+    def total(counter, **match):
+        return sum(v for key, v in counter.values().items()
+                   if all(key[counter.labelnames.index(k)] == str(m) for k, m in match.items()))
+
+    hits, misses = total(LLM_CACHE, result="hit"), total(LLM_CACHE, result="miss")
+    cache_read = total(TOKENS, kind="cache_read_input")
+    prompt_tokens = cache_read + total(TOKENS, kind="input") + total(TOKENS, kind="cache_creation_input")
+    tokens = ", ".join(f"{kind} {int(v)}" for (kind,), v in sorted(TOKENS.values().items())) or "none"
+    queues = {}
+    for (queue, _), value in QUEUE_DEPTH.values().items():
+        queues[queue] = queues.get(queue, 0) + value
+    depth = ", ".join(f"{queue} {int(v)}" for queue, v in sorted(queues.items()) if v) or "empty"
+    lines += [
+        "",
+        f"- Emails filed: {int(total(EMAILS))} ({int(total(DUPLICATES))} near-duplicate(s) folded)",
+        f"- API calls: Gmail {int(total(API_CALLS, api='gmail'))}, Claude {int(total(API_CALLS, api='claude'))}"
+        f" ({int(total(API_ERRORS))} error(s))",
+        f"- Claude tokens: {tokens}",
+        f"- LLM cache: {int(hits)} hit(s), {int(misses)} miss(es)",
+        f"- Prompt cache: {cache_read / prompt_tokens:.0%} of input tokens read from cache" if prompt_tokens
+        else "- Prompt cache: no Claude calls yet",
+        f"- Queues: {depth}",
+    ]
+    return "\n".join(lines) + "\n"
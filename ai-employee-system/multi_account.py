@@ -0,0 +1,310 @@
+"""
+Multi Account - Shard many Gmail accounts across worker processes
+A supervisor splits the accounts in a config file across N worker processes,
+each hosting its shard in a WatcherRuntime, so CPU-bound work (MIME parsing,
+rule matching, markdown rendering) uses every core. Crashed workers are
+restarted; a worker that keeps crashing is retired and its accounts rebalanced.
+Workers are stopped through a stop file, so in-flight sends finish on every
+platform; terminate() is only the fallback for a worker that ignores it.
+
+Usage: python multi_account.py accounts.json
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import argparse
+import multiprocessing
+from pathlib import Path
+from collections import deque
+
+logger = logging.getLogger('MultiAccount')
+
+DEFAULT_HEALTH_DIR = Path(__file__).parent / "state"
+
+
+def load_accounts(path: Path) -> tuple:
+    """Return (accounts, worker count) from an accounts config file."""
+    config = json.loads(Path(path).read_text(encoding='utf-8'))
+    accounts = config.get("accounts", [])
+    names = [account["name"] for account in accounts]
+    if len(set(names)) != len(names):
+        raise ValueError("Account names must be unique")
+    workers = config.get("workers") or min(len(accounts), os.cpu_count() or 1)
+    return accounts, max(1, int(workers))
+
+
+def assign_shards(accounts: list, worker_ids: list, previous: dict = None) -> dict:
+    """
+    Map worker id -> list of account names, balanced by account "weight" (default 1).
+    Accounts stay on their previous worker where that keeps the load balanced,
+    so a rebalance restarts as few workers as possible.
+    """
+    previous = previous or {}
+    weights = {a["name"]: float(a.get("weight", 1)) for a in accounts}
+    # A worker may go over the even share by half the largest account before accounts move
+    limit = sum(weights.values()) / max(len(worker_ids), 1) + max(weights.values(), default=0) / 2
+    shards = {worker_id: [] for worker_id in worker_ids}
+    load = {worker_id: 0.0 for worker_id in worker_ids}
+
+    # Heaviest first, so the greedy placement stays balanced
+    ordered = sorted(weights, key=lambda name: (-weights[name], name))
+    unplaced = []
+    for name in ordered:
+        worker_id = previous.get(name)
+        if worker_id in shards and load[worker_id] + weights[name] <= limit:
+            shards[worker_id].append(name)
+            load[worker_id] += weights[name]
+        else:
+            unplaced.append(name)
+    for name in unplaced:
+        worker_id = min(worker_ids, key=lambda w: (load[w], w))
+        shards[worker_id].append(name)
+        load[worker_id] += weights[name]
+    return shards
+
+
+def worker_main(worker_id: int, accounts: list, health_path: str, stop_path: str = None):
+    """Entry point of a worker process: run its shard of accounts until told to stop."""
+    from runtime import WatcherRuntime, build_watchers, log_handlers
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - worker{worker_id} - %(name)s - %(levelname)s - %(message)s',
+        handlers=log_handlers(f"worker{worker_id}")
+    )
+
+    entries = [{k: v for k, v in account.items() if k != "weight"} for account in accounts]
+    runtime = WatcherRuntime(
+        build_watchers({"watchers": entries}),
+        max_workers=max(2, len(entries) * 2),
+        health_path=health_path,
+        stop_path=stop_path
+    )
+    runtime.run_forever()
+
+
+class Supervisor:
+    """Starts one process per worker slot, restarts crashes and rebalances accounts."""
+
+    def __init__(self, config_path, workers: int = None, max_restarts: int = 5, restart_window: float = 600,
+                 check_interval: float = 5.0, health_dir=None):
+        self.config_path = Path(config_path)
+        self.workers_override = workers
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.check_interval = check_interval
+        self.health_dir = Path(health_dir) if health_dir else DEFAULT_HEALTH_DIR
+        self.context = multiprocessing.get_context('spawn')  # Same behaviour on Windows and Linux
+        self.accounts = {}
+        self.slots = {}
+        self.placement = {}  # account name -> worker id
+        self._config_mtime = None
+        self._stopping = False
+
+    # -- Configuration ----------------------------------------------------
+
+    def _reload_config(self) -> bool:
+        """Re-read the config if it changed; returns True when accounts need rebalancing."""
+        try:
+            mtime = os.stat(self.config_path).st_mtime_ns
+        except OSError as e:
+            logger.error(f"[SUPERVISOR] Cannot read {self.config_path}: {e}")
+            return False
+        if mtime == self._config_mtime:
+            return False
+        try:
+            accounts, workers = load_accounts(self.config_path)
+        except Exception as e:
+            # Keep running the previous configuration
+            logger.error(f"[SUPERVISOR] Invalid config {self.config_path.name}: {e}")
+            self._config_mtime = mtime
+            return False
+        self._config_mtime = mtime
+        self.accounts = {account["name"]: account for account in accounts}
+        workers = self.workers_override or workers
+        for worker_id in range(workers):
+            self.slots.setdefault(worker_id, {
+                "process": None, "accounts": [], "configs": [], "crashes": deque(), "next_start": 0.0,
+                "retired": False
+            })
+        for worker_id in [w for w in self.slots if w >= workers]:
+            self._stop_worker(worker_id)
+            del self.slots[worker_id]
+        logger.info(f"[SUPERVISOR] {len(self.accounts)} account(s) across {workers} worker(s)")
+        return True
+
+    def rebalance(self):
+        """Reassign accounts to live slots and restart workers whose shard changed."""
+        live = [w for w, slot in self.slots.items() if not slot["retired"]]
+        if not live:
+            # Every slot was retired - give them all another chance
+            for slot in self.slots.values():
+                slot.update(retired=False, crashes=deque())
+            live = list(self.slots)
+        shards = assign_shards(list(self.accounts.values()), live, self.placement)
+        self.placement = {name: w for w, names in shards.items() for name in names}
+        for worker_id, slot in self.slots.items():
+            names = sorted(shards.get(worker_id, []))
+            configs = [self.accounts[name] for name in names]
+            if names != slot["accounts"]:
+                self._stop_worker(worker_id)
+                slot.update(accounts=names, configs=configs, next_start=0.0)
+                if names:
+                    logger.info(f"[SUPERVISOR] worker{worker_id} <- {', '.join(names)}")
+            elif configs != slot.get("configs"):
+                # Same accounts, edited settings (token path, vault, ...) - restart to apply them
+                if names:
+                    logger.info(f"[SUPERVISOR] worker{worker_id} config changed - restarting")
+                self._stop_worker(worker_id)
+                slot.update(configs=configs, next_start=0.0)
+
+    # -- Worker processes -------------------------------------------------
+
+    def _start_worker(self, worker_id: int):
+        slot = self.slots[worker_id]
+        accounts = [self.accounts[name] for name in slot["accounts"]]
+        stop_path = self._stop_path(worker_id)
+        try:
+            stop_path.unlink()  # Left over from a worker that died before reading it
+        except FileNotFoundError:
+            pass
+        process = self.context.Process(
+            target=worker_main,
+            args=(worker_id, accounts, str(self.health_dir / f"runtime_health_worker{worker_id}.json"),
+                  str(stop_path)),
+            name=f"worker{worker_id}",
+            daemon=False
+        )
+        process.start()
+        slot["process"] = process
+        logger.info(f"[SUPERVISOR] Started worker{worker_id} (pid {process.pid}) for {len(accounts)} account(s)")
+
+    def _stop_path(self, worker_id: int) -> Path:
+        return self.health_dir / f"stop_worker{worker_id}"
+
+    def _stop_worker(self, worker_id: int, timeout: float = 35.0):
+        process = self.slots[worker_id]["process"]
+        if process is None:
+            return
+        if process.is_alive():
+            # The runtime polls for this file and finishes in-flight polls and sends before exiting.
+            # terminate() is TerminateProcess on Windows, which would strand outbox rows mid-send.
+            stop_path = self._stop_path(worker_id)
+            try:
+                self.health_dir.mkdir(parents=True, exist_ok=True)
+                stop_path.touch()
+            except OSError as e:
+                logger.warning(f"[SUPERVISOR] Could not write {stop_path}: {e}")
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f"[SUPERVISOR] worker{worker_id} did not stop in {timeout:g}s - terminating")
+                process.terminate()
+                process.join(5)
+            if process.is_alive():
+                process.kill()
+                process.join(5)
+            try:
+                stop_path.unlink()
+            except FileNotFoundError:
+                pass
+        self.slots[worker_id]["process"] = None
+
+    def _check_workers(self):
+        now = time.monotonic()
+        needs_rebalance = False
+        for worker_id, slot in self.slots.items():
+            if slot["retired"] or not slot["accounts"]:
+                continue
+            process = slot["process"]
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                # The worker died without being asked to
+                crashes = slot["crashes"]
+                crashes.append(now)
+                while crashes and now - crashes[0] > self.restart_window:
+                    crashes.popleft()
+                slot["process"] = None
+                logger.error(f"[SUPERVISOR] worker{worker_id} exited with code {process.exitcode}"
+                             f" ({len(crashes)} crash(es) in {self.restart_window:g}s)")
+                if len(crashes) > self.max_restarts and len(self.slots) > 1:
+                    logger.error(f"[SUPERVISOR] Retiring worker{worker_id}; moving its accounts to other workers")
+                    slot["retired"] = True
+                    needs_rebalance = True
+                    continue
+                slot["next_start"] = now + min(60.0, 2 ** (len(crashes) - 1))
+            if now >= slot["next_start"]:
+                self._start_worker(worker_id)
+        if needs_rebalance:
+            self.rebalance()
+
+    def _write_health(self):
+        data = {"pid": os.getpid(), "updated_at": time.time(), "workers": {}}
+        for worker_id, slot in self.slots.items():
+            process = slot["process"]
+            data["workers"][f"worker{worker_id}"] = {
+                "pid": process.pid if process else None,
+                "alive": bool(process and process.is_alive()),
+                "accounts": slot["accounts"],
+                "recent_crashes": len(slot["crashes"]),
+                "retired": slot["retired"],
+            }
+        try:
+            self.health_dir.mkdir(parents=True, exist_ok=True)
+            path = self.health_dir / "supervisor_health.json"
+            tmp = path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(data, indent=2), encoding='utf-8')
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"[SUPERVISOR] Could not write health file: {e}")
+
+    # -- Main loop --------------------------------------------------------
+
+    def request_stop(self, *_):
+        self._stopping = True
+
+    def run(self):
+        for signal_name in ('SIGINT', 'SIGTERM'):
+            if hasattr(signal, signal_name):
+                signal.signal(getattr(signal, signal_name), self.request_stop)
+
+        self._reload_config()
+        self.rebalance()
+        try:
+            while not self._stopping:
+                if self._reload_config():
+                    self.rebalance()
+                self._check_workers()
+                self._write_health()
+                deadline = time.monotonic() + self.check_interval
+                while not self._stopping and time.monotonic() < deadline:
+                    time.sleep(0.2)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            logger.info("[SUPERVISOR] Stopping workers...")
+            for worker_id in list(self.slots):
+                self._stop_worker(worker_id)
+            self._write_health()
+            logger.info("[SUPERVISOR] Stopped")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many Gmail accounts across worker processes")
+    parser.add_argument("config", help="JSON file with an 'accounts' list")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: config or CPU count)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    Supervisor(args.config, workers=args.workers).run()
+
+
+if __name__ == "__main__":
+    main()
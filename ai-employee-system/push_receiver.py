@@ -0,0 +1,145 @@
+"""
+Push Receiver - Local HTTP endpoint for Gmail push notifications
+Accepts Pub/Sub push envelopes (or a bare {"emailAddress", "historyId"} body)
+and wakes the matching watcher so it runs a history sync right away.
+Several watchers in one process share a receiver, routed by email address.
+"""
+
+import json
+import base64
+import hmac
+import logging
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger('PushReceiver')
+
+
+def parse_notification(payload: dict) -> tuple:
+    """Return (email_address, history_id) from a Pub/Sub envelope or a bare notification."""
+    if "message" in payload:
+        data = payload["message"].get("data", "")
+        try:
+            payload = json.loads(base64.b64decode(data).decode('utf-8'))
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"undecodable message data: {e}")
+    try:
+        return str(payload["emailAddress"]).lower(), int(payload["historyId"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("notification needs emailAddress and a numeric historyId")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    receiver = None  # Set on the per-server subclass
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != self.receiver.path:
+            self.send_error(404)
+            return
+        if self.receiver.token:
+            supplied = parse_qs(url.query).get("token", [""])[0]
+            if not hmac.compare_digest(supplied, self.receiver.token):
+                self.send_error(403)
+                return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            email_address, history_id = parse_notification(payload)
+        except ValueError as e:
+            logger.warning(f"[PUSH] Rejected notification: {e}")
+            self.send_error(400, str(e))
+            return
+        self.receiver.dispatch(email_address, history_id)
+        # Acknowledge at once; the sync runs on the watcher's own thread
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug(f"[PUSH] {self.address_string()} {format % args}")
+
+
+class PushReceiver:
+    """Threaded HTTP server that turns push notifications into watcher wake-ups."""
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8085, path: str = "/gmail/push", token: str = None):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.token = token or None
+        self.server = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._callbacks = {}   # email address -> callback(history_id)
+        self._latest = {}      # email address -> highest historyId seen
+        self._users = 0
+        self.received = 0
+        self._key = (host, port)
+
+    @classmethod
+    def shared(cls, host: str = "127.0.0.1", port: int = 8085, path: str = "/gmail/push", token: str = None):
+        """One receiver per (host, port) for the whole process."""
+        with cls._shared_lock:
+            receiver = cls._shared.get((host, port))
+            if receiver is None:
+                receiver = cls._shared[(host, port)] = cls(host, port, path, token)
+            return receiver
+
+    def register(self, email_address: str, callback):
+        with self._lock:
+            self._callbacks[email_address.lower()] = callback
+
+    def unregister(self, email_address: str):
+        with self._lock:
+            self._callbacks.pop(email_address.lower(), None)
+
+    def dispatch(self, email_address: str, history_id: int):
+        """Call the account's callback, skipping duplicate and out-of-order notifications."""
+        with self._lock:
+            self.received += 1
+            callback = self._callbacks.get(email_address)
+            if callback is None and len(self._callbacks) == 1:
+                # A single account: accept whatever address the relay reports
+                callback = next(iter(self._callbacks.values()))
+            if callback is None:
+                logger.warning(f"[PUSH] No watcher registered for {email_address}")
+                return
+            if history_id <= self._latest.get(email_address, 0):
+                return  # Pub/Sub delivers at least once, not in order
+            self._latest[email_address] = history_id
+        logger.info(f"[PUSH] Notification for {email_address} (historyId {history_id})")
+        callback(history_id)
+
+    def start(self):
+        with self._lock:
+            self._users += 1
+            if self.server:
+                return
+            handler = type("PushHandler", (_Handler,), {"receiver": self})
+            self.server = ThreadingHTTPServer((self.host, self.port), handler)
+            self.server.daemon_threads = True
+            self.port = self.server.server_address[1]  # Resolves port 0 to the real port
+            self._thread = threading.Thread(target=self.server.serve_forever, name='push-receiver', daemon=True)
+            self._thread.start()
+        logger.info(f"[PUSH] Listening on http://{self.host}:{self.port}{self.path}")
+
+    def stop(self):
+        with self._lock:
+            self._users = max(0, self._users - 1)
+            if self._users or not self.server:
+                return
+            server, self.server = self.server, None
+        server.shutdown()
+        server.server_close()
+        self._thread.join(timeout=5)
+        with self._shared_lock:
+            if self._shared.get(self._key) is self:
+                del self._shared[self._key]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}{self.path}"
@@ -0,0 +1,52 @@
+"""
+Rate Limiter - Thread-safe token bucket
+Used to keep Claude API calls (and other outbound calls) under a requests-per-minute budget.
+"""
+
+import time
+import threading
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float, burst: float = None):
+        """Build a bucket from a requests-per-minute budget."""
+        return cls(requests_per_minute / 60.0, burst)
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available. Returns 0 on success, else seconds until they would be."""
+        if self.rate <= 0:
+            return 0.0  # Unlimited
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: float = None) -> bool:
+        """Block until tokens are available. Returns False if `timeout` runs out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
@@ -0,0 +1,277 @@
+"""
+Rule Engine - Compiled priority rules for rule-based categorization
+Rules are loaded from a YAML/JSON file in the vault (Priority_Rules.yaml), compiled
+into one trie-shaped regex per condition type, and reloaded when the file changes.
+"""
+
+import re
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger('RuleEngine')
+
+# YAML rules support (optional; JSON rules files always work)
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+# Built-in rules, used when the vault has no rules file (same order as the original fallback)
+DEFAULT_RULES = {
+    "rules": [
+        {
+            "name": "urgent-keywords",
+            "priority": "URGENT", "reason": "Contains urgent keywords",
+            "needs_response": True, "suggested_action": "Respond immediately", "auto_reply": False,
+            "keywords": ["urgent", "asap", "deadline", "immediate", "today", "emergency"],
+        },
+        {
+            "name": "important-sender",
+            "priority": "HIGH", "reason": "Important sender",
+            "needs_response": True, "suggested_action": "Respond within 4 hours", "auto_reply": False,
+            "senders": ["muniya", "m95251957"],
+        },
+        {
+            "name": "automated",
+            "priority": "LOW", "reason": "Automated/no-reply",
+            "needs_response": False, "suggested_action": "Archive", "auto_reply": False,
+            "senders": ["no-reply", "noreply", "mailer-daemon"],
+        },
+        {
+            "name": "newsletter",
+            "priority": "LOW", "reason": "Newsletter/marketing",
+            "needs_response": False, "suggested_action": "Archive or unsubscribe", "auto_reply": False,
+            "keywords": ["newsletter", "unsubscribe"],
+            "senders": ["marketing"],
+        },
+        {
+            "name": "general-inquiry",
+            "priority": "MEDIUM", "reason": "General inquiry",
+            "needs_response": True, "suggested_action": "Review and respond", "auto_reply": False,
+            "keywords": ["question", "inquiry", "help", "support", "information"],
+        },
+    ],
+    "default": {
+        "priority": "LOW", "reason": "General email",
+        "needs_response": True, "suggested_action": "Review when available", "auto_reply": True,
+    },
+}
+
+RESULT_FIELDS = ("priority", "reason", "needs_response", "suggested_action", "auto_reply")
+
+
+class Rule:
+    """One priority rule. Conditions: keywords, senders, domains, headers."""
+
+    def __init__(self, spec: dict, index: int):
+        self.index = index
+        self.name = spec.get("name", f"rule-{index}")
+        self.keywords = [k.lower() for k in spec.get("keywords", [])]
+        self.senders = [s.lower() for s in spec.get("senders", [])]
+        self.domains = [d.lower().lstrip("@") for d in spec.get("domains", [])]
+        self.headers = {
+            name.lower(): re.compile(pattern, re.IGNORECASE)
+            for name, pattern in (spec.get("headers") or {}).items()
+        }
+        # match: any (default) fires on any condition; all needs every listed condition
+        self.match_all = spec.get("match", "any") == "all"
+        # final: trust this rule and skip Claude entirely
+        self.final = bool(spec.get("final", False))
+        self.fields = {
+            "priority": spec.get("priority", "MEDIUM"),
+            "reason": spec.get("reason", self.name),
+            "needs_response": spec.get("needs_response", True),
+            "suggested_action": spec.get("suggested_action", "Review"),
+            "auto_reply": spec.get("auto_reply", False),
+        }
+
+    def conditions(self) -> set:
+        kinds = set()
+        if self.keywords:
+            kinds.add("keywords")
+        if self.senders:
+            kinds.add("senders")
+        if self.domains:
+            kinds.add("domains")
+        if self.headers:
+            kinds.add("headers")
+        return kinds
+
+    def result(self) -> dict:
+        return dict(self.fields)
+
+
+# Below this many distinct terms, plain `in` scans beat a combined regex
+LINEAR_SCAN_TERMS = 32
+
+
+class TermMatcher:
+    """
+    Finds which rules have a term occurring as a substring of a text.
+    Large term sets compile to one trie-shaped regex, e.g. (?=(he(?:lp(?:desk)?|llo))),
+    scanned once per text regardless of how many rules there are.
+    """
+
+    def __init__(self, term_rules: dict):
+        self.term_rules = term_rules
+        self.pattern = None
+        if len(term_rules) > LINEAR_SCAN_TERMS:
+            trie = {}
+            for term in term_rules:
+                node = trie
+                for ch in term:
+                    node = node.setdefault(ch, {})
+                node[''] = term
+
+            # The regex reports the longest term at each position, so also credit
+            # every shorter term that is a prefix of it
+            self.prefix_rules = {}
+            for term in term_rules:
+                node, rules = trie, set()
+                for ch in term:
+                    node = node[ch]
+                    if '' in node:
+                        rules |= term_rules[node['']]
+                self.prefix_rules[term] = rules
+
+            # Zero-width lookahead so overlapping occurrences are all seen
+            self.pattern = re.compile(f"(?=({self._trie_regex(trie)}))")
+
+    @classmethod
+    def _trie_regex(cls, node: dict) -> str:
+        branches = [re.escape(ch) + cls._trie_regex(child) for ch, child in sorted(node.items()) if ch != '']
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        group = f"(?:{'|'.join(branches)})"
+        return group + '?' if '' in node else group
+
+    def match(self, text: str) -> set:
+        if self.pattern is None:
+            return {index for term, rules in self.term_rules.items() if term in text for index in rules}
+        hits = set()
+        for m in self.pattern.finditer(text):
+            hits |= self.prefix_rules[m.group(1)]
+        return hits
+
+
+def _term_index(rules: list, attr: str) -> TermMatcher:
+    term_rules = {}
+    for rule in rules:
+        for term in getattr(rule, attr):
+            term_rules.setdefault(term, set()).add(rule.index)
+    return TermMatcher(term_rules)
+
+
+class RuleSet:
+    """A compiled, immutable set of rules."""
+
+    def __init__(self, spec: dict):
+        self.rules = [Rule(r, i) for i, r in enumerate(spec.get("rules", []))]
+        default = dict(DEFAULT_RULES["default"])
+        default.update(spec.get("default") or {})
+        self.default = {field: default[field] for field in RESULT_FIELDS}
+
+        self.keyword_matcher = _term_index(self.rules, "keywords")
+        self.sender_matcher = _term_index(self.rules, "senders")
+        self.domain_index = {}
+        for rule in self.rules:
+            for domain in rule.domains:
+                self.domain_index.setdefault(domain, set()).add(rule.index)
+        self.header_rules = [rule for rule in self.rules if rule.headers]
+
+    def match(self, email_from: str, subject: str, content: str, headers: dict = None):
+        """Return the first (lowest-index) matching Rule, or None."""
+        email_lower = email_from.lower()
+        hits = {
+            "keywords": self.keyword_matcher.match(f"{subject} {content}".lower()),
+            "senders": self.sender_matcher.match(email_lower),
+            "domains": set(),
+            "headers": set(),
+        }
+
+        if self.domain_index:
+            address = email_lower.split('<')[1].split('>')[0] if '<' in email_lower and '>' in email_lower else email_lower
+            labels = address.rsplit('@', 1)[-1].strip().split('.')
+            for i in range(len(labels)):
+                hits["domains"] |= self.domain_index.get('.'.join(labels[i:]), set())
+
+        if headers and self.header_rules:
+            lowered = {name.lower(): str(value) for name, value in headers.items()}
+            for rule in self.header_rules:
+                if any(name in lowered and pattern.search(lowered[name]) for name, pattern in rule.headers.items()):
+                    hits["headers"].add(rule.index)
+
+        candidates = set().union(*hits.values())
+        for index in sorted(candidates):
+            rule = self.rules[index]
+            if not rule.match_all or all(index in hits[kind] for kind in rule.conditions()):
+                return rule
+        return None
+
+
+class RuleEngine:
+    """Loads rules from a vault file and hot-reloads them when the file changes."""
+
+    def __init__(self, path=None, check_interval: float = 1.0):
+        self.path = Path(path) if path else None
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._last_check = 0.0
+        self.ruleset = RuleSet(DEFAULT_RULES)
+        self._maybe_reload(force=True)
+
+    def _load_spec(self) -> dict:
+        text = self.path.read_text(encoding='utf-8')
+        if self.path.suffix.lower() == ".json":
+            return json.loads(text)
+        if not YAML_AVAILABLE:
+            raise RuntimeError("pyyaml is required for YAML rules files")
+        return yaml.safe_load(text) or {}
+
+    def _maybe_reload(self, force: bool = False):
+        """Re-read the rules file if its mtime changed (checked at most once per interval)."""
+        if self.path is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+
+        with self._lock:
+            if mtime is None:
+                self.ruleset = RuleSet(DEFAULT_RULES)
+                if self._mtime is not None:
+                    logger.info(f"[RULES] {self.path.name} removed - using built-in rules")
+            else:
+                try:
+                    self.ruleset = RuleSet(self._load_spec())
+                    logger.info(f"[RULES] Loaded {len(self.ruleset.rules)} rule(s) from {self.path.name}")
+                except Exception as e:
+                    # Keep the previous rules rather than running with none
+                    logger.error(f"[RULES] Could not load {self.path.name}: {e}")
+            self._mtime = mtime
+
+    def match(self, email_from: str, subject: str, content: str, headers: dict = None):
+        """Return the first matching Rule (or None if only the default applies)."""
+        self._maybe_reload()
+        return self.ruleset.match(email_from, subject, content, headers)
+
+    def classify(self, email_from: str, subject: str, content: str, headers: dict = None) -> dict:
+        """Return a categorize_email()-style result from the rules (default if none match)."""
+        rule = self.match(email_from, subject, content, headers)
+        return rule.result() if rule else dict(self.ruleset.default)
@@ -0,0 +1,304 @@
+"""
+Runtime - Host many BaseWatcher instances in one asyncio process
+Each watcher gets its own poll schedule (its PollPolicy); blocking client calls
+(run_once/on_idle) run on one shared thread pool, so N mailboxes share a single
+interpreter and one copy of the google/anthropic libraries.
+
+Usage: python runtime.py watchers.json
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import inspect
+import logging
+import argparse
+import importlib
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('Runtime')
+
+DEFAULT_HEALTH_PATH = Path(__file__).parent / "state" / "runtime_health.json"
+LOG_DIR = Path(__file__).parent / "logs"
+
+
+def log_handlers(name: str) -> list:
+    """
+    Handlers for a daily logs/<name>_YYYYMMDD.log and stdout. Configure logging
+    with them before importing watcher modules: their own basicConfig is then a no-op.
+    """
+    LOG_DIR.mkdir(exist_ok=True)
+    log_file = LOG_DIR / f"{name}_{datetime.now().strftime('%Y%m%d')}.log"
+    return [logging.FileHandler(log_file, encoding='utf-8'), logging.StreamHandler(sys.stdout)]
+
+
+def build_watchers(config: dict) -> dict:
+    """
+    Instantiate watchers from config entries like
+    {"name": "work", "class": "gmail_watcher:GmailWatcher", "vault_path": ..., "token_path": ...}.
+    Watchers that take a `state_dir` get state/<name> unless one is given.
+    """
+    watchers = {}
+    for entry in config.get("watchers", []):
+        kwargs = dict(entry)
+        name = kwargs.pop("name")
+        module_name, _, class_name = kwargs.pop("class", "gmail_watcher:GmailWatcher").partition(":")
+        cls = getattr(importlib.import_module(module_name), class_name)
+        if "state_dir" in inspect.signature(cls).parameters and "state_dir" not in kwargs:
+            kwargs["state_dir"] = str(Path(__file__).parent / "state" / name)
+        if name in watchers:
+            raise ValueError(f"Duplicate watcher name: {name}")
+        watchers[name] = cls(**kwargs)
+    return watchers
+
+
+class WatcherRuntime:
+    """Schedules watchers as asyncio tasks; blocking work goes to a shared thread pool."""
+
+    def __init__(self, watchers: dict, max_workers: int = 8, shutdown_timeout: float = 30.0,
+                 error_backoff: float = 30.0, max_error_backoff: float = 900.0, health_path=None,
+                 health_interval: float = 30.0, stop_path=None):
+        self.watchers = watchers
+        self.max_workers = max_workers
+        self.shutdown_timeout = shutdown_timeout
+        self.error_backoff = error_backoff
+        self.max_error_backoff = max_error_backoff
+        self.health_path = Path(health_path) if health_path else DEFAULT_HEALTH_PATH
+        self.health_interval = health_interval
+        self.stop_path = Path(stop_path) if stop_path else None  # Creating this file stops the runtime
+        self.pool = None
+        self._loop = None
+        self._stopping = None
+        self._wake = {}
+        self._health = {
+            name: {
+                "watcher": type(watcher).__name__,
+                "state": "starting",
+                "polls": 0,
+                "found": 0,
+                "errors": 0,
+                "consecutive_errors": 0,
+                "last_poll_at": None,
+                "last_success_at": None,
+                "last_poll_seconds": None,
+                "last_error": None,
+                "next_poll_at": None,
+            }
+            for name, watcher in watchers.items()
+        }
+
+    # -- Public API -------------------------------------------------------
+
+    def health(self) -> dict:
+        """Per-watcher health; status is ok, degraded (recent errors) or stopped."""
+        report = {}
+        for name, info in self._health.items():
+            entry = dict(info)
+            if info["state"] in ("stopped", "failed"):
+                entry["status"] = "stopped"
+            elif info["consecutive_errors"]:
+                entry["status"] = "degraded"
+            else:
+                entry["status"] = "ok"
+            report[name] = entry
+        return report
+
+    def request_stop(self):
+        """Ask every watcher to finish its in-flight work and stop (thread-safe)."""
+        if self._loop and not self._stopping.is_set():
+            self._loop.call_soon_threadsafe(self._begin_stop)
+
+    def wake(self, name: str = None):
+        """Poll one watcher (or all) now instead of at its next scheduled time."""
+        for watcher_name in ([name] if name else list(self._wake)):
+            event = self._wake.get(watcher_name)
+            if event is not None:
+                self._loop.call_soon_threadsafe(event.set)
+
+    def run_forever(self):
+        try:
+            asyncio.run(self.run())
+        except KeyboardInterrupt:
+            # Platforms without loop signal handlers (Windows) end up here
+            logger.info("[RUNTIME] Interrupted")
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='watcher')
+        self._install_signal_handlers()
+
+        logger.info(f"[RUNTIME] Starting {len(self.watchers)} watcher(s) on {self.max_workers} worker thread(s)")
+        tasks = {
+            asyncio.create_task(self._supervise(name, watcher), name=name): name
+            for name, watcher in self.watchers.items()
+        }
+        health_task = asyncio.create_task(self._report_health())
+        stop_file_task = asyncio.create_task(self._watch_stop_file()) if self.stop_path else None
+        try:
+            await self._stopping.wait()
+        finally:
+            self._stopping.set()
+            for event in self._wake.values():
+                event.set()
+            # Let in-flight polls finish; they run in threads and cannot be interrupted
+            done, pending = await asyncio.wait(tasks, timeout=self.shutdown_timeout)
+            for task in pending:
+                logger.warning(f"[RUNTIME] {tasks[task]} still busy after {self.shutdown_timeout:g}s - abandoning")
+                task.cancel()
+            health_task.cancel()
+            if stop_file_task:
+                stop_file_task.cancel()
+            self._write_health()
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            logger.info("[RUNTIME] Stopped")
+
+    # -- Internals --------------------------------------------------------
+
+    def _begin_stop(self):
+        logger.info("[RUNTIME] Shutting down...")
+        self._stopping.set()
+
+    def _install_signal_handlers(self):
+        handlers = [('SIGINT', self._begin_stop), ('SIGTERM', self._begin_stop), ('SIGUSR1', self.wake)]
+        for signal_name, handler in handlers:
+            signum = getattr(signal, signal_name, None)
+            if signum is None:
+                continue
+            try:
+                self._loop.add_signal_handler(signum, handler)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C raises KeyboardInterrupt instead
+
+    async def _call(self, func, *args):
+        return await self._loop.run_in_executor(self.pool, func, *args)
+
+    async def _supervise(self, name: str, watcher):
+        health = self._health[name]
+        wake = self._wake[name] = asyncio.Event()
+
+        # The runtime owns SIGUSR1; each watcher's touch-file still works
+        watcher.waker.signal_name = None
+        try:
+            await self._call(watcher.start)
+        except Exception as e:
+            health.update(state="failed", last_error=f"start: {e}")
+            logger.error(f"[RUNTIME] {name} failed to start: {e}")
+            return
+        previous = watcher.waker.on_wake
+
+        def on_wake():
+            if previous:
+                previous()
+            self._loop.call_soon_threadsafe(wake.set)
+        watcher.waker.on_wake = on_wake
+        logger.info(f"[RUNTIME] {name}: polling {watcher.poll_policy.describe()}")
+
+        try:
+            while not self._stopping.is_set():
+                health.update(state="polling", last_poll_at=time.time())
+                started = time.monotonic()
+                try:
+                    found = await self._call(watcher.run_once)
+                    interval = watcher.poll_policy.next_interval(found)
+                    health["polls"] += 1
+                    health["found"] += found
+                    health.update(consecutive_errors=0, last_success_at=time.time())
+                except Exception as e:
+                    health["errors"] += 1
+                    health["consecutive_errors"] += 1
+                    health["last_error"] = str(e)[:500]
+                    interval = min(self.max_error_backoff,
+                                   self.error_backoff * 2 ** (health["consecutive_errors"] - 1))
+                    logger.error(f"[RUNTIME] {name} poll failed ({e}); retrying in {interval:.0f}s")
+                health["last_poll_seconds"] = round(time.monotonic() - started, 3)
+                health.update(state="waiting", next_poll_at=time.time() + interval)
+                await self._wait(name, watcher, wake, interval)
+        finally:
+            health["state"] = "stopping"
+            try:
+                await self._call(watcher.stop)
+            except Exception as e:
+                logger.error(f"[RUNTIME] {name} did not stop cleanly: {e}")
+            health.update(state="stopped", next_poll_at=None)
+            logger.info(f"[RUNTIME] {name} stopped")
+
+    async def _wait(self, name: str, watcher, wake: asyncio.Event, interval: float):
+        """Wait for the next poll, running on_idle() every idle_interval seconds."""
+        deadline = time.monotonic() + interval
+        while not self._stopping.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            idle_interval = watcher.idle_interval
+            try:
+                await asyncio.wait_for(wake.wait(), min(remaining, idle_interval or remaining))
+            except asyncio.TimeoutError:
+                pass
+            if wake.is_set():
+                wake.clear()
+                watcher.waker.consume()
+                return
+            if idle_interval and not self._stopping.is_set():
+                try:
+                    await self._call(watcher.on_idle)
+                except Exception as e:
+                    logger.error(f"[RUNTIME] {name} idle work failed: {e}")
+
+    async def _watch_stop_file(self):
+        """Stop when the stop file appears - a graceful stop that also works on Windows, which has no SIGTERM."""
+        while not self._stopping.is_set():
+            if self.stop_path.exists():
+                try:
+                    self.stop_path.unlink()
+                except OSError:
+                    pass
+                logger.info(f"[RUNTIME] Found {self.stop_path.name}")
+                self._begin_stop()
+                return
+            await asyncio.sleep(0.5)
+
+    async def _report_health(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            self._write_health()
+
+    def _write_health(self):
+        data = {"pid": os.getpid(), "updated_at": time.time(), "watchers": self.health()}
+        try:
+            self.health_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.health_path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(data, indent=2), encoding='utf-8')
+            os.replace(tmp, self.health_path)
+        except OSError as e:
+            logger.warning(f"[RUNTIME] Could not write health file: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run several watchers in one process")
+    parser.add_argument("config", help="JSON file with a 'watchers' list")
+    parser.add_argument("--workers", type=int, help="shared thread pool size (default: config or 8)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=log_handlers("runtime")
+    )
+    config = json.loads(Path(args.config).read_text(encoding='utf-8'))
+    runtime = WatcherRuntime(
+        build_watchers(config),
+        max_workers=args.workers or config.get("max_workers", 8),
+        shutdown_timeout=config.get("shutdown_timeout", 30),
+        health_path=config.get("health_path")
+    )
+    runtime.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Scheduler - Poll interval policies and early wake-up triggers for watchers
+The adaptive policy polls quickly right after new mail arrives, backs off
+exponentially while the source is quiet, and slows right down in quiet hours.
+"""
+
+import os
+import signal
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime, time as dtime, timedelta
+
+logger = logging.getLogger('Scheduler')
+
+
+def parse_quiet_hours(value: str):
+    """Parse 'HH:MM-HH:MM' (may wrap past midnight) into (start, end), or None."""
+    if not value or not value.strip():
+        return None
+    try:
+        start, end = (dtime.fromisoformat(part.strip()) for part in value.split('-'))
+    except ValueError:
+        logger.warning(f"[SCHEDULE] Ignoring invalid quiet hours: {value!r} (expected HH:MM-HH:MM)")
+        return None
+    return start, end
+
+
+class PollPolicy:
+    """Fixed interval between polls (the original behaviour)."""
+
+    def __init__(self, interval: float = 120):
+        self.interval = interval
+
+    def next_interval(self, found: int, now: datetime = None) -> float:
+        """Seconds until the next poll, given how many new items the last poll found."""
+        return self.interval
+
+    def describe(self) -> str:
+        return f"every {self.interval:g}s"
+
+
+class AdaptivePollPolicy(PollPolicy):
+    """
+    Drops to `min_interval` after a poll finds something, then multiplies the
+    interval by `backoff` on each empty poll up to `max_interval`. During quiet
+    hours polls are at least `quiet_interval` apart (but resume when they end).
+    """
+
+    def __init__(self, min_interval: float = 15, max_interval: float = 900, backoff: float = 2.0,
+                 initial_interval: float = 120, quiet_hours=None, quiet_interval: float = 3600):
+        super().__init__(initial_interval)
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff = max(backoff, 1.0)
+        self.quiet_hours = quiet_hours
+        self.quiet_interval = quiet_interval
+
+    def next_interval(self, found: int, now: datetime = None) -> float:
+        if found:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, max(self.min_interval, self.interval * self.backoff))
+
+        now = now or datetime.now()
+        until_end = self._quiet_remaining(now)
+        if until_end is not None:
+            return max(self.interval, min(self.quiet_interval, until_end))
+        return self.interval
+
+    def _quiet_remaining(self, now: datetime):
+        """Seconds until quiet hours end, or None outside quiet hours."""
+        if not self.quiet_hours:
+            return None
+        start, end = self.quiet_hours
+        current = now.time()
+        if start <= end:
+            inside = start <= current < end
+        else:
+            inside = current >= start or current < end  # Wraps past midnight
+        if not inside:
+            return None
+        end_at = datetime.combine(now.date(), end)
+        if end_at <= now:
+            end_at += timedelta(days=1)
+        return (end_at - now).total_seconds()
+
+    def describe(self) -> str:
+        text = f"adaptively every {self.min_interval:g}-{self.max_interval:g}s"
+        if self.quiet_hours:
+            start, end = self.quiet_hours
+            text += f" (quiet {start:%H:%M}-{end:%H:%M}: every {self.quiet_interval:g}s)"
+        return text
+
+
+def policy_from_env(default_interval: float = 120) -> PollPolicy:
+    """Build the poll policy from POLL_* environment variables."""
+    if os.getenv('POLL_MODE', 'adaptive').lower() == 'fixed':
+        return PollPolicy(float(os.getenv('POLL_INTERVAL', str(default_interval))))
+    return AdaptivePollPolicy(
+        min_interval=float(os.getenv('POLL_MIN_INTERVAL', '15')),
+        max_interval=float(os.getenv('POLL_MAX_INTERVAL', '900')),
+        backoff=float(os.getenv('POLL_BACKOFF', '2')),
+        initial_interval=default_interval,
+        quiet_hours=parse_quiet_hours(os.getenv('POLL_QUIET_HOURS', '')),
+        quiet_interval=float(os.getenv('POLL_QUIET_INTERVAL', '3600'))
+    )
+
+
+class Waker:
+    """
+    Lets a local trigger cut the wait before the next poll short: a signal
+    (SIGUSR1, where the platform has it) or creating a touch-file.
+    """
+
+    def __init__(self, touch_file=None, signal_name: str = 'SIGUSR1', check_interval: float = 1.0):
+        self.touch_file = Path(touch_file) if touch_file else None
+        self.signal_name = signal_name
+        self.check_interval = check_interval
+        self.on_wake = None  # Optional callback (no args), e.g. to interrupt another wait
+        self._event = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        signum = getattr(signal, self.signal_name, None) if self.signal_name else None
+        if signum is not None and threading.current_thread() is threading.main_thread():
+            signal.signal(signum, lambda *_: self.trigger(self.signal_name))
+        if self.touch_file and not self._thread:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch_touch_file, name='waker', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.check_interval * 2)
+            self._thread = None
+
+    def trigger(self, reason: str = 'manual'):
+        logger.info(f"[SCHEDULE] Woken early ({reason})")
+        self._event.set()
+        if self.on_wake:
+            self.on_wake()
+
+    def consume(self) -> bool:
+        """True (once) if a trigger fired since the last call."""
+        triggered = self._event.is_set()
+        self._event.clear()
+        return triggered
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to `timeout` seconds; returns early (True) when triggered."""
+        return self._event.wait(max(timeout, 0))
+
+    def _watch_touch_file(self):
+        while not self._stop.wait(self.check_interval):
+            if self.touch_file.exists():
+                try:
+                    self.touch_file.unlink()
+                except OSError:
+                    pass
+                self.trigger(self.touch_file.name)
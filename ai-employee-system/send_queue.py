@@ -0,0 +1,219 @@
+"""
+Send Queue - Durable outbound email spool (SQLite)
+Replies are enqueued by the pipeline and sent by a background thread with
+per-minute quotas, exponential backoff on transient errors, and deduplication,
+so a 429/5xx or a crash never loses a reply and ingestion never waits on a send.
+"""
+
+import time
+import random
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from rate_limiter import TokenBucket
+
+logger = logging.getLogger('SendQueue')
+
+DEFAULT_QUEUE_PATH = Path(__file__).parent / "state" / "outbox.sqlite3"
+
+# HTTP statuses worth retrying (rate limits and server errors)
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+
+
+def is_transient(error: Exception) -> bool:
+    """Retry rate limits, 5xx and network errors; give up on other HTTP errors."""
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    if status is None:
+        return True  # Socket/timeout/connection errors carry no HTTP status
+    if int(status) == 403 and b'ateLimitExceeded' in (getattr(error, 'content', b'') or b''):
+        return True  # rateLimitExceeded / userRateLimitExceeded
+    return int(status) in TRANSIENT_STATUSES
+
+
+class SendQueue:
+    """Persistent outbox drained by a background sender thread."""
+
+    def __init__(self, send_func, path=None, per_minute: float = 20, base_delay: float = 5.0,
+                 max_delay: float = 900.0, max_attempts: int = 8):
+        self.send_func = send_func
+        self.path = Path(path) if path else DEFAULT_QUEUE_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.quota = TokenBucket.per_minute(per_minute, burst=max(1.0, per_minute / 4))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.on_complete = None  # Called (no args) after each send succeeds or fails for good
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.conn = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                dedup_key TEXT UNIQUE NOT NULL,
+                kind TEXT NOT NULL,
+                message_id TEXT,
+                to_addr TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                source_path TEXT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                sent_at REAL,
+                finalized INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at)")
+        # A crash mid-send leaves rows in 'sending'; send them again (at-least-once)
+        self.conn.execute("UPDATE outbox SET status = 'queued' WHERE status = 'sending'")
+        self.conn.commit()
+
+    # -- Producer side ----------------------------------------------------
+
+    def enqueue(self, dedup_key: str, to: str, subject: str, body: str, kind: str = 'reply',
+                message_id: str = None, source_path: str = None) -> bool:
+        """Add a reply to the outbox. Returns False if `dedup_key` was already queued."""
+        now = time.time()
+        with self._lock:
+            # A duplicate is ignored, unless the earlier attempt failed and was reported
+            # back - then the reviewer re-checked it and it is queued again
+            cursor = self.conn.execute(
+                """INSERT INTO outbox
+                   (dedup_key, kind, message_id, to_addr, subject, body, source_path, next_attempt_at, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(dedup_key) DO UPDATE SET
+                       to_addr = excluded.to_addr, subject = excluded.subject, body = excluded.body,
+                       source_path = excluded.source_path, status = 'queued', attempts = 0,
+                       next_attempt_at = excluded.next_attempt_at, last_error = NULL, finalized = 0
+                   WHERE outbox.status = 'failed' AND outbox.finalized = 1""",
+                (dedup_key, kind, message_id, to, subject, body, source_path, now, now)
+            )
+            self.conn.commit()
+        if cursor.rowcount:
+            logger.info(f"[QUEUED] {kind} to: {to}")
+            self._wake.set()
+            return True
+        logger.info(f"[QUEUE] Duplicate skipped: {dedup_key}")
+        return False
+
+    def pending_count(self) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM outbox WHERE status IN ('queued', 'sending')"
+        ).fetchone()[0]
+
+    def completed(self, kind: str = None) -> list:
+        """Sent or failed rows whose outcome hasn't been reported back yet."""
+        query = "SELECT * FROM outbox WHERE status IN ('sent', 'failed') AND finalized = 0"
+        params = ()
+        if kind:
+            query += " AND kind = ?"
+            params = (kind,)
+        cursor = self.conn.execute(query + " ORDER BY id", params)
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def mark_finalized(self, row_id: int):
+        with self._lock:
+            self.conn.execute("UPDATE outbox SET finalized = 1 WHERE id = ?", (row_id,))
+            self.conn.commit()
+
+    # -- Sender thread ----------------------------------------------------
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='send-queue', daemon=True)
+        self._thread.start()
+        pending = self.pending_count()
+        if pending:
+            logger.info(f"[QUEUE] Resuming with {pending} pending send(s)")
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _claim_next(self):
+        """Atomically move the next due row to 'sending' (safe across processes)."""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                """SELECT id, to_addr, subject, body, attempts FROM outbox
+                   WHERE status = 'queued' AND next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT 1""",
+                (now,)
+            ).fetchone()
+            if row is None:
+                next_due = self.conn.execute(
+                    "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'queued'"
+                ).fetchone()[0]
+                return None, (next_due - now if next_due else None)
+            claimed = self.conn.execute(
+                "UPDATE outbox SET status = 'sending' WHERE id = ? AND status = 'queued'", (row[0],)
+            ).rowcount
+            self.conn.commit()
+        return (row if claimed else None), 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            row, wait_for = self._claim_next()
+            if row is None:
+                self._wake.wait(timeout=min(wait_for, 60) if wait_for is not None else 60)
+                self._wake.clear()
+                continue
+
+            # Honour the per-minute send quota
+            while not self.quota.acquire(timeout=1.0):
+                if self._stop.is_set():
+                    self._release(row[0])
+                    return
+            self._send(row)
+
+    def _release(self, row_id: int):
+        with self._lock:
+            self.conn.execute("UPDATE outbox SET status = 'queued' WHERE id = ?", (row_id,))
+            self.conn.commit()
+
+    def _send(self, row):
+        row_id, to, subject, body, attempts = row
+        try:
+            self.send_func(to, subject, body)
+        except Exception as e:
+            attempts += 1
+            if is_transient(e) and attempts < self.max_attempts:
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                delay *= random.uniform(0.8, 1.2)  # Jitter so retries don't line up
+                status, next_attempt = 'queued', time.time() + delay
+                logger.warning(f"[RETRY] Send to {to} failed ({e}); attempt {attempts}, retrying in {delay:.0f}s")
+            else:
+                status, next_attempt = 'failed', time.time()
+                logger.error(f"[FAILED] Giving up on send to {to} after {attempts} attempt(s): {e}")
+            with self._lock:
+                self.conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    (status, attempts, next_attempt, str(e)[:500], row_id)
+                )
+                self.conn.commit()
+            if status == 'failed' and self.on_complete:
+                self.on_complete()
+            return
+
+        with self._lock:
+            self.conn.execute(
+                "UPDATE outbox SET status = 'sent', attempts = ?, sent_at = ?, last_error = NULL WHERE id = ?",
+                (attempts + 1, time.time(), row_id)
+            )
+            self.conn.commit()
+        logger.info(f"[SENT] {subject[:50]} to: {to}")
+        if self.on_complete:
+            self.on_complete()
@@ -0,0 +1,178 @@
+"""
+State Store - Persistent watcher state in SQLite (WAL mode)
+Holds processed message IDs, sync cursors (e.g. Gmail historyId) and the
+pipeline stage of each message, so restarts don't re-process mail.
+"""
+
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger('StateStore')
+
+DEFAULT_STATE_PATH = Path(__file__).parent / "state" / "gmail_state.sqlite3"
+
+# Pipeline stages, in order. A message is "processed" once its file is written.
+STAGES = ['seen', 'fetched', 'processed', 'written', 'sent']
+DONE_STAGES = ('written', 'sent')
+
+# Schema migrations, applied in order; PRAGMA user_version records the last one
+MIGRATIONS = [
+    """
+    CREATE TABLE messages (
+        message_id TEXT PRIMARY KEY,
+        stage TEXT NOT NULL,
+        first_seen REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX idx_messages_updated ON messages(updated_at);
+    CREATE TABLE meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """,
+]
+
+
+class StateStore:
+    """Small embedded store for message stages and sync cursors."""
+
+    def __init__(self, path=None, retention_days: float = 90, max_messages: int = 100000):
+        self.path = Path(path) if path else DEFAULT_STATE_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.retention_days = retention_days
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.is_new = self._migrate()
+
+        # Done IDs are kept in memory too: one indexed scan at startup, O(1) checks after
+        self._done = {
+            row[0] for row in self.conn.execute(
+                f"SELECT message_id FROM messages WHERE stage IN ({','.join('?' * len(DONE_STAGES))})",
+                DONE_STAGES
+            )
+        }
+        logger.info(f"[STATE] Loaded {len(self._done)} processed message(s) from {self.path.name}")
+
+    def _migrate(self) -> bool:
+        """Apply pending migrations. Returns True if the store was created from empty."""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            self.conn.executescript(script)
+            self.conn.execute(f"PRAGMA user_version = {number}")
+            logger.info(f"[STATE] Applied schema migration {number}")
+        self.conn.commit()
+        return version == 0
+
+    # -- Message stages ---------------------------------------------------
+
+    def is_processed(self, message_id: str) -> bool:
+        return message_id in self._done
+
+    def filter_unprocessed(self, messages: list) -> list:
+        """Drop messages (dicts with 'id') that already have a vault file."""
+        return [m for m in messages if m['id'] not in self._done]
+
+    def set_stage(self, message_id: str, stage: str):
+        self.set_stages([message_id], stage)
+
+    def set_stages(self, message_ids: list, stage: str):
+        """Record the pipeline stage for many messages in one transaction."""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+        now = time.time()
+        with self._lock:
+            self.conn.executemany(
+                """INSERT INTO messages (message_id, stage, first_seen, updated_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(message_id) DO UPDATE SET stage = excluded.stage, updated_at = excluded.updated_at""",
+                [(message_id, stage, now, now) for message_id in message_ids]
+            )
+            self.conn.commit()
+        if stage in DONE_STAGES:
+            self._done.update(message_ids)
+
+    def get_stage(self, message_id: str):
+        row = self.conn.execute("SELECT stage FROM messages WHERE message_id = ?", (message_id,)).fetchone()
+        return row[0] if row else None
+
+    def unfinished(self) -> list:
+        """Message IDs seen but not yet written to the vault (e.g. interrupted by a crash)."""
+        return [
+            row[0] for row in self.conn.execute(
+                "SELECT message_id FROM messages WHERE stage IN ('seen', 'fetched', 'processed') ORDER BY first_seen"
+            )
+        ]
+
+    # -- Cursors ----------------------------------------------------------
+
+    def get_cursor(self, name: str, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def set_cursor(self, name: str, value):
+        with self._lock:
+            if value is None:
+                self.conn.execute("DELETE FROM meta WHERE key = ?", (name,))
+            else:
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (name, str(value)))
+            self.conn.commit()
+
+    # -- Maintenance ------------------------------------------------------
+
+    def seed_from_vault(self, folders: list) -> int:
+        """Mark messages that already have EMAIL_<id>.md files as written (first-run migration)."""
+        ids = []
+        for folder in folders:
+            if folder.exists():
+                ids.extend(f.stem[len('EMAIL_'):] for f in folder.rglob("EMAIL_*.md"))
+        if ids:
+            self.set_stages(ids, 'written')
+            logger.info(f"[STATE] Seeded {len(ids)} message ID(s) from existing vault files")
+        return len(ids)
+
+    def prune(self, keep=None) -> int:
+        """
+        Drop finished messages past the retention window, then cap the table size.
+        IDs in `keep` (messages whose vault file is still open) are never dropped:
+        a full resync would otherwise re-process them and overwrite the file.
+        """
+        cutoff = time.time() - self.retention_days * 86400
+        placeholders = ','.join('?' * len(DONE_STAGES))
+        with self._lock:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_ids (message_id TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM keep_ids")
+            self.conn.executemany("INSERT OR IGNORE INTO keep_ids VALUES (?)", [(m,) for m in keep or ()])
+            removed = self.conn.execute(
+                f"DELETE FROM messages WHERE updated_at < ? AND stage IN ({placeholders}) "
+                "AND message_id NOT IN (SELECT message_id FROM keep_ids)",
+                (cutoff, *DONE_STAGES)
+            ).rowcount
+            count = self.conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            if count > self.max_messages:
+                removed += self.conn.execute(
+                    "DELETE FROM messages WHERE message_id IN "
+                    "(SELECT message_id FROM messages WHERE message_id NOT IN (SELECT message_id FROM keep_ids) "
+                    "ORDER BY updated_at ASC LIMIT ?)",
+                    (count - self.max_messages,)
+                ).rowcount
+            self.conn.execute("DELETE FROM keep_ids")
+            self.conn.commit()
+            if removed:
+                self._done = {
+                    row[0] for row in self.conn.execute(
+                        f"SELECT message_id FROM messages WHERE stage IN ({placeholders})", DONE_STAGES
+                    )
+                }
+        if removed:
+            logger.info(f"[STATE] Pruned {removed} old message record(s)")
+        return removed
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,76 @@
+"""
+Shared fixtures: a GmailWatcher on the in-process fakes from benchmarks/
+(fake_gmail, fake_pubsub, fake_anthropic) in a temporary vault and state dir.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "benchmarks")]
+
+# Settings read by the watcher and processor; each test starts from these
+ENV = {
+    'LOCAL_CLASSIFIER_ENABLED': '0',
+    'VAULT_WATCH_MODE': 'poll',
+    'GMAIL_SYNC_MODE': 'incremental',
+    'GMAIL_PUSH_ENABLED': '0',
+    'DEDUP_ENABLED': '0',
+    'BATCH_MODE_ENABLED': '0',
+    'CLAUDE_COMBINED_PROMPT': '0',
+    'PROCESSOR_CONCURRENCY': '1',
+}
+UNSET = ('ANTHROPIC_API_KEY', 'GMAIL_PUSH_TOPIC', 'METRICS_TEXTFILE', 'METRICS_PORT', 'GMAIL_STATE_RETENTION_DAYS')
+
+
+@pytest.fixture(autouse=True)
+def isolated_env(monkeypatch, tmp_path):
+    for name, value in ENV.items():
+        monkeypatch.setenv(name, value)
+    for name in UNSET:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('LLM_CACHE_PATH', str(tmp_path / "llm_cache.sqlite3"))
+
+
+@pytest.fixture
+def service():
+    from fake_gmail import FakeGmailService
+    return FakeGmailService()
+
+
+@pytest.fixture
+def make_watcher(tmp_path, service):
+    """Create GmailWatchers on the fake mailbox (same vault and state dir); stopped after the test."""
+    from gmail_watcher import GmailWatcher
+    watchers = []
+
+    def make(client=None):
+        watcher = GmailWatcher(str(tmp_path / "vault"), token_path='unused.json',
+                               service=service, state_dir=str(tmp_path / "state"))
+        watcher.processor.client = client
+        if watcher.batcher is not None:
+            watcher.batcher.client = client
+        watchers.append(watcher)
+        return watcher
+
+    yield make
+    for watcher in watchers:
+        watcher.stop()
+
+
+def email_file(watcher, message_id: str):
+    """The single EMAIL_<id>.md for a message, wherever it is filed."""
+    paths = list(watcher.vault_path.rglob(f"EMAIL_{message_id}.md"))
+    assert len(paths) == 1, paths
+    return paths[0]
+
+
+def check_boxes(path: Path, *labels: str):
+    """Tick checkboxes in a vault file, as a reviewer would in Obsidian."""
+    content = path.read_text(encoding='utf-8')
+    for label in labels:
+        assert f'- [ ] {label}' in content
+        content = content.replace(f'- [ ] {label}', f'- [x] {label}')
+    path.write_text(content, encoding='utf-8')
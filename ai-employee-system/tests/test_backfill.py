@@ -0,0 +1,48 @@
+"""Backfill: historical mail is archived in Done/ unless routed like live mail on request."""
+
+import pytest
+
+from backfill import Backfill, main
+from frontmatter import parse_frontmatter
+
+EML = """From: {sender}
+To: me@example.com
+Subject: {subject}
+Date: Tue, 03 Mar 2026 10:00:00 +0000
+Message-ID: <{n}@example.com>
+
+{body}
+"""
+
+
+@pytest.fixture
+def archive(tmp_path):
+    folder = tmp_path / "export"
+    folder.mkdir()
+    mail = [("Dan <dan@example.com>", "Question about the project", "Quick question when you have time"),
+            ("Boss <boss@example.com>", "URGENT: contract deadline today", "Please sign before 5pm")]
+    for n, (sender, subject, body) in enumerate(mail):
+        (folder / f"{n}.eml").write_text(EML.format(sender=sender, subject=subject, body=body, n=n), encoding='utf-8')
+    return folder
+
+
+def test_backfilled_mail_is_archived_in_done_by_default(archive, tmp_path):
+    vault = tmp_path / "vault"
+    Backfill(archive, vault, checkpoint_path=tmp_path / "checkpoint.json", state_dir=str(tmp_path / "state")).run()
+    files = list(vault.rglob("EMAIL_*.md"))
+    assert len(files) == 2
+    for path in files:
+        assert path.relative_to(vault).parts[:3] == ("Done", "2026", "03")
+        fields = parse_frontmatter(path.read_text(encoding='utf-8'))
+        assert fields['status'] == 'archived' and fields['source'] == 'backfill'
+
+
+def test_route_files_by_priority_like_live_mail(archive, tmp_path):
+    vault = tmp_path / "vault"
+    main([str(archive), "--vault", str(vault), "--route", "--checkpoint", str(tmp_path / "checkpoint.json"),
+          "--state-dir", str(tmp_path / "state")])
+    files = list(vault.rglob("EMAIL_*.md"))
+    assert len(files) == 2
+    for path in files:
+        assert path.parent == vault / "Inbox"  # No drafts, so nothing for Pending_Approval
+        assert parse_frontmatter(path.read_text(encoding='utf-8'))['status'] == 'pending'
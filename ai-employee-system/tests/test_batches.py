@@ -0,0 +1,109 @@
+"""Batch mode: deferred emails get provisional files, re-filed when the fake Message Batch ends."""
+
+import pytest
+
+from conftest import email_file, check_boxes
+from fake_anthropic import FakeAnthropic, FakeAnthropicError
+from frontmatter import parse_frontmatter
+
+# The rules pre-classify both as MEDIUM; the (fake) model ranks the invoice HIGH
+INVOICE = ("Dan <dan@example.com>", "Question about the invoice", "Can we go over the invoice?")
+PROJECT = ("Eve <eve@example.com>", "Question about the project", "Quick question when you have time")
+
+
+@pytest.fixture
+def claude():
+    return FakeAnthropic(batch_delay=3600)  # Batches stay in_progress until a test ends them
+
+
+@pytest.fixture
+def watcher(make_watcher, service, monkeypatch, claude):
+    monkeypatch.setenv('BATCH_MODE_ENABLED', '1')
+    monkeypatch.setenv('BATCH_MAX_WAIT_SECONDS', '0')
+    monkeypatch.setenv('BATCH_POLL_INTERVAL', '0')
+    watcher = make_watcher(claude)
+    watcher.run_once()
+    return watcher
+
+
+def fields(watcher, message_id):
+    return parse_frontmatter(email_file(watcher, message_id).read_text(encoding='utf-8'))
+
+
+def test_deferred_emails_are_refiled_from_batch_results(watcher, service, claude):
+    invoice, project = service.deliver(*INVOICE), service.deliver(*PROJECT)
+    watcher.run_once()
+    for message_id in (invoice, project):
+        assert fields(watcher, message_id)['batch_status'] == 'pending'
+        assert email_file(watcher, message_id).parent.name == "Inbox"
+    assert claude.calls == 0 and claude.batch_requests == 2
+    assert len(watcher.batcher) == 2 and watcher.batcher.open_batches() == 1
+
+    claude.batch_delay = 0
+    refiled = watcher.process_batches(force=True)
+    assert sorted(refiled) == sorted([email_file(watcher, invoice), email_file(watcher, project)])
+    assert len(watcher.batcher) == 0 and watcher.batcher.open_batches() == 0
+
+    # Escalated: moved to Pending_Approval with a draft (the one synchronous call)
+    path = email_file(watcher, invoice)
+    assert path.parent.name == "Pending_Approval"
+    assert fields(watcher, invoice)['priority'] == 'HIGH'
+    assert 'batch_status' not in fields(watcher, invoice)
+    assert watcher.index.path_for(invoice) == path
+    assert claude.calls == 1
+
+    assert email_file(watcher, project).parent.name == "Inbox"
+    assert 'batch_status' not in fields(watcher, project)
+
+
+def test_a_provisional_file_acted_on_is_kept(watcher, service, claude):
+    invoice = service.deliver(*INVOICE)
+    watcher.run_once()
+    check_boxes(email_file(watcher, invoice), "Archive")
+    watcher.run_once()
+    assert watcher._in_done(email_file(watcher, invoice))
+
+    claude.batch_delay = 0
+    assert watcher.process_batches(force=True) == []
+    assert watcher._in_done(email_file(watcher, invoice))
+    assert fields(watcher, invoice)['priority'] == 'MEDIUM'
+    assert fields(watcher, invoice)['status'] == 'archived'
+
+
+def test_a_box_ticked_in_upper_case_keeps_the_provisional_file(watcher, service, claude):
+    invoice = service.deliver(*INVOICE)
+    watcher.run_once()
+    path = email_file(watcher, invoice)
+    path.write_text(path.read_text(encoding='utf-8').replace('- [ ] Archive', '- [X] Archive'), encoding='utf-8')
+
+    # The batch ends before the next vault scan has seen the edit
+    claude.batch_delay = 0
+    assert watcher.process_batches(force=True) == []
+    assert email_file(watcher, invoice) == path
+    assert '- [X] Archive' in path.read_text(encoding='utf-8')
+
+
+def test_open_batches_survive_a_restart(watcher, service, claude, make_watcher):
+    invoice = service.deliver(*INVOICE)
+    watcher.run_once()
+    watcher.stop()
+
+    restarted = make_watcher(claude)
+    assert len(restarted.batcher) == 1 and restarted.batcher.open_batches() == 1
+    claude.batch_delay = 0
+    assert restarted.process_batches(force=True) == [email_file(restarted, invoice)]
+    assert fields(restarted, invoice)['priority'] == 'HIGH'
+    assert claude.batch_calls == 1
+
+
+def test_failed_submission_categorizes_synchronously(watcher, service, claude):
+    def unavailable(**kwargs):
+        raise FakeAnthropicError(500, "Internal server error")
+
+    claude.messages.batches.create = unavailable
+    invoice = service.deliver(*INVOICE)
+    watcher.run_once()
+    assert len(watcher.batcher) == 0
+    assert 'batch_status' not in fields(watcher, invoice)
+    assert fields(watcher, invoice)['priority'] == 'HIGH'
+    assert email_file(watcher, invoice).parent.name == "Pending_Approval"
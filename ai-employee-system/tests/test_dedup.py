@@ -0,0 +1,41 @@
+"""Near-duplicate folding: look-alike bulk mail shares one vault entry; personal mail never does."""
+
+import pytest
+
+from conftest import email_file
+from frontmatter import parse_frontmatter
+
+
+@pytest.fixture
+def watcher(make_watcher, monkeypatch):
+    monkeypatch.setenv('DEDUP_ENABLED', '1')
+    watcher = make_watcher()
+    watcher.run_once()
+    return watcher
+
+
+def test_alert_storm_is_folded_into_one_file(watcher, service):
+    first = service.deliver("Monitoring <alerts@example.com>", "Disk usage on web-3 at 91%", "Threshold exceeded at 10:42")
+    second = service.deliver("Monitoring <alerts@example.com>", "Disk usage on web-7 at 93%", "Threshold exceeded at 10:43")
+    watcher.run_once()
+
+    fields = parse_frontmatter(email_file(watcher, first).read_text(encoding='utf-8'))
+    assert fields['duplicate_count'] == '2' and fields['duplicate_ids'] == second
+    assert not list(watcher.vault_path.rglob(f"EMAIL_{second}.md"))
+
+
+def test_list_mail_is_folded(watcher, service):
+    headers = {'List-Id': '<team.lists.example.com>'}
+    first = service.deliver("Team list <team@lists.example.com>", "Weekly digest 41", "Ten new posts", headers=headers)
+    service.deliver("Team list <team@lists.example.com>", "Weekly digest 42", "Ten new posts", headers=headers)
+    watcher.run_once()
+    assert parse_frontmatter(email_file(watcher, first).read_text(encoding='utf-8'))['duplicate_count'] == '2'
+
+
+def test_short_personal_mails_are_not_folded(watcher, service):
+    # Identical fingerprints: only the sender shows these are two separate replies
+    first = service.deliver("Dan <dan@example.com>", "Re: lunch", "Thanks!")
+    second = service.deliver("Dan <dan@example.com>", "Re: lunch", "Thanks")
+    watcher.run_once()
+    for message_id in (first, second):
+        assert 'duplicate_count' not in parse_frontmatter(email_file(watcher, message_id).read_text(encoding='utf-8'))
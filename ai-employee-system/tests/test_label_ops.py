@@ -0,0 +1,72 @@
+"""LabelBatcher against the fake mailbox: grouping, bad-ID isolation and transient retries."""
+
+from label_ops import LabelBatcher
+
+
+def test_changes_are_grouped_into_one_call(service):
+    ids = [service.deliver(f"User {i} <u{i}@example.com>", f"Hello {i}") for i in range(10)]
+    batcher = LabelBatcher(service)
+    for message_id in ids:
+        batcher.archive(message_id)
+
+    results = batcher.flush()
+    assert service.calls['batchModify'] == 1
+    assert all(error is None for _, error in results.values())
+    assert all(service.messages[m]['labelIds'] == ['UNREAD'] for m in ids)
+
+
+def test_split_isolates_a_bad_id(service):
+    ids = [service.deliver(f"User {i} <u{i}@example.com>", f"Hello {i}") for i in range(8)]
+    batcher = LabelBatcher(service)
+    for message_id in ids[:5] + ['deleted-in-gmail'] + ids[5:]:
+        batcher.mark_read(message_id)
+
+    results = batcher.flush()
+    ops, error = results['deleted-in-gmail']
+    assert ops == ['mark_read'] and error.resp.status == 400
+    for message_id in ids:
+        assert results[message_id] == (['mark_read'], None)
+        assert 'UNREAD' not in service.messages[message_id]['labelIds']
+    # Halving finds one bad ID in 9 with a handful of calls, not one per message
+    assert 1 < service.calls['batchModify'] < len(ids)
+    assert len(batcher) == 0
+
+
+
+def test_transient_errors_stay_queued_with_backoff(service):
+    message_id = service.deliver("Amy <amy@example.com>", "Hello")
+    batcher = LabelBatcher(service)
+    batcher.archive(message_id)
+
+    service.error_rate = 1.0  # Every request fails with a 503
+    assert batcher.flush() == {}
+    assert len(batcher) == 1
+
+    # Not retried on every cycle: the next attempt waits out the backoff
+    service.error_rate = 0.0
+    calls = service.calls['batchModify']
+    assert batcher.flush() == {}
+    assert service.calls['batchModify'] == calls
+
+    entry = batcher.pending[message_id]
+    entry['next_attempt'] = 0  # Backoff over
+    assert batcher.flush() == {message_id: (['archive'], None)}
+    assert 'INBOX' not in service.messages[message_id]['labelIds']
+
+
+def test_backoff_doubles_and_force_ignores_it(service, monkeypatch):
+    message_id = service.deliver("Amy <amy@example.com>", "Hello")
+    batcher = LabelBatcher(service, base_delay=10, max_delay=25)
+    monkeypatch.setattr('label_ops.random.uniform', lambda a, b: 1.0)
+    monkeypatch.setattr('label_ops.time.monotonic', lambda: 1000.0)
+    batcher.mark_read(message_id)
+
+    service.error_rate = 1.0
+    delays = []
+    for _ in range(3):
+        batcher.flush(force=True)
+        delays.append(batcher.pending[message_id]['next_attempt'] - 1000.0)
+    assert delays == [10, 20, 25]
+
+    service.error_rate = 0.0
+    assert batcher.flush(force=True) == {message_id: (['mark_read'], None)}
@@ -0,0 +1,30 @@
+"""The LLM cache in front of Claude: categorizations are reused until the prompt changes."""
+
+import os
+
+from fake_anthropic import FakeAnthropic
+
+INVOICE = ("Dan <dan@example.com>", "Question about the invoice", "Can we go over the invoice?")
+
+
+def test_handbook_edit_invalidates_cached_categorizations(tmp_path):
+    from email_processor import EmailProcessor
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    handbook = vault / "Company_Handbook.md"
+    handbook.write_text("# Handbook\n\nInvoices are HIGH priority.\n", encoding='utf-8')
+
+    processor = EmailProcessor(str(vault), state_dir=str(tmp_path / "state"))
+    processor.client = claude = FakeAnthropic()
+    key = processor.categorize_key(*INVOICE)
+    processor.categorize_email(*INVOICE)
+    processor.categorize_email(*INVOICE)
+    assert claude.calls == 1
+    assert processor.categorize_offline(*INVOICE) is not None
+
+    handbook.write_text("# Handbook\n\nInvoices are MEDIUM priority.\n", encoding='utf-8')
+    os.utime(handbook, (1, 1))  # A new mtime even within the same clock tick
+    assert processor.categorize_key(*INVOICE) != key
+    assert processor.categorize_offline(*INVOICE) is None  # Only Claude can decide now
+    processor.categorize_email(*INVOICE)
+    assert claude.calls == 2
@@ -0,0 +1,83 @@
+"""The local classifier: margin calibrated on held-out files, trained off the email thread."""
+
+import random
+import threading
+
+import pytest
+
+from action_files import render_action_file
+from local_classifier import LocalClassifier
+
+TOPICS = {
+    'URGENT': ["server down outage production", "contract deadline today sign"],
+    'LOW': ["weekly newsletter digest unsubscribe", "webinar invitation special offer"],
+}
+
+
+def write_done(folder, n: int, noisy: bool = False, seed: int = 7):
+    """n labelled files in Done/; with noisy=True the labels are coin flips."""
+    rng = random.Random(seed)
+    folder.mkdir(parents=True, exist_ok=True)
+    for i in range(n):
+        topic = rng.choice(list(TOPICS))
+        label = rng.choice(list(TOPICS)) if noisy else topic
+        words = rng.choice(TOPICS[topic]).split()
+        rng.shuffle(words)
+        email = {'message_id': f"{i:05d}", 'email_from': f"user{i}@{topic.lower()}.example",
+                 'subject': ' '.join(words[:2]), 'content': ' '.join(words)}
+        processed = {'priority': label, 'reason': 'Claude', 'needs_response': False, 'suggested_action': ''}
+        (folder / f"EMAIL_{i:05d}.md").write_text(render_action_file(email, processed), encoding='utf-8')
+
+
+def test_margin_is_calibrated_on_held_out_files(tmp_path):
+    write_done(tmp_path / "Done", 200)
+    classifier = LocalClassifier(tmp_path / "model.json", n_buckets=2 ** 12, min_examples=20)
+    assert classifier.train_from_folder(tmp_path / "Done") == 200
+    assert len(classifier.holdout) == 180  # Everything after the first 20 was predicted first
+    assert classifier.min_margin is not None
+
+    prediction = classifier.predict("ops@urgent.example", "server down", "production outage server down")
+    assert prediction[0] == 'URGENT' and classifier.confident(prediction)
+
+    # The calibration is saved with the model
+    reloaded = LocalClassifier(tmp_path / "model.json", n_buckets=2 ** 12, min_examples=20)
+    assert reloaded.min_margin == classifier.min_margin
+
+
+def test_no_answers_when_held_out_precision_is_too_low(tmp_path):
+    write_done(tmp_path / "Done", 200, noisy=True)
+    classifier = LocalClassifier(tmp_path / "model.json", n_buckets=2 ** 12, min_examples=20)
+    classifier.train_from_folder(tmp_path / "Done")
+    assert classifier.min_margin is None
+    assert not classifier.confident(classifier.predict("ops@urgent.example", "server down", "outage"))
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.setenv('LOCAL_CLASSIFIER_ENABLED', '1')
+    monkeypatch.setenv('LOCAL_CLASSIFIER_MIN_EXAMPLES', '20')
+    from email_processor import EmailProcessor
+    return EmailProcessor(str(tmp_path / "vault"), state_dir=str(tmp_path / "state"))
+
+
+def test_training_runs_off_the_email_thread(processor):
+    write_done(processor.done_folder, 100)
+    started, release = threading.Event(), threading.Event()
+    train = processor.classifier.train_from_folder
+
+    def slow_train(folder):
+        started.set()
+        release.wait(5)
+        return train(folder)
+
+    processor.classifier.train_from_folder = slow_train
+    # Untrained: no answer, and no waiting for the walk over Done/
+    assert processor._local_categorize("ops@urgent.example", "server down", "outage") is None
+    assert started.wait(5)
+    assert processor._local_categorize("ops@urgent.example", "server down", "outage") is None  # Not retrained twice
+
+    release.set()
+    processor._classifier_lock.acquire(timeout=5)
+    processor._classifier_lock.release()
+    result = processor._local_categorize("ops@urgent.example", "server down", "production outage server down")
+    assert result['priority'] == 'URGENT' and result['reason'].startswith("Local classifier (margin")
@@ -0,0 +1,77 @@
+"""Push notifications: fake Pub/Sub envelopes posted to the local receiver wake the watcher."""
+
+import time
+
+import pytest
+
+from conftest import email_file
+from fake_pubsub import FakePublisher
+from push_receiver import PushReceiver
+
+
+@pytest.fixture
+def receiver():
+    receiver = PushReceiver(port=0)
+    receiver.start()
+    yield receiver
+    receiver.stop()
+
+
+def test_notification_wakes_the_watcher(make_watcher, service, monkeypatch):
+    monkeypatch.setenv('GMAIL_PUSH_ENABLED', '1')
+    monkeypatch.setenv('GMAIL_PUSH_PORT', '0')
+    monkeypatch.setenv('GMAIL_PUSH_TOPIC', 'projects/test/topics/gmail')
+    watcher = make_watcher()
+    watcher.start()
+    watcher.run_once()
+    assert service.watch_requests[0]['topicName'] == 'projects/test/topics/gmail'
+    FakePublisher(watcher.push_receiver.url).attach(service)
+
+    message_id = service.deliver("Dan <dan@example.com>", "Question about the project", "Quick question")
+    deadline = time.monotonic() + 5
+    while not watcher.waker.consume():
+        assert time.monotonic() < deadline, "no wake-up from the push notification"
+        time.sleep(0.01)
+    assert watcher.run_once() == 1
+    email_file(watcher, message_id)
+
+
+def test_duplicate_and_stale_history_ids_dispatch_once(receiver):
+    seen = []
+    receiver.register('me@example.com', seen.append)
+    publisher = FakePublisher(receiver.url, duplicate=True)  # Pub/Sub delivers at least once
+
+    assert publisher.publish('me@example.com', 5) == 204
+    assert publisher.publish('me@example.com', 4) == 204  # Out of order: older than the last one
+    assert publisher.publish('me@example.com', 6) == 204
+    assert receiver.received == 6
+    assert seen == [5, 6]
+
+
+def test_notifications_are_routed_by_address(receiver):
+    work, home = [], []
+    receiver.register('work@example.com', work.append)
+    receiver.register('Home@Example.com', home.append)
+    publisher = FakePublisher(receiver.url)
+
+    publisher.publish('work@example.com', 10)
+    publisher.publish('home@example.com', 7)
+    publisher.publish('someone@example.com', 11)  # No watcher for this mailbox
+    assert work == [10] and home == [7]
+
+
+def test_token_and_malformed_envelopes_are_rejected():
+    receiver = PushReceiver(port=0, token='s3cret')
+    receiver.start()
+    try:
+        seen = []
+        receiver.register('me@example.com', seen.append)
+        assert FakePublisher(receiver.url).publish('me@example.com', 5) == 403
+        assert FakePublisher(receiver.url + '?token=s3cret').publish('me@example.com', 5) == 204
+
+        publisher = FakePublisher(receiver.url + '?token=s3cret')
+        publisher.envelope = lambda email_address, history_id: {"message": {"data": "not base64 json"}}
+        assert publisher.publish('me@example.com', 6) == 400
+        assert seen == [5]
+    finally:
+        receiver.stop()
@@ -0,0 +1,103 @@
+"""Checkbox replies through the outbox: finalizing sends, reporting failures, Reply+Archive."""
+
+import time
+
+import pytest
+
+from conftest import email_file, check_boxes
+from frontmatter import parse_frontmatter
+
+QUESTION = ("Dan <dan@example.com>", "Question about the project", "Quick question when you have time")
+
+
+def run_until(watcher, condition, timeout: float = 5.0):
+    """Run vault cycles until condition() holds (the outbox sends in the background)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        watcher.run_once()
+        if condition():
+            return
+        time.sleep(0.05)
+    raise AssertionError("condition not met in time")
+
+
+def outbox_settled(watcher):
+    outbox = watcher.processor.outbox
+    return lambda: outbox.pending_count() == 0 and not outbox.completed()
+
+
+@pytest.fixture
+def filed(make_watcher, service):
+    """A watcher with one MEDIUM email filed in Inbox/."""
+    watcher = make_watcher()
+    watcher.run_once()
+    message_id = service.deliver(*QUESTION)
+    watcher.run_once()
+    assert email_file(watcher, message_id).parent.name == "Inbox"
+    return watcher, message_id
+
+
+def test_sent_reply_is_finalized(filed, service):
+    watcher, message_id = filed
+    check_boxes(email_file(watcher, message_id), "Reply to sender")
+    watcher.run_once()
+    content = email_file(watcher, message_id).read_text(encoding='utf-8')
+    assert '- [x] Reply to sender (QUEUED)' in content
+    assert parse_frontmatter(content)['status'] == 'queued'
+
+    watcher.processor.outbox.start()
+    run_until(watcher, outbox_settled(watcher))
+    path = email_file(watcher, message_id)
+    content = path.read_text(encoding='utf-8')
+    assert watcher._in_done(path)
+    assert '- [x] Reply to sender (SENT)' in content
+    assert parse_frontmatter(content)['status'] == 'sent'
+    assert len(service.sent) == 1
+    assert 'UNREAD' not in service.messages[message_id]['labelIds']
+
+
+def test_failed_reply_is_reported_and_can_be_retried(filed, service):
+    watcher, message_id = filed
+    outbox = watcher.processor.outbox
+    send = outbox.send_func
+
+    def rejected(to, subject, body):
+        from fake_gmail import _FakeResponse
+        from googleapiclient.errors import HttpError
+        raise HttpError(_FakeResponse(400, 'Bad Request'), b'{"error": "invalidArgument"}')
+
+    outbox.send_func = rejected
+    outbox.start()
+    check_boxes(email_file(watcher, message_id), "Reply to sender")
+    run_until(watcher, outbox_settled(watcher))
+    content = email_file(watcher, message_id).read_text(encoding='utf-8')
+    assert '- [ ] Reply to sender (FAILED:' in content
+    assert parse_frontmatter(content)['status'] == 'send_failed'
+    assert email_file(watcher, message_id).parent.name == "Inbox"
+
+    # The reviewer re-checks the box once the problem is fixed
+    outbox.send_func = send
+    path = email_file(watcher, message_id)
+    path.write_text(path.read_text(encoding='utf-8').replace('- [ ] Reply to sender (FAILED:', '- [x] Reply to sender (FAILED:'),
+                    encoding='utf-8')
+    run_until(watcher, lambda: watcher._in_done(email_file(watcher, message_id)))
+    assert '- [x] Reply to sender (SENT)' in email_file(watcher, message_id).read_text(encoding='utf-8')
+    assert len(service.sent) == 1
+
+
+def test_reply_and_archive_keep_the_file(filed, service):
+    watcher, message_id = filed
+    check_boxes(email_file(watcher, message_id), "Reply to sender", "Archive")
+    # The archive is applied in this cycle, while the reply still waits in the outbox
+    watcher.run_once()
+    assert 'INBOX' not in service.messages[message_id]['labelIds']
+    assert email_file(watcher, message_id).parent.name == "Inbox"
+
+    watcher.processor.outbox.start()
+    run_until(watcher, outbox_settled(watcher))
+    path = email_file(watcher, message_id)
+    content = path.read_text(encoding='utf-8')
+    assert watcher._in_done(path)
+    assert '- [x] Reply to sender (SENT)' in content
+    assert '- [x] Archive (ARCHIVED)' in content
+    assert len(service.sent) == 1
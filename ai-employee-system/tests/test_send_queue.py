@@ -0,0 +1,122 @@
+"""SendQueue: retries with backoff, giving up, deduplication and reporting outcomes."""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from send_queue import SendQueue
+
+
+class StatusError(Exception):
+    """An API error carrying an HTTP status, like googleapiclient's HttpError."""
+
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.resp = SimpleNamespace(status=status)
+        self.content = b''
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    queues = []
+
+    def make(send_func, **kwargs):
+        options = dict(per_minute=6000, base_delay=0.05, max_delay=0.2, max_attempts=4)
+        options.update(kwargs)
+        queue = SendQueue(send_func, tmp_path / "outbox.sqlite3", **options)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.stop()
+
+
+def wait_for_completed(queue, timeout: float = 5.0) -> list:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        rows = queue.completed()
+        if rows:
+            return rows
+        time.sleep(0.01)
+    raise AssertionError("nothing completed in time")
+
+
+def test_transient_errors_are_retried_with_backoff(make_queue):
+    attempts = []
+
+    def send(to, subject, body):
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise StatusError(503)
+
+    queue = make_queue(send)
+    assert queue.enqueue("reply:1", "amy@example.com", "Re: Hello", "Thanks")
+    queue.start()
+    [row] = wait_for_completed(queue)
+
+    assert row['status'] == 'sent' and row['attempts'] == 3 and row['last_error'] is None
+    # Exponential backoff (with +-20% jitter): about 0.05s, then 0.1s
+    assert attempts[1] - attempts[0] >= 0.05 * 0.8
+    assert attempts[2] - attempts[1] >= 0.1 * 0.8
+
+
+def test_permanent_error_fails_at_once(make_queue):
+    completed = []
+
+    def send(to, subject, body):
+        raise StatusError(400)
+
+    queue = make_queue(send)
+    queue.on_complete = lambda: completed.append(True)
+    queue.enqueue("reply:1", "amy@example.com", "Re: Hello", "Thanks")
+    queue.start()
+    [row] = wait_for_completed(queue)
+
+    assert row['status'] == 'failed' and row['attempts'] == 1
+    assert 'HTTP 400' in row['last_error']
+    assert completed
+
+
+def test_gives_up_after_max_attempts(make_queue):
+    def send(to, subject, body):
+        raise StatusError(429)
+
+    queue = make_queue(send, base_delay=0.01, max_attempts=3)
+    queue.enqueue("reply:1", "amy@example.com", "Re: Hello", "Thanks")
+    queue.start()
+    [row] = wait_for_completed(queue)
+    assert row['status'] == 'failed' and row['attempts'] == 3
+
+
+def test_duplicates_are_skipped_until_a_failure_is_reported(make_queue):
+    def send(to, subject, body):
+        raise StatusError(400)
+
+    queue = make_queue(send)
+    assert queue.enqueue("reply:1", "amy@example.com", "Re: Hello", "Thanks")
+    assert not queue.enqueue("reply:1", "amy@example.com", "Re: Hello", "Thanks again")
+    queue.start()
+    [row] = wait_for_completed(queue)
+    assert not queue.enqueue("reply:1", "amy@example.com", "Re: Hello", "Thanks again")
+
+    # Once the failure has been reported back, re-checking the box queues it again
+    queue.mark_finalized(row['id'])
+    assert queue.completed() == []
+    queue.send_func = lambda to, subject, body: None
+    assert queue.enqueue("reply:1", "amy@example.com", "Re: Hello", "Thanks again")
+    [row] = wait_for_completed(queue)
+    assert row['status'] == 'sent' and row['body'] == "Thanks again"
+
+
+def test_rows_left_sending_by_a_crash_are_sent_again(make_queue, tmp_path):
+    queue = make_queue(lambda to, subject, body: None)
+    queue.enqueue("reply:1", "amy@example.com", "Re: Hello", "Thanks")
+    row, _ = queue._claim_next()
+    assert row is not None and queue.pending_count() == 1  # 'sending' when the process died
+
+    restarted = make_queue(lambda to, subject, body: None)
+    restarted.start()
+    [row] = wait_for_completed(restarted)
+    assert row['status'] == 'sent'
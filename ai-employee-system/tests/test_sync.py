@@ -0,0 +1,61 @@
+"""History sync against the fake mailbox: incremental polls, expired historyIds and state pruning."""
+
+import sqlite3
+
+from conftest import email_file
+
+
+def test_incremental_sync_files_only_new_mail(make_watcher, service):
+    first = service.deliver("Amy <amy@example.com>", "Lunch", "Lunch on Friday?")
+    watcher = make_watcher()
+    assert watcher.run_once() == 1  # No historyId yet: full sync
+    assert watcher.history_id == str(service.history_id)
+
+    second = service.deliver("Bob <bob@example.com>", "Notes", "Notes from today")
+    lists = service.calls.get('list', 0)
+    assert watcher.run_once() == 1
+    assert service.calls.get('list', 0) == lists  # history.list only
+    email_file(watcher, first)
+    email_file(watcher, second)
+
+
+def test_expired_history_id_runs_full_resync(make_watcher, service):
+    old = service.deliver("Amy <amy@example.com>", "Lunch", "Lunch on Friday?")
+    watcher = make_watcher()
+    watcher.run_once()
+    cursor = watcher.history_id
+
+    new = service.deliver("Bob <bob@example.com>", "Notes", "Notes from today")
+    service.expire_history()  # history.list now answers 404 for the stored cursor
+    assert watcher.run_once() == 1  # Only the new message; the filed one is not processed again
+    email_file(watcher, old)
+    email_file(watcher, new)
+    assert int(watcher.history_id) > int(cursor)
+
+    # Back on incremental sync from the fresh cursor
+    latest = service.deliver("Cat <cat@example.com>", "Plans", "Weekend plans")
+    lists = service.calls.get('list', 0)
+    assert watcher.run_once() == 1
+    assert service.calls.get('list', 0) == lists
+    email_file(watcher, latest)
+
+
+def test_resync_keeps_reviewer_edits_of_old_open_emails(make_watcher, service, monkeypatch):
+    message_id = service.deliver("Dan <dan@example.com>", "Question about the project", "Quick question")
+    watcher = make_watcher()
+    watcher.run_once()
+    path = email_file(watcher, message_id)
+    path.write_text(path.read_text(encoding='utf-8') + "\nReviewer note: call Dan back\n", encoding='utf-8')
+    watcher.stop()
+
+    # The record is past the retention window, but the email is still unread and its file open
+    with sqlite3.connect(watcher.state.path) as conn:
+        conn.execute("UPDATE messages SET updated_at = 0")
+    monkeypatch.setenv('GMAIL_STATE_RETENTION_DAYS', '1')
+    watcher = make_watcher()
+    assert email_file(watcher, message_id).parent.name == "Inbox"
+    assert watcher.state.is_processed(message_id)
+
+    service.expire_history()
+    assert watcher.run_once() == 0
+    assert "Reviewer note: call Dan back" in email_file(watcher, message_id).read_text(encoding='utf-8')
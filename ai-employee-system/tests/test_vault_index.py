@@ -0,0 +1,20 @@
+"""The vault frontmatter index kept by the watcher: rows follow files, and go when a file is deleted."""
+
+from conftest import email_file, check_boxes
+
+
+def test_deleted_file_is_dropped_from_the_index(make_watcher, service):
+    watcher = make_watcher()
+    message_id = service.deliver("Dan <dan@example.com>", "Question about the project", "Quick question")
+    watcher.run_once()
+    path = email_file(watcher, message_id)
+    assert watcher.index.path_for(message_id) == path
+
+    # Archived in Obsidian, then deleted before the label change is reported back
+    check_boxes(path, "Archive")
+    watcher.scan_for_checkbox_triggers()
+    path.unlink()
+    watcher.flush_label_ops()
+    assert 'INBOX' not in service.messages[message_id]['labelIds']
+    assert watcher.index.path_for(message_id) is None
+    assert watcher.index.query(folder="Inbox") == []
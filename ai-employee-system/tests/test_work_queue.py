@@ -0,0 +1,50 @@
+"""The priority work queue between fetching and processing: nothing popped is lost to an exception."""
+
+import pytest
+
+from conftest import email_file
+
+
+class Flaky:
+    """Wraps process_email so that chosen calls raise."""
+
+    def __init__(self, process_email, fail_calls):
+        self.process_email = process_email
+        self.fail_calls = fail_calls
+        self.calls = 0
+
+    def __call__(self, **email):
+        self.calls += 1
+        if self.calls in self.fail_calls:
+            raise OSError("disk full")
+        return self.process_email(**email)
+
+
+def test_emails_popped_before_an_exception_are_requeued(make_watcher, service):
+    watcher = make_watcher()
+    watcher.run_once()
+    urgent = service.deliver("Boss <boss@example.com>", "URGENT: server down", "Production is down")
+    question = service.deliver("Dan <dan@example.com>", "Question about the project", "Quick question")
+    watcher.processor.process_email = Flaky(watcher.processor.process_email, fail_calls={1})
+
+    with pytest.raises(OSError):
+        watcher.run_once()
+    assert len(watcher.work_queue) == 2
+
+    watcher.run_once()  # No new mail: the queue is drained
+    assert len(watcher.work_queue) == 0
+    email_file(watcher, urgent)
+    email_file(watcher, question)
+
+
+def test_an_email_that_keeps_failing_is_dropped(make_watcher, service):
+    watcher = make_watcher()
+    watcher.run_once()
+    message_id = service.deliver("Dan <dan@example.com>", "Question about the project", "Quick question")
+    watcher.processor.process_email = Flaky(watcher.processor.process_email, fail_calls={1, 2, 3})
+
+    for _ in range(3):
+        with pytest.raises(OSError):
+            watcher.run_once()
+    assert len(watcher.work_queue) == 0 and watcher.work_attempts == {}
+    assert not list(watcher.vault_path.rglob(f"EMAIL_{message_id}.md"))
@@ -0,0 +1,167 @@
+"""
+Vault Events - Detect changed EMAIL_*.md files without re-reading the whole vault
+Uses filesystem events (watchdog: inotify / ReadDirectoryChangesW / FSEvents) when
+available, and an mtime/size index for polling-only folders (e.g. OneDrive sync).
+"""
+
+import os
+import time
+import fnmatch
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger('VaultEvents')
+
+# Filesystem events support (optional)
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+    FileSystemEventHandler = object
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """Forwards created/modified/moved file events to the tracker."""
+
+    def __init__(self, tracker):
+        super().__init__()
+        self.tracker = tracker
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.tracker.notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.tracker.notify(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.tracker.notify(event.dest_path)
+
+
+class VaultChangeTracker:
+    """
+    Reports which matching files changed since the last call.
+    mode='events' uses watchdog (falls back to 'poll' if it isn't installed);
+    mode='poll' compares (mtime, size) against an in-memory index, reading no file contents.
+    """
+
+    def __init__(self, folders: list, pattern: str = "EMAIL_*.md", mode: str = "events",
+                 poll_interval: float = 5.0, debounce: float = 0.2):
+        self.folders = [Path(f) for f in folders]
+        self.pattern = pattern
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.index = {}
+        self.observer = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._initial_scan = True
+
+        if mode == "events" and not WATCHDOG_AVAILABLE:
+            logger.warning("watchdog not installed - falling back to polling the vault")
+            mode = "poll"
+        self.mode = mode
+
+    def start(self):
+        """Start the filesystem observer (no-op in poll mode)."""
+        if self.mode != "events" or self.observer:
+            return
+        self.observer = Observer()
+        handler = _ChangeHandler(self)
+        for folder in self.folders:
+            folder.mkdir(parents=True, exist_ok=True)
+            self.observer.schedule(handler, str(folder), recursive=False)
+        self.observer.daemon = True
+        self.observer.start()
+        logger.info(f"[VAULT] Watching {len(self.folders)} folder(s) for changes")
+
+    def stop(self):
+        if self.observer:
+            self.observer.stop()
+            self.observer.join(timeout=5)
+            self.observer = None
+
+    def notify(self, path: str):
+        """Record a changed path (called from the observer thread)."""
+        if fnmatch.fnmatch(os.path.basename(path), self.pattern):
+            with self._lock:
+                self._pending.add(Path(path))
+            self._event.set()
+
+    def wake(self):
+        """Cut the current wait() short (e.g. when a background send completes)."""
+        self._event.set()
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to `timeout` seconds; returns early (True) when files changed."""
+        if timeout <= 0:
+            return False
+        if self.mode != "events":
+            woken = self._event.wait(min(timeout, self.poll_interval))
+            self._event.clear()
+            return woken
+        if self._event.wait(timeout):
+            # Editors often write a file several times in a row - let them finish
+            time.sleep(self.debounce)
+            return True
+        return False
+
+    def changed_files(self, full: bool = False) -> list:
+        """Return existing matching files changed since the last call (all of them on first call)."""
+        if full or self._initial_scan or self.mode != "events":
+            self._initial_scan = False
+            with self._lock:
+                self._pending.clear()
+                self._event.clear()
+            return self._scan_index()
+
+        with self._lock:
+            paths, self._pending = self._pending, set()
+            self._event.clear()
+
+        changed = []
+        for path in sorted(paths):
+            signature = self._signature(path)
+            if signature is None:
+                self.index.pop(path, None)
+            elif self.index.get(path) != signature:
+                self.index[path] = signature
+                changed.append(path)
+        return changed
+
+    def _scan_index(self) -> list:
+        """Stat every matching file and diff against the mtime/size index."""
+        changed = []
+        present = set()
+        for folder in self.folders:
+            if not folder.exists():
+                continue
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not fnmatch.fnmatch(entry.name, self.pattern):
+                        continue
+                    path = Path(entry.path)
+                    stat = entry.stat()
+                    signature = (stat.st_mtime_ns, stat.st_size)
+                    present.add(path)
+                    if self.index.get(path) != signature:
+                        self.index[path] = signature
+                        changed.append(path)
+
+        for path in set(self.index) - present:
+            del self.index[path]
+        return changed
+
+    @staticmethod
+    def _signature(path: Path):
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
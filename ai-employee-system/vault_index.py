@@ -0,0 +1,321 @@
+"""
+Vault Index - SQLite index of the EMAIL_*.md frontmatter in the vault
+The watcher updates a row whenever it writes or moves a file, so questions
+like "pending HIGH items older than 4 hours" are answered from the index in
+milliseconds instead of opening every markdown file. `rebuild` regenerates the
+index from the files on disk (e.g. after moving files around in Obsidian).
+
+Usage:
+    python vault_index.py query --vault "C:/path/to/AI-Employee-Vault" --status pending --priority HIGH --older-than 4h
+    python vault_index.py stats --vault ...
+    python vault_index.py rebuild --vault ...
+    python vault_index.py shard --vault ...     (move flat Done/ files into Done/YYYY/MM/)
+    python vault_index.py query --vault ... --state-dir state/work   (a watcher run by runtime.py as "work")
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime
+from frontmatter import parse_frontmatter
+from action_files import done_folder_for
+
+logger = logging.getLogger('VaultIndex')
+
+DEFAULT_INDEX_DIR = Path(__file__).parent / "state"
+
+# Folders the watcher writes to (searched recursively, so Done/YYYY/MM/ is included)
+VAULT_FOLDERS = ("Inbox", "Pending_Approval", "Approved", "Done")
+
+# Frontmatter fields kept per file
+FIELDS = ('from', 'subject', 'priority', 'status', 'received', 'sent_at')
+
+MIGRATIONS = [
+    """
+    CREATE TABLE files (
+        message_id TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        folder TEXT NOT NULL,
+        sender TEXT,
+        subject TEXT,
+        priority TEXT,
+        status TEXT,
+        received TEXT,
+        received_ts REAL,
+        sent_at TEXT,
+        indexed_at REAL NOT NULL
+    );
+    CREATE INDEX idx_files_status ON files(status, priority, received_ts);
+    CREATE INDEX idx_files_folder ON files(folder, received_ts);
+    """,
+]
+
+_DURATION = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*$', re.IGNORECASE)
+_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800, '': 3600}
+
+
+def default_index_path(vault_path, state_dir=None) -> Path:
+    """VAULT_INDEX_PATH, else <state_dir>/vault_index.sqlite3, else state/vault_index_<vault hash>.sqlite3."""
+    if os.getenv('VAULT_INDEX_PATH'):
+        return Path(os.getenv('VAULT_INDEX_PATH'))
+    if state_dir:
+        return Path(state_dir) / "vault_index.sqlite3"
+    digest = hashlib.sha1(str(Path(vault_path).resolve()).encode('utf-8')).hexdigest()[:12]
+    return DEFAULT_INDEX_DIR / f"vault_index_{digest}.sqlite3"
+
+
+def parse_duration(text: str) -> float:
+    """Seconds in '90s', '30m', '4h', '2d' or '1w' (a bare number is hours)."""
+    match = _DURATION.match(str(text))
+    if not match:
+        raise ValueError(f"Not a duration: {text!r} (use e.g. 30m, 4h, 2d)")
+    return float(match.group(1)) * _UNITS[match.group(2).lower()]
+
+
+def _timestamp(received: str):
+    """Epoch seconds of an ISO timestamp (naive ones are local time, as the watcher writes them)."""
+    if not received:
+        return None
+    try:
+        return datetime.fromisoformat(received).timestamp()
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+class VaultIndex:
+    """Frontmatter of every EMAIL_*.md file, keyed by message ID."""
+
+    def __init__(self, vault_path, path=None):
+        self.vault_path = Path(vault_path)
+        self._vault_resolved = self.vault_path.resolve()
+        self.path = Path(path) if path else default_index_path(vault_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.is_new = self._migrate()
+
+    def _migrate(self) -> bool:
+        """Apply pending migrations. Returns True if the index was created from empty."""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            self.conn.executescript(script)
+            self.conn.execute(f"PRAGMA user_version = {number}")
+        self.conn.commit()
+        return version == 0
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    # -- Updates ------------------------------------------------------------
+
+    def _row(self, path: Path, content: str) -> tuple:
+        fields = parse_frontmatter(content)
+        try:
+            relative = path.resolve().relative_to(self._vault_resolved)
+        except ValueError:
+            relative = path  # Outside the vault: keep the path as given
+        parts = relative.parts
+        folder = parts[0] if len(parts) > 1 else ''
+        return (
+            path.stem[len('EMAIL_'):], relative.as_posix(), folder,
+            *(fields.get(name) or None for name in FIELDS[:5]), _timestamp(fields.get('received')),
+            fields.get('sent_at') or None, time.time(),
+        )
+
+    def upsert(self, path, content: str = None, commit: bool = True):
+        """Record (or refresh) a file's frontmatter; reads the file if `content` is not given."""
+        path = Path(path)
+        if content is None:
+            content = path.read_text(encoding='utf-8')
+        row = self._row(path, content)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (message_id, path, folder, sender, subject, priority, status, "
+                "received, received_ts, sent_at, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+            )
+            if commit:
+                self.conn.commit()
+
+    def remove(self, message_id: str):
+        with self._lock:
+            self.conn.execute("DELETE FROM files WHERE message_id = ?", (message_id,))
+            self.conn.commit()
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+
+    def rebuild(self) -> int:
+        """Drop every row and re-read the frontmatter of all files on disk. Returns the file count."""
+        started = time.perf_counter()
+        count = 0
+        with self._lock:
+            self.conn.execute("DELETE FROM files")
+        for name in VAULT_FOLDERS:
+            folder = self.vault_path / name
+            if not folder.exists():
+                continue
+            for path in folder.rglob("EMAIL_*.md"):
+                try:
+                    self.upsert(path, commit=False)
+                    count += 1
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.warning(f"[INDEX] Skipped {path.name}: {e}")
+        self.commit()
+        logger.info(f"[INDEX] Rebuilt from {count} file(s) in {time.perf_counter() - started:.1f}s")
+        return count
+
+    # -- Queries ------------------------------------------------------------
+
+    def path_for(self, message_id: str):
+        """Absolute path of EMAIL_<id>.md as last recorded, or None."""
+        row = self.conn.execute("SELECT path FROM files WHERE message_id = ?", (message_id,)).fetchone()
+        return self.vault_path / row[0] if row else None
+
+    def query(self, status: str = None, priority: str = None, folder: str = None, older_than: float = None,
+              newer_than: float = None, sender: str = None, limit: int = None) -> list:
+        """
+        Rows (as dicts, oldest first) matching every given filter. `status`,
+        `priority` and `folder` may be comma-separated lists; `older_than` and
+        `newer_than` are ages in seconds; `sender` matches part of the From field.
+        """
+        clauses, params = [], []
+        for column, value in (('status', status), ('priority', priority), ('folder', folder)):
+            if value:
+                values = [v.strip() for v in value.split(',') if v.strip()]
+                if column == 'priority':
+                    values = [v.upper() for v in values]
+                clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+        now = time.time()
+        if older_than is not None:
+            clauses.append("received_ts <= ?")
+            params.append(now - older_than)
+        if newer_than is not None:
+            clauses.append("received_ts >= ?")
+            params.append(now - newer_than)
+        if sender:
+            clauses.append("sender LIKE ?")
+            params.append(f"%{sender}%")
+        sql = "SELECT * FROM files"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY received_ts"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def counts(self) -> list:
+        """(folder, status, priority, count) for every combination present."""
+        return [tuple(row) for row in self.conn.execute(
+            "SELECT folder, status, priority, COUNT(*) FROM files GROUP BY folder, status, priority "
+            "ORDER BY folder, status, priority"
+        )]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def shard_done(index: VaultIndex, sharding: str = None) -> int:
+    """Move EMAIL_*.md files lying directly in Done/ into their dated subfolders. Returns the count moved."""
+    done = index.vault_path / "Done"
+    if not done.exists():
+        return 0
+    moved = 0
+    for path in sorted(done.glob("EMAIL_*.md")):
+        content = path.read_text(encoding='utf-8')
+        target = done_folder_for(index.vault_path, parse_frontmatter(content).get('received'), sharding)
+        if target == done:
+            continue
+        target.mkdir(parents=True, exist_ok=True)
+        destination = target / path.name
+        os.replace(path, destination)
+        index.upsert(destination, content, commit=False)
+        moved += 1
+    index.commit()
+    return moved
+
+
+def _print_rows(rows: list):
+    for row in rows:
+        age = (time.time() - row['received_ts']) / 3600 if row['received_ts'] else None
+        age_text = f"{age:6.1f}h" if age is not None else "     ?"
+        print(f"{age_text}  {row['priority'] or '-':<6}  {row['status'] or '-':<11}  {row['folder']:<16}  "
+              f"{(row['sender'] or '')[:30]:<30}  {(row['subject'] or '')[:60]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query or rebuild the vault frontmatter index")
+    parser.add_argument("command", choices=("query", "stats", "rebuild", "shard"))
+    parser.add_argument("--vault", required=True, help="path to the Obsidian vault")
+    parser.add_argument("--index", help="index file (default: VAULT_INDEX_PATH or state/vault_index_<hash>.sqlite3)")
+    parser.add_argument("--state-dir", help="the watcher's state_dir (runtime.py uses state/<name>); "
+                                            "its vault_index.sqlite3 is used")
+    parser.add_argument("--status", help="e.g. pending, or pending,send_failed")
+    parser.add_argument("--priority", help="e.g. HIGH, or URGENT,HIGH")
+    parser.add_argument("--folder", help="top-level folder, e.g. Inbox or Done")
+    parser.add_argument("--from", dest="sender", help="part of the sender name or address")
+    parser.add_argument("--older-than", help="received at least this long ago (30m, 4h, 2d)")
+    parser.add_argument("--newer-than", help="received at most this long ago")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--json", action="store_true", help="print rows as JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[logging.StreamHandler(sys.stderr)])
+    path = args.index or default_index_path(args.vault, args.state_dir)
+    if not (args.index or args.state_dir or os.getenv('VAULT_INDEX_PATH')):
+        # Watchers run by runtime.py keep their index in state/<name>/, which this one would not see
+        others = sorted(DEFAULT_INDEX_DIR.glob("*/vault_index.sqlite3"))
+        if others:
+            logger.warning(f"Using {path}; watchers run by runtime.py update their own index - pass "
+                           f"--state-dir {others[0].parent} (or --index) to query it instead")
+    index = VaultIndex(args.vault, path)
+    try:
+        if args.command == "rebuild":
+            print(f"Indexed {index.rebuild()} file(s) into {index.path}")
+        elif args.command == "shard":
+            if index.is_new:
+                index.rebuild()
+            print(f"Moved {shard_done(index)} file(s) into dated Done/ subfolders")
+        elif args.command == "stats":
+            if index.is_new:
+                index.rebuild()
+            for folder, status, priority, count in index.counts():
+                print(f"{folder:<16}  {status or '-':<11}  {priority or '-':<6}  {count:>7}")
+            print(f"{len(index)} file(s) indexed")
+        else:
+            if index.is_new:
+                index.rebuild()
+            started = time.perf_counter()
+            rows = index.query(
+                status=args.status, priority=args.priority, folder=args.folder, sender=args.sender,
+                older_than=parse_duration(args.older_than) if args.older_than else None,
+                newer_than=parse_duration(args.newer_than) if args.newer_than else None,
+                limit=args.limit,
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+            if args.json:
+                print(json.dumps(rows, indent=2))
+            else:
+                _print_rows(rows)
+            print(f"{len(rows)} item(s) in {elapsed:.1f} ms", file=sys.stderr)
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
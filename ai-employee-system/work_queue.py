@@ -0,0 +1,93 @@
+"""
+Work Queue - Priority-ordered hand-off between cheap and expensive pipeline stages
+Fetched emails are pre-classified with headers and rules only, then queued by
+priority so the LLM/draft/notify stage handles URGENT mail before a backlog of
+newsletters. Per-priority latency is tracked for the logs.
+"""
+
+import heapq
+import time
+import itertools
+import threading
+from collections import deque
+
+PRIORITY_RANK = {"URGENT": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
+
+
+class PriorityWorkQueue:
+    """Min-heap of items by priority rank, oldest first within a priority; one entry per key."""
+
+    def __init__(self):
+        self._heap = []
+        self._keys = set()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, key: str, item, priority: str, enqueued_at: float = None) -> bool:
+        """
+        Queue `item` unless `key` is already queued. Returns True if queued.
+        Pass the original `enqueued_at` to put a popped entry back in its place.
+        """
+        with self._lock:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+            rank = PRIORITY_RANK.get(priority, len(PRIORITY_RANK))
+            if enqueued_at is None:
+                enqueued_at = time.monotonic()
+            heapq.heappush(self._heap, (rank, enqueued_at, next(self._seq), key, priority, item))
+            return True
+
+    def pop(self):
+        """Return (item, priority, enqueued_at) for the most urgent entry, or None."""
+        with self._lock:
+            if not self._heap:
+                return None
+            _, enqueued_at, _, key, priority, item = heapq.heappop(self._heap)
+            self._keys.discard(key)
+            return item, priority, enqueued_at
+
+    def counts(self) -> dict:
+        with self._lock:
+            counts = {}
+            for entry in self._heap:
+                counts[entry[4]] = counts.get(entry[4], 0) + 1
+        return {p: counts[p] for p in sorted(counts, key=lambda p: PRIORITY_RANK.get(p, 99))}
+
+
+class LatencyTracker:
+    """Recent latency samples per priority (seconds from queueing to file written)."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.samples = {}
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, priority: str, seconds: float):
+        with self._lock:
+            self.samples.setdefault(priority, deque(maxlen=self.window)).append(seconds)
+            self.totals[priority] = self.totals.get(priority, 0) + 1
+
+    def summary(self) -> dict:
+        """{priority: {'count', 'p50', 'p90', 'max'}} over the recent window."""
+        with self._lock:
+            report = {}
+            for priority in sorted(self.samples, key=lambda p: PRIORITY_RANK.get(p, 99)):
+                values = sorted(self.samples[priority])
+                report[priority] = {
+                    "count": self.totals[priority],
+                    "p50": values[len(values) // 2],
+                    "p90": values[min(len(values) - 1, int(len(values) * 0.9))],
+                    "max": values[-1],
+                }
+            return report
+
+    def format(self) -> str:
+        return " | ".join(
+            f"{priority}: n={s['count']} p50={s['p50']:.1f}s p90={s['p90']:.1f}s max={s['max']:.1f}s"
+            for priority, s in self.summary().items()
+        )